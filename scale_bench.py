@@ -0,0 +1,254 @@
+"""
+Scale Manager Lite - Benchmark
+---------------------------------------------------
+Misure senza bilancia fisica, da confrontare tra una versione e l'altra:
+
+* percorsi: frequenza di ScaleDevice.read_weight contro un dispositivo
+  simulato, confrontando il vecchio percorso di lettura (controllo
+  get_active_configuration prima di ogni read) con quello attuale;
+* lettore: ScaleReader collegato alla bilancia simulata di scale_simulator
+  tramite il backend pyusb; riporta campioni al secondo e latenza tra la
+  consegna del report USB e la pubblicazione dello stato;
+* api: richieste al secondo su /api/weight con client keep-alive a varie
+  concorrenze, mentre il lettore pubblica i campioni simulati.
+
+I client HTTP girano nello stesso processo del server: i numeri servono a
+confrontare versioni sulla stessa macchina, non come valori assoluti.
+
+Uso:
+    python scale_bench.py --duration 5 --control-latency-ms 1 --report-latency-ms 1
+    python scale_bench.py --suite api --server waitress --concurrency 1,8,32
+"""
+
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from array import array
+
+from scale_server import ScaleAPI, ScaleDevice, ScaleReader, SERVER_BACKENDS
+from scale_simulator import SimulatedDymo, SimulatedDymoBackend
+
+SUITES = ("percorsi", "lettore", "api")
+
+
+def usb_delay(seconds):
+    """Attesa attiva: time.sleep non ha risoluzione sub-millisecondo su Windows"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+# Endpoint interrupt simulato della Dymo M5/M10
+class MockEndpoint:
+    bEndpointAddress = 0x82
+    wMaxPacketSize = 6
+
+
+# Dispositivo pyusb simulato che conta i trasferimenti effettuati
+class MockDymoDevice:
+    def __init__(self, control_latency, report_latency):
+        self.control_latency = control_latency
+        self.report_latency = report_latency
+        self.control_transfers = 0
+        self.interrupt_transfers = 0
+        self.grams = 0
+
+    def read(self, address, size, timeout=None):
+        usb_delay(self.report_latency)
+        self.interrupt_transfers += 1
+        self.grams = (self.grams + 1) % 5000
+        return array('B', [3, 4, 2, 0, self.grams & 0xFF, self.grams >> 8])
+
+    def get_active_configuration(self):
+        usb_delay(self.control_latency)
+        self.control_transfers += 1
+        return object()
+
+    def set_configuration(self):
+        usb_delay(self.control_latency)
+        self.control_transfers += 1
+
+
+def make_scale(device):
+    """Crea uno ScaleDevice già collegato al dispositivo simulato"""
+    scale = ScaleDevice()
+    scale.device = device
+    scale.endpoint = MockEndpoint()
+    scale.connected = True
+    scale._last_alive = time.monotonic()
+    return scale
+
+
+def legacy_read(scale):
+    """Percorso di lettura precedente: round-trip di controllo prima di ogni read"""
+    if not scale.is_device_connected():
+        return None
+    return scale.read_weight()
+
+
+def run(name, read, scale, duration):
+    device = scale.device
+    samples = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        if read(scale) is not None:
+            samples += 1
+    elapsed = time.perf_counter() - start
+    rate = samples / elapsed
+    control_per_sample = device.control_transfers / max(samples, 1)
+    print(f"{name:<10} {rate:>12.1f} {control_per_sample:>18.2f}")
+    return rate
+
+
+def run_paths(args):
+    """Vecchio e nuovo percorso di lettura a confronto"""
+    control_latency = args.control_latency_ms / 1000
+    report_latency = args.report_latency_ms / 1000
+
+    legacy_scale = make_scale(MockDymoDevice(control_latency, report_latency))
+    current_scale = make_scale(MockDymoDevice(control_latency, report_latency))
+
+    print(f"{'percorso':<10} {'letture/s':>12} {'controlli/lettura':>18}")
+    legacy = run("legacy", legacy_read, legacy_scale, args.duration)
+    current = run("attuale", ScaleDevice.read_weight, current_scale, args.duration)
+    print(f"\nGuadagno: x{current / legacy:.2f}")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def make_simulated_scale(args):
+    """ScaleDevice sul backend simulato, con gli errori richiesti da riga di comando"""
+    device = SimulatedDymo(
+        report_interval=args.report_interval_ms / 1000,
+        error_rate=args.error_rate,
+        disconnect_every=args.disconnect_every,
+        seed=1,
+    )
+    return ScaleDevice(backend=SimulatedDymoBackend([device])), device
+
+
+def run_reader(args):
+    """Campioni al secondo e latenza report USB -> stato pubblicato"""
+    scale, device = make_simulated_scale(args)
+    latencies = []
+    # Il listener dei campioni gira nel thread di lettura subito dopo la
+    # pubblicazione dello stato, una volta per ogni report decodificato
+    scale.add_sample_listener(lambda sample: latencies.append(time.perf_counter() - device.last_report_at))
+    reader = ScaleReader(scale)
+    reader.start()
+    time.sleep(0.2)
+    latencies.clear()
+    reports, errors = device.reports, device.errors
+    start = time.perf_counter()
+    time.sleep(args.duration)
+    elapsed = time.perf_counter() - start
+    samples = list(latencies)
+    reader.stop()
+
+    print(f"{'campioni/s':>12} {'report/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errori':>7} {'scollegamenti':>14}")
+    print(f"{len(samples) / elapsed:>12.1f} {(device.reports - reports) / elapsed:>10.1f} "
+          f"{percentile(samples, 0.5) * 1000:>8.3f} {percentile(samples, 0.99) * 1000:>8.3f} "
+          f"{max(samples, default=0) * 1000:>8.3f} {device.errors - errors:>7} {device.disconnects:>14}")
+
+
+def http_client(host, port, deadline, barrier, counts, index):
+    """Client keep-alive che interroga /api/weight fino alla scadenza"""
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    requests = 0
+    barrier.wait()
+    try:
+        while time.perf_counter() < deadline[0]:
+            connection.request("GET", "/api/weight")
+            response = connection.getresponse()
+            response.read()
+            requests += 1
+    except (OSError, http.client.HTTPException) as e:
+        print(f"Client {index}: {e}")
+    finally:
+        connection.close()
+        counts[index] = requests
+
+
+def run_api(args):
+    """Richieste al secondo su /api/weight a varie concorrenze"""
+    scale, device = make_simulated_scale(args)
+    reader = ScaleReader(scale)
+    api = ScaleAPI(scale, host="127.0.0.1", port=args.port, server=args.server,
+                   threads=max(args.concurrency), reader=reader)
+    if not api.start():
+        print("Impossibile avviare il server API")
+        return
+    reader.start()
+    time.sleep(0.5)
+    try:
+        print(f"server: {api.server.name}")
+        print(f"{'client':>7} {'richieste/s':>12} {'per client':>11}")
+        for concurrency in args.concurrency:
+            counts = [0] * concurrency
+            deadline = [0.0]
+            barrier = threading.Barrier(concurrency + 1)
+            clients = [
+                threading.Thread(target=http_client,
+                                 args=("127.0.0.1", args.port, deadline, barrier, counts, index))
+                for index in range(concurrency)
+            ]
+            for client in clients:
+                client.start()
+            # I client leggono la scadenza solo dopo la barriera
+            start = time.perf_counter()
+            deadline[0] = start + args.duration
+            barrier.wait()
+            for client in clients:
+                client.join()
+            elapsed = time.perf_counter() - start
+            total = sum(counts)
+            print(f"{concurrency:>7} {total / elapsed:>12.1f} {statistics.mean(counts) / elapsed:>11.1f}")
+    finally:
+        reader.stop()
+        api.stop()
+        if api.core is not None:
+            api.core.stop()
+
+
+def parse_concurrency(value):
+    return [int(level) for level in value.split(",") if level.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark di Scale Manager con dispositivo simulato")
+    parser.add_argument("--suite", choices=SUITES + ("tutti",), default="tutti",
+                        help="misura da eseguire (default: tutte)")
+    parser.add_argument("--duration", type=float, default=3.0, help="durata di ogni misura (s)")
+    parser.add_argument("--control-latency-ms", type=float, default=1.0,
+                        help="latenza simulata di un trasferimento di controllo (ms)")
+    parser.add_argument("--report-latency-ms", type=float, default=1.0,
+                        help="latenza simulata di un report interrupt (ms)")
+    parser.add_argument("--report-interval-ms", type=float, default=5.0,
+                        help="intervallo tra i report della bilancia simulata (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="probabilità di errore USB per lettura della bilancia simulata")
+    parser.add_argument("--disconnect-every", type=float, default=None,
+                        help="scollega la bilancia simulata ogni N secondi")
+    parser.add_argument("--server", choices=sorted(SERVER_BACKENDS) + ["auto"], default="auto",
+                        help="backend del server API")
+    parser.add_argument("--port", type=int, default=5099, help="porta del server API")
+    parser.add_argument("--concurrency", type=parse_concurrency, default=[1, 4, 16, 64],
+                        help="client contemporanei, separati da virgola")
+    args = parser.parse_args()
+
+    suites = SUITES if args.suite == "tutti" else (args.suite,)
+    runners = {"percorsi": run_paths, "lettore": run_reader, "api": run_api}
+    for suite in suites:
+        print(f"\n== {suite} ==")
+        runners[suite](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,898 @@
+"""
+Scale Manager Lite - Interfaccia grafica
+---------------------------------------------------
+Finestra principale e dialog di aiuto in PyQt6. Il modulo viene importato
+da scale_server.py solo quando l'applicazione non è avviata con --headless.
+"""
+
+import sys
+
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+    QLabel, QPushButton, QGroupBox, QGridLayout, QSpinBox, QCheckBox,
+    QMessageBox, QFileDialog, QStatusBar, QDialog, QTextEdit, QDialogButtonBox,
+    QLineEdit
+)
+from PyQt6.QtCore import Qt, QEvent, QTimer, pyqtSignal, QObject
+from PyQt6.QtGui import QFont, QIcon
+
+from scale_server import (
+    APP_NAME, APP_PATH, COMMAND_RESCAN, AutoStartManager, ScaleService, SettingsManager, logger
+)
+
+# Intervallo (ms) tra due aggiornamenti del display del peso: i campioni
+# arrivati nel frattempo vengono scartati, si mostra solo l'ultimo
+GUI_FRAME_INTERVAL_MS = 33
+# Intervallo (ms) di aggiornamento dello stato dell'API
+GUI_STATUS_INTERVAL_MS = 1000
+
+
+# Segnali Qt per i callback del lettore, che girano nel suo thread. Il peso
+# non passa da qui: un segnale per campione riempirebbe la coda degli eventi
+class ReaderSignals(QObject):
+    error_occurred = pyqtSignal(str)
+    connected = pyqtSignal(bool, str)
+    scan_finished = pyqtSignal(bool)
+
+
+# Dialog per il setup esterno API
+class SetupHelpDialog(QDialog):
+    def __init__(self, api_settings, parent=None):
+        super().__init__(parent)
+        self.api_settings = api_settings
+        self.setup_ui()
+        
+    def setup_ui(self):
+        """Configura l'interfaccia del dialog di setup"""
+        self.setWindowTitle("Setup API Esterno - Scale Manager Lite")
+        self.setMinimumSize(700, 600)
+        self.setModal(True)
+        
+        layout = QVBoxLayout(self)
+        
+        # Titolo
+        title_label = QLabel("🔧 Setup API per Accesso Esterno")
+        title_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        title_label.setStyleSheet("color: #FF9A3C; margin-bottom: 15px;")
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title_label)
+        
+        # Area di testo per i contenuti dell'aiuto
+        self.help_text = QTextEdit()
+        self.help_text.setReadOnly(True)
+        self.help_text.setFont(QFont("Consolas", 9))
+        
+        # Contenuto dell'aiuto per setup esterno
+        help_content = f"""
+<h3 style="color: #FF9A3C;">🌐 Configurazione Rete per Accesso Esterno</h3>
+
+<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">📍 Step 1: Configurazione Host</h4>
+
+<p><strong>Opzioni disponibili:</strong></p>
+<ul>
+<li><code>0.0.0.0</code> - <span style="color: #6BFF72;">CONSIGLIATO</span> - Accessibile da qualsiasi dispositivo sulla rete</li>
+<li><code>127.0.0.1</code> - Solo accesso locale (stesso computer)</li>
+<li><code>192.168.x.x</code> - IP specifico del computer sulla rete locale</li>
+</ul>
+
+<p><strong>⚠️ Importante:</strong> Per accesso da altri dispositivi, usa <code>0.0.0.0</code></p>
+</div>
+
+<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">🔍 Step 2: Trova l'IP del Computer</h4>
+
+<p><strong>Su Windows:</strong></p>
+<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
+# Apri Command Prompt (cmd) e digita:
+ipconfig
+
+# Cerca "Indirizzo IPv4" 
+# Esempio output:
+#   Indirizzo IPv4. . . . . . . . . : 192.168.1.100
+</pre>
+
+<p><strong>Su Linux/Mac:</strong></p>
+<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
+# Apri Terminal e digita:
+ip addr show  # Linux
+ifconfig      # Mac
+
+# Cerca inet 192.168.x.x
+</pre>
+</div>
+
+<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">🔥 Step 3: Configurazione Firewall Windows</h4>
+
+<p><strong>Opzione A - Rapida (Disabilita temporaneamente):</strong></p>
+<pre style="background-color: #2d2d30; color: #FFD700; padding: 8px; border-radius: 3px;">
+1. Pannello di Controllo > Sistema e Sicurezza > Windows Defender Firewall
+2. "Attiva o disattiva Windows Defender Firewall"
+3. Disattiva temporaneamente per "Rete privata"
+4. ⚠️ RIATTIVA dopo il test!
+</pre>
+
+<p><strong>Opzione B - Sicura (Crea regola specifica):</strong></p>
+<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
+1. Pannello di Controllo > Sistema e Sicurezza > Windows Defender Firewall
+2. "Impostazioni avanzate"
+3. "Regole connessioni in entrata" > "Nuova regola"
+4. Tipo: "Porta" > Avanti
+5. "TCP" > "Porte locali specifiche" > {self.api_settings['port']} > Avanti
+6. "Consenti connessione" > Avanti
+7. Seleziona "Privato" > Avanti
+8. Nome: "Scale Manager API" > Fine
+</pre>
+</div>
+
+<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">📱 Step 4: Test da Altri Dispositivi</h4>
+
+<p><strong>URL per test:</strong></p>
+<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
+# Sostituisci [IP-COMPUTER] con l'IP trovato nello Step 2
+http://[IP-COMPUTER]:{self.api_settings['port']}/
+
+# Esempi:
+http://192.168.1.100:{self.api_settings['port']}/
+http://192.168.1.100:{self.api_settings['port']}/api/weight
+http://192.168.1.100:{self.api_settings['port']}/api/status
+</pre>
+
+<p><strong>Test con smartphone/tablet:</strong></p>
+<ol>
+<li>Connetti il dispositivo alla stessa rete WiFi</li>
+<li>Apri il browser</li>
+<li>Vai all'URL sopra (sostituendo [IP-COMPUTER])</li>
+<li>Dovresti vedere la pagina di documentazione API</li>
+</ol>
+</div>
+
+<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">🐛 Risoluzione Problemi</h4>
+
+<p><strong>❌ Non riesco ad accedere dall'esterno:</strong></p>
+<ul>
+<li>Verifica che l'host sia impostato su <code>0.0.0.0</code></li>
+<li>Controlla che l'API sia attiva (verde nell'applicazione)</li>
+<li>Verifica l'IP del computer (può cambiare)</li>
+<li>Controlla le impostazioni firewall</li>
+<li>Assicurati che i dispositivi siano sulla stessa rete</li>
+</ul>
+
+<p><strong>❌ Errore "Connessione rifiutata":</strong></p>
+<ul>
+<li>Firewall di Windows blocca la connessione</li>
+<li>Porta {self.api_settings['port']} non accessibile</li>
+<li>Prova una porta diversa (es. 8080, 3000)</li>
+</ul>
+
+<p><strong>❌ "Timeout" o caricamento infinito:</strong></p>
+<ul>
+<li>IP errato o dispositivo non raggiungibile</li>
+<li>Rete WiFi diversa</li>
+<li>Router blocca comunicazioni interne</li>
+</ul>
+</div>
+
+<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">💡 Suggerimenti Avanzati</h4>
+
+<p><strong>🔒 Per maggiore sicurezza:</strong></p>
+<ul>
+<li>Usa <code>127.0.0.1</code> se non serve accesso esterno</li>
+<li>Cambia la porta default se usi più applicazioni</li>
+<li>Crea regole firewall specifiche invece di disabilitarlo</li>
+</ul>
+
+<p><strong>📊 Per uso professionale:</strong></p>
+<ul>
+<li>Considera l'uso di un reverse proxy (nginx)</li>
+<li>Implementa HTTPS per connessioni sicure</li>
+<li>Aggiungi log dettagliati per monitoraggio</li>
+</ul>
+</div>
+
+<h3 style="color: #FF9A3C;">✅ Checklist Finale</h3>
+<ul style="color: #CCCCCC;">
+<li>☐ Host impostato su <code>0.0.0.0</code></li>
+<li>☐ API attiva (stato verde)</li>
+<li>☐ IP computer identificato</li>
+<li>☐ Firewall configurato correttamente</li>
+<li>☐ Test dal browser locale: <code>http://127.0.0.1:{self.api_settings['port']}</code></li>
+<li>☐ Test da dispositivo esterno: <code>http://[IP-COMPUTER]:{self.api_settings['port']}</code></li>
+</ul>
+"""
+        
+        self.help_text.setHtml(help_content)
+        self.help_text.setStyleSheet("""
+            QTextEdit {
+                background-color: #2d2d30;
+                color: #ffffff;
+                border: 1px solid #3f3f46;
+                border-radius: 5px;
+                padding: 10px;
+            }
+        """)
+        
+        layout.addWidget(self.help_text)
+        
+        # Pulsanti
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        button_box.rejected.connect(self.accept)
+        
+        # Pulsante per test locale
+        test_local_btn = QPushButton("🧪 Test Locale")
+        test_local_btn.clicked.connect(self.test_local_api)
+        test_local_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold; padding: 8px 15px; border-radius: 3px;")
+        button_box.addButton(test_local_btn, QDialogButtonBox.ButtonRole.ActionRole)
+        
+        copy_ip_btn = QPushButton("📋 Copia Info IP")
+        copy_ip_btn.clicked.connect(self.copy_ip_info)
+        copy_ip_btn.setStyleSheet("background-color: #2196F3; color: white; font-weight: bold; padding: 8px 15px; border-radius: 3px;")
+        button_box.addButton(copy_ip_btn, QDialogButtonBox.ButtonRole.ActionRole)
+        
+        layout.addWidget(button_box)
+        
+        # Applica stile al dialog
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2d2d30;
+                color: #ffffff;
+            }
+            QLabel {
+                color: #ffffff;
+            }
+            QPushButton {
+                background-color: #0078d7;
+                color: white;
+                border: none;
+                border-radius: 3px;
+                padding: 8px 15px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #1c86d9;
+            }
+        """)
+        
+    def test_local_api(self):
+        """Apre l'API nel browser per test locale"""
+        import webbrowser
+        local_url = f"http://127.0.0.1:{self.api_settings['port']}"
+        webbrowser.open(local_url)
+        
+    def copy_ip_info(self):
+        """Copia informazioni IP negli appunti"""
+        import socket
+        
+        try:
+            # Ottieni IP locale
+            hostname = socket.gethostname()
+            local_ip = socket.gethostbyname(hostname)
+            
+            info = f"""Informazioni IP per Scale Manager API:
+
+Host configurato: {self.api_settings['host']}
+Porta: {self.api_settings['port']}
+IP locale rilevato: {local_ip}
+
+URL per test locale:
+http://127.0.0.1:{self.api_settings['port']}
+
+URL per accesso esterno:
+http://{local_ip}:{self.api_settings['port']}
+
+Endpoint API:
+http://{local_ip}:{self.api_settings['port']}/api/weight
+http://{local_ip}:{self.api_settings['port']}/api/status"""
+            
+            # Copia negli appunti
+            import subprocess
+            subprocess.run(['clip'], input=info.encode('utf-8'), shell=True)
+            
+            QMessageBox.information(self, "Info Copiate", 
+                "Le informazioni IP sono state copiate negli appunti!\n\n"
+                "Incollale dove serve per accedere all'API.")
+                
+        except Exception as e:
+            QMessageBox.warning(self, "Errore", f"Impossibile ottenere IP: {str(e)}")
+
+
+# Dialog personalizzato per l'aiuto API semplice
+class APIHelpDialog(QDialog):
+    def __init__(self, api_settings, parent=None):
+        super().__init__(parent)
+        self.api_settings = api_settings
+        self.setup_ui()
+        
+    def setup_ui(self):
+        """Configura l'interfaccia del dialog di aiuto"""
+        self.setWindowTitle("Aiuto API - Scale Manager Lite")
+        self.setMinimumSize(500, 400)
+        self.setModal(True)
+        
+        layout = QVBoxLayout(self)
+        
+        # Titolo
+        title_label = QLabel("📡 API Scale Manager Lite")
+        title_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        title_label.setStyleSheet("color: #4DC0FF; margin-bottom: 15px;")
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title_label)
+        
+        # Area di testo per i contenuti dell'aiuto
+        self.help_text = QTextEdit()
+        self.help_text.setReadOnly(True)
+        self.help_text.setFont(QFont("Consolas", 10))
+        
+        # Contenuto dell'aiuto base
+        base_url = f"http://{self.api_settings['host']}:{self.api_settings['port']}"
+        help_content = f"""
+<h3 style="color: #4DC0FF;">🔗 Informazioni di Accesso</h3>
+<p><strong>URL Base:</strong> <a href="{base_url}" style="color: #6BFF72;">{base_url}</a></p>
+
+<h3 style="color: #4DC0FF;">📋 Endpoint Disponibili</h3>
+
+<div style="background-color: #3F3F46; padding: 10px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">⚖️ GET /api/weight</h4>
+<p><strong>URL:</strong> <a href="{base_url}/api/weight" style="color: #6BFF72;">{base_url}/api/weight</a></p>
+<p>Restituisce il peso attuale della bilancia in formato JSON.</p>
+</div>
+
+<div style="background-color: #3F3F46; padding: 10px; margin: 10px 0; border-radius: 5px;">
+<h4 style="color: #FFD700;">📊 GET /api/status</h4>
+<p><strong>URL:</strong> <a href="{base_url}/api/status" style="color: #6BFF72;">{base_url}/api/status</a></p>
+<p>Restituisce lo stato della bilancia e dell'API.</p>
+</div>
+
+<h3 style="color: #4DC0FF;">💻 Esempi di Utilizzo</h3>
+<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
+# Command Line
+curl {base_url}/api/weight
+
+# Browser
+Vai a: {base_url}/
+</pre>
+"""
+        
+        self.help_text.setHtml(help_content)
+        self.help_text.setStyleSheet("""
+            QTextEdit {
+                background-color: #2d2d30;
+                color: #ffffff;
+                border: 1px solid #3f3f46;
+                border-radius: 5px;
+                padding: 10px;
+            }
+        """)
+        
+        layout.addWidget(self.help_text)
+        
+        # Pulsanti
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        button_box.rejected.connect(self.accept)
+        
+        # Pulsante per aprire nel browser
+        open_browser_btn = QPushButton("🌐 Apri nel Browser")
+        open_browser_btn.clicked.connect(self.open_in_browser)
+        open_browser_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold; padding: 8px 15px; border-radius: 3px;")
+        button_box.addButton(open_browser_btn, QDialogButtonBox.ButtonRole.ActionRole)
+        
+        layout.addWidget(button_box)
+        
+        # Applica stile al dialog
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #2d2d30;
+                color: #ffffff;
+            }
+            QLabel {
+                color: #ffffff;
+            }
+        """)
+        
+    def open_in_browser(self):
+        """Apre l'API nel browser predefinito"""
+        import webbrowser
+        base_url = f"http://{self.api_settings['host']}:{self.api_settings['port']}"
+        webbrowser.open(base_url)
+
+
+# UI principale
+class MainWindow(QMainWindow):
+    def __init__(self, settings_file="scale_manager_settings.json"):
+        super().__init__()
+        
+        # Inizializzazione degli oggetti principali: bilance, lettori,
+        # registro pesate e API sono gestiti dal servizio senza interfaccia
+        self.service = ScaleService(SettingsManager(settings_file))
+        self.settings_manager = self.service.settings_manager
+        self.scale = self.service.scale
+        self.scale_registry = self.service.scale_registry
+        self.journal = self.service.journal
+        self.api = self.service.api
+        
+        # Inizializza il gestore dell'avvio automatico
+        self.autostart_manager = AutoStartManager(APP_NAME, APP_PATH)
+        
+        # Sincronizza le impostazioni di avvio automatico con Windows
+        app_settings = self.settings_manager.get_application_settings()
+        if app_settings["autostart_windows"] != self.autostart_manager.is_autostart_enabled():
+            if app_settings["autostart_windows"]:
+                self.autostart_manager.enable_autostart()
+            else:
+                self.autostart_manager.disable_autostart()
+        
+        # I callback del lettore arrivano dal suo thread: i segnali Qt li
+        # consegnano al thread dell'interfaccia. Il peso invece viene solo
+        # memorizzato e mostrato dal timer di rendering, così il lettore non
+        # attende mai il loop degli eventi Qt
+        self.reader_signals = ReaderSignals()
+        self.reader_signals.error_occurred.connect(self.show_error)
+        self.reader_signals.connected.connect(self.update_connection_status)
+        self.reader_signals.scan_finished.connect(self.on_scan_finished)
+        self._latest_sample = None
+        self._rendered_sample = None
+        # Testo e stile mostrati da ogni etichetta, per toccare i widget solo se cambiano
+        self._rendered = {}
+        reader = self.service.reader
+        reader.on_weight = self.store_weight
+        reader.on_error = self.reader_signals.error_occurred.emit
+        reader.on_connection = self.reader_signals.connected.emit
+        # Con la finestra visibile il peso viene mostrato a ogni frame: il
+        # lettore resta a piena velocità anche senza client dell'API. Il
+        # flag è aggiornato dagli eventi Qt e letto dal thread del lettore
+        self._displaying = False
+        reader.add_demand_source(lambda: self._displaying)
+        
+        # Setup dell'interfaccia utente
+        self.setup_ui()
+        
+        # Avvio minimizzato se configurato
+        if app_settings["start_minimized"]:
+            self.showMinimized()
+        
+        # Timer per aggiornamento UI
+        self.update_timer = QTimer(self)
+        self.update_timer.timeout.connect(self.update_ui)
+        self.update_timer.start(GUI_STATUS_INTERVAL_MS)
+        
+        # Timer di rendering del peso, alla frequenza del display
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.frame_timer.timeout.connect(self.render_weight)
+        self.frame_timer.start(GUI_FRAME_INTERVAL_MS)
+        
+        # Avvia API (se abilitata), registro pesate e thread di lettura
+        if not self.service.start():
+            self.show_error(f"Impossibile avviare l'API su {self.api.host}:{self.api.port}")
+
+    def setup_ui(self):
+        """Configurazione dell'interfaccia utente"""
+        self.setWindowTitle("Scale Manager Lite")
+        self.setMinimumSize(450, 400)
+        
+        # Widget principale
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        
+        # Layout principale
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setSpacing(15)  # Aumenta lo spazio tra i widget
+        
+        # Sezione principale - Display peso
+        weight_group = QGroupBox("Peso Attuale")
+        weight_layout = QVBoxLayout(weight_group)
+        weight_layout.setSpacing(10)  # Aumenta lo spazio tra gli elementi
+        
+        # Display grande del peso
+        self.weight_label = QLabel("0")
+        self.weight_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.weight_label.setFont(QFont("Arial", 60, QFont.Weight.Bold))
+        self.weight_label.setStyleSheet("color: #4DC0FF;") # Colore azzurro per il peso
+        weight_layout.addWidget(self.weight_label)
+        
+        # Unità di misura
+        self.unit_label = QLabel("g")
+        self.unit_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.unit_label.setFont(QFont("Arial", 24))
+        self.unit_label.setStyleSheet("color: #CCCCCC;") # Colore grigio chiaro
+        weight_layout.addWidget(self.unit_label)
+        
+        # Stato connessione
+        self.connection_label = QLabel("Non connesso")
+        self.connection_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.connection_label.setStyleSheet("color: #FF6B6B;") # Colore rosso per disconnesso
+        weight_layout.addWidget(self.connection_label)
+        
+        # Pulsanti di azione rapida
+        actions_layout = QHBoxLayout()
+        
+        self.connect_button = QPushButton("Cerca Bilancia")
+        self.connect_button.clicked.connect(self.find_scale)
+        self.connect_button.setMinimumHeight(40) # Pulsante più grande
+        actions_layout.addWidget(self.connect_button)
+        
+        weight_layout.addLayout(actions_layout)
+        
+        main_layout.addWidget(weight_group)
+        
+        # Impostazioni API
+        api_group = QGroupBox("Impostazioni API")
+        api_layout = QGridLayout(api_group)
+        api_layout.setVerticalSpacing(10) # Spaziatura maggiore
+        
+        # Etichette con colore distintivo
+        host_label = QLabel("Host:")
+        host_label.setStyleSheet("color: #CCCCCC; font-weight: bold;")
+        api_layout.addWidget(host_label, 0, 0)
+        
+        api_settings = self.settings_manager.get_api_settings()
+        self.api_host_edit = QLineEdit(api_settings["host"])
+        self.api_host_edit.setStyleSheet("color: #FFFFFF; background-color: #3F3F46; padding: 5px; border-radius: 3px; border: 1px solid #555555;")
+        self.api_host_edit.setPlaceholderText("es. 0.0.0.0 o 192.168.1.100")
+        api_layout.addWidget(self.api_host_edit, 0, 1)
+        
+        port_label = QLabel("Porta:")
+        port_label.setStyleSheet("color: #CCCCCC; font-weight: bold;")
+        api_layout.addWidget(port_label, 1, 0)
+        
+        self.api_port_spin = QSpinBox()
+        self.api_port_spin.setRange(1024, 65535)
+        self.api_port_spin.setValue(api_settings["port"])
+        self.api_port_spin.setMinimumHeight(30) # Spinbox più grande
+        api_layout.addWidget(self.api_port_spin, 1, 1)
+        
+        self.api_autostart_check = QCheckBox("Avvia API automaticamente all'avvio")
+        self.api_autostart_check.setChecked(api_settings["autostart"])
+        api_layout.addWidget(self.api_autostart_check, 2, 0, 1, 2)
+        
+        api_status_layout = QHBoxLayout()
+        self.api_status_label = QLabel("API: Inattiva")
+        self.api_status_label.setStyleSheet("color: #FF9A3C;") # Colore arancione per inattivo
+        api_status_layout.addWidget(self.api_status_label)
+        
+        self.api_toggle_button = QPushButton("Avvia API")
+        self.api_toggle_button.clicked.connect(self.toggle_api)
+        api_status_layout.addWidget(self.api_toggle_button)
+        
+        api_layout.addLayout(api_status_layout, 3, 0, 1, 2)
+        
+        # Layout per i pulsanti di impostazioni API
+        api_buttons_layout = QHBoxLayout()
+        
+        self.api_save_button = QPushButton("Salva Impostazioni API")
+        self.api_save_button.clicked.connect(self.save_api_settings)
+        api_buttons_layout.addWidget(self.api_save_button)
+        
+        self.api_help_button = QPushButton("📖 Aiuto API")
+        self.api_help_button.clicked.connect(self.show_api_help)
+        self.api_help_button.setStyleSheet("background-color: #4CAF50;")  # Verde per il pulsante aiuto
+        api_buttons_layout.addWidget(self.api_help_button)
+        
+        self.setup_help_button = QPushButton("🔧 Setup Esterno")
+        self.setup_help_button.clicked.connect(self.show_setup_help)
+        self.setup_help_button.setStyleSheet("background-color: #FF9A3C;")  # Arancione per setup
+        api_buttons_layout.addWidget(self.setup_help_button)
+        
+        api_layout.addLayout(api_buttons_layout, 4, 0, 1, 2)
+        
+        main_layout.addWidget(api_group)
+        
+        # Impostazioni applicazione
+        app_group = QGroupBox("Impostazioni Applicazione")
+        app_layout = QVBoxLayout(app_group)
+        app_layout.setSpacing(10) # Spaziatura maggiore
+        
+        app_settings = self.settings_manager.get_application_settings()
+        
+        self.start_minimized_check = QCheckBox("Avvia minimizzato")
+        self.start_minimized_check.setChecked(app_settings["start_minimized"])
+        app_layout.addWidget(self.start_minimized_check)
+        
+        self.autostart_windows_check = QCheckBox("Avvia automaticamente all'avvio di Windows")
+        self.autostart_windows_check.setChecked(app_settings["autostart_windows"])
+        app_layout.addWidget(self.autostart_windows_check)
+        
+        self.app_save_button = QPushButton("Salva Impostazioni Applicazione")
+        self.app_save_button.clicked.connect(self.save_app_settings)
+        app_layout.addWidget(self.app_save_button)
+        
+        main_layout.addWidget(app_group)
+        
+        # Barra di stato
+        self.statusBar().showMessage("Pronto")
+        
+        # Carica lo stile
+        self.set_style()
+        
+    def set_style(self):
+        """Imposta lo stile dell'interfaccia utente con colori più contrastanti"""
+        style = """
+        QMainWindow {
+            background-color: #2d2d30;
+            color: #ffffff;
+        }
+        QWidget {
+            background-color: #2d2d30;
+            color: #ffffff;
+        }
+        QLabel {
+            color: #ffffff;
+            font-weight: normal;
+        }
+        QGroupBox {
+            border: 1px solid #3f3f46;
+            border-radius: 5px;
+            margin-top: 1.5ex;
+            padding-top: 10px;
+            font-weight: bold;
+            color: #4dc0ff;
+            background-color: #333337;
+        }
+        QGroupBox::title {
+            subcontrol-origin: margin;
+            subcontrol-position: top center;
+            padding: 0 8px;
+            color: #4dc0ff;
+            background-color: #333337;
+        }
+        QPushButton {
+            background-color: #0078d7;
+            color: white;
+            border: none;
+            border-radius: 3px;
+            padding: 8px 15px;
+            font-weight: bold;
+        }
+        QPushButton:hover {
+            background-color: #1c86d9;
+        }
+        QPushButton:pressed {
+            background-color: #0063b1;
+        }
+        QSpinBox {
+            background-color: #3f3f46;
+            color: white;
+            border: 1px solid #555555;
+            padding: 4px;
+            border-radius: 3px;
+        }
+        QLineEdit {
+            background-color: #3f3f46;
+            color: white;
+            border: 1px solid #555555;
+            padding: 4px;
+            border-radius: 3px;
+        }
+        QCheckBox {
+            color: #ffffff;
+        }
+        QCheckBox::indicator {
+            width: 18px;
+            height: 18px;
+        }
+        QCheckBox::indicator:unchecked {
+            border: 1px solid #5f5f5f;
+            background-color: #3f3f46;
+        }
+        QCheckBox::indicator:checked {
+            border: 1px solid #5f5f5f;
+            background-color: #0078d7;
+        }
+        QStatusBar {
+            background-color: #1e1e1e;
+            color: #999999;
+        }
+        """
+        self.setStyleSheet(style)
+        
+    def set_widget(self, widget, text, style=None):
+        """Imposta testo e stile di un widget solo se diversi da quelli mostrati"""
+        shown_text, shown_style = self._rendered.get(widget, (None, None))
+        if text != shown_text:
+            widget.setText(text)
+        if style is not None and style != shown_style:
+            # setStyleSheet ripolisce il widget: lo evitiamo se lo stile non cambia
+            widget.setStyleSheet(style)
+        else:
+            style = shown_style
+        self._rendered[widget] = (text, style)
+        
+    def update_ui(self):
+        """Aggiorna l'interfaccia utente"""
+        # Aggiorna lo stato dell'API
+        if self.api.running:
+            self.set_widget(self.api_status_label, f"API: Attiva su {self.api.host}:{self.api.port}",
+                            "color: #6BFF72;") # Verde per attivo
+            self.set_widget(self.api_toggle_button, "Ferma API")
+        else:
+            self.set_widget(self.api_status_label, "API: Inattiva",
+                            "color: #FF9A3C;") # Arancione per inattivo
+            self.set_widget(self.api_toggle_button, "Avvia API")
+        
+    def store_weight(self, sample):
+        """Memorizza l'ultimo campione (chiamato dal thread del lettore)"""
+        self._latest_sample = sample
+        
+    def render_weight(self):
+        """Mostra l'ultimo campione ricevuto, scartando quelli intermedi"""
+        sample = self._latest_sample
+        if sample is None or sample is self._rendered_sample:
+            return
+        # Finestra ridotta a icona: il campione resta in attesa del prossimo frame visibile
+        if self.isMinimized() or not self.isVisible():
+            return
+        self._rendered_sample = sample
+        self.update_weight_display(sample)
+        
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_displaying()
+        
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_displaying()
+        
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.update_displaying()
+            
+    def update_displaying(self):
+        """Annota se il peso è visibile; alla comparsa il lettore lascia subito l'idle"""
+        displaying = self.isVisible() and not self.isMinimized()
+        if displaying and not self._displaying:
+            self.service.reader.wake()
+        self._displaying = displaying
+        
+    def update_weight_display(self, sample):
+        """Aggiorna il display del peso"""
+        self.set_widget(self.weight_label, sample.format_value())
+        self.set_widget(self.unit_label, sample.unit)
+        
+    def update_connection_status(self, connected, conn_type):
+        """Aggiorna lo stato della connessione"""
+        if connected:
+            self.set_widget(self.connection_label, f"Connesso ({conn_type})",
+                            "color: #6BFF72;") # Verde per connesso
+            self.statusBar().showMessage(f"Bilancia connessa via {conn_type}")
+        else:
+            self.set_widget(self.connection_label, "Non connesso",
+                            "color: #FF6B6B;") # Rosso per non connesso
+            self.statusBar().showMessage("Bilancia non connessa")
+        
+    def show_error(self, message):
+        """Mostra un messaggio di errore"""
+        self.statusBar().showMessage(f"Errore: {message}")
+        logger.error(message)
+        
+    def find_scale(self):
+        """Chiede al lettore di cercare la bilancia, senza bloccare l'interfaccia"""
+        self.statusBar().showMessage("Ricerca bilancia in corso...")
+        future = self.service.submit_command(COMMAND_RESCAN)
+        future.add_done_callback(
+            lambda f: self.reader_signals.scan_finished.emit(
+                not f.cancelled() and f.exception() is None and f.result()
+            )
+        )
+        
+    def on_scan_finished(self, found):
+        """Esito della ricerca manuale della bilancia"""
+        if found:
+            self.update_connection_status(True, "USB")
+            return
+        self.update_connection_status(False, "")
+        QMessageBox.warning(self, "Errore", "Nessuna bilancia trovata.")
+        
+    def toggle_api(self):
+        """Avvia o ferma l'API"""
+        if self.api.running:
+            self.api.stop()
+            self.statusBar().showMessage("API fermata")
+        else:
+            # Aggiorna le impostazioni dell'API
+            self.api.host = self.api_host_edit.text()
+            self.api.port = self.api_port_spin.value()
+            if self.api.start():
+                self.statusBar().showMessage(f"API avviata su {self.api.host}:{self.api.port}")
+            else:
+                self.show_error(f"Impossibile avviare l'API su {self.api.host}:{self.api.port}")
+            
+    def save_api_settings(self):
+        """Salva le impostazioni dell'API"""
+        host = self.api_host_edit.text().strip()
+        port = self.api_port_spin.value()
+        autostart = self.api_autostart_check.isChecked()
+        
+        # Validazione dell'host
+        if not host:
+            QMessageBox.warning(self, "Errore", "Il campo host non può essere vuoto.")
+            return
+            
+        # Validazione IP (semplice)
+        if not self.validate_host(host):
+            QMessageBox.warning(self, "Errore", 
+                "Host non valido. Usa:\n"
+                "• 0.0.0.0 (tutte le interfacce)\n"
+                "• 127.0.0.1 (solo locale)\n" 
+                "• Un IP valido (es. 192.168.1.100)")
+            return
+        
+        if self.settings_manager.update_api_settings(host, port, autostart):
+            self.statusBar().showMessage("Impostazioni API salvate")
+            
+            # Se l'API è in esecuzione, riavviala con le nuove impostazioni
+            if self.api.running:
+                if not self.api.restart(host, port):
+                    self.show_error(f"Impossibile riavviare l'API su {host}:{port}")
+        else:
+            QMessageBox.warning(self, "Errore", "Impossibile salvare le impostazioni API")
+            
+    def save_app_settings(self):
+        """Salva le impostazioni dell'applicazione"""
+        start_minimized = self.start_minimized_check.isChecked()
+        autostart_windows = self.autostart_windows_check.isChecked()
+        
+        if self.settings_manager.update_application_settings(start_minimized, autostart_windows):
+            self.statusBar().showMessage("Impostazioni applicazione salvate")
+            
+            # Gestisce l'avvio automatico di Windows
+            if autostart_windows:
+                self.autostart_manager.enable_autostart()
+            else:
+                self.autostart_manager.disable_autostart()
+        else:
+            QMessageBox.warning(self, "Errore", "Impossibile salvare le impostazioni dell'applicazione")
+    
+    def validate_host(self, host):
+        """Valida l'indirizzo host"""
+        import re
+        
+        # Pattern per IP valido
+        ip_pattern = r'^(\d{1,3}\.){3}\d{1,3}$'
+        
+        # Controlla se è un IP valido
+        if re.match(ip_pattern, host):
+            # Verifica che ogni ottetto sia tra 0-255
+            octets = host.split('.')
+            for octet in octets:
+                if not (0 <= int(octet) <= 255):
+                    return False
+            return True
+        
+        # Accetta anche localhost
+        if host in ['localhost', '0.0.0.0', '127.0.0.1']:
+            return True
+            
+        return False
+    
+    def show_api_help(self):
+        """Mostra l'aiuto per l'API"""
+        api_settings = self.settings_manager.get_api_settings()
+        dialog = APIHelpDialog(api_settings, self)
+        dialog.exec()
+    
+    def show_setup_help(self):
+        """Mostra l'aiuto per il setup esterno dell'API"""
+        api_settings = self.settings_manager.get_api_settings()
+        dialog = SetupHelpDialog(api_settings, self)
+        dialog.exec()
+        
+    def closeEvent(self, event):
+        """Gestisce l'evento di chiusura dell'applicazione"""
+        # Ferma lettori, API e registro pesate
+        self.service.stop()
+        
+        # Accetta l'evento di chiusura
+        event.accept()
+
+
+def run_gui(settings_file="scale_manager_settings.json") -> int:
+    """Avvia l'interfaccia grafica; ritorna il codice di uscita di Qt"""
+    app = QApplication(sys.argv)
+    window = MainWindow(settings_file)
+    window.show()
+    return app.exec()
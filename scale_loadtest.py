@@ -0,0 +1,250 @@
+"""
+Scale Manager Lite - Test di carico dell'API
+---------------------------------------------------
+Avvia ScaleAPI nello stesso processo, su localhost, collegata alla bilancia
+simulata di scale_simulator, e la interroga con N client keep-alive
+contemporanei ripartiti tra /api/weight, /api/status e lo stream SSE
+/api/weight/stream. Per ogni endpoint riporta throughput e latenza
+(p50/p95/p99); per lo stream la latenza è il tempo tra la pubblicazione
+dello stato e la ricezione dell'evento da parte del client.
+
+I risultati vengono anche scritti in JSON, per confrontare le esecuzioni.
+
+Uso:
+    python scale_loadtest.py --clients 100 --duration 30
+    python scale_loadtest.py --clients 100 --mix weight=6,status=2,stream=2 --server asyncio
+"""
+
+import argparse
+import http.client
+import json
+import platform
+import socket
+import threading
+import time
+from datetime import datetime
+
+from scale_bench import percentile
+from scale_server import SERVER_BACKENDS, ScaleAPI, ScaleDevice, ScaleReader
+from scale_simulator import SimulatedDymo, SimulatedDymoBackend
+
+ENDPOINTS = {
+    "weight": "/api/weight",
+    "status": "/api/status",
+    "stream": "/api/weight/stream",
+}
+DEFAULT_MIX = "weight=8,status=1,stream=1"
+# Margine (s) oltre la scadenza della prova per la lettura dello stream
+STREAM_READ_GRACE = 0.5
+
+
+def parse_mix(value):
+    """Pesi dei client per endpoint, es. "weight=8,status=1,stream=1" """
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"endpoint sconosciuto: {name}")
+        mix[name] = int(weight or 1)
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("almeno un endpoint deve avere peso positivo")
+    return mix
+
+
+def allocate_clients(clients, mix):
+    """Ripartisce i client secondo i pesi, assegnando i resti ai pesi maggiori"""
+    total = sum(mix.values())
+    counts = {name: clients * weight // total for name, weight in mix.items()}
+    remaining = clients - sum(counts.values())
+    for name in sorted(mix, key=lambda name: -mix[name])[:remaining]:
+        counts[name] += 1
+    return {name: count for name, count in counts.items() if count > 0}
+
+
+# Risultati di un singolo client, uniti per endpoint alla fine della prova
+class ClientResult:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.messages = 0
+
+
+def poll_client(port, path, start, deadline, result):
+    """Client keep-alive che ripete la richiesta fino alla scadenza"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    start.wait()
+    try:
+        while time.perf_counter() < deadline[0]:
+            sent = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                result.errors += 1
+                connection.close()
+                continue
+            result.latencies.append(time.perf_counter() - sent)
+            result.messages += 1
+            if response.status != 200:
+                result.errors += 1
+    finally:
+        connection.close()
+
+
+def stream_client(port, path, start, deadline, result):
+    """Client SSE: misura il ritardo tra pubblicazione e ricezione di ogni evento"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    start.wait()
+    try:
+        connection.connect()
+        # Con "Connection: close" la risposta si prende il socket: lo teniamo da parte
+        sock = connection.sock
+        connection.request("GET", path, headers={"Accept": "text/event-stream"})
+        response = connection.getresponse()
+        if response.status != 200:
+            result.errors += 1
+            return
+        initial = True
+        while time.perf_counter() < deadline[0]:
+            # Lo stream invia solo le variazioni: la lettura può attendere fino
+            # alla scadenza della prova (dopo un timeout il socket non è più leggibile)
+            sock.settimeout(deadline[0] - time.perf_counter() + STREAM_READ_GRACE)
+            try:
+                line = response.readline()
+            except socket.timeout:
+                break
+            if not line:
+                result.errors += 1
+                return
+            if not line.startswith(b"data: "):
+                continue
+            received = time.time()
+            # Il primo evento è lo stato già presente al collegamento
+            if initial:
+                initial = False
+                continue
+            payload = json.loads(line[6:])
+            published = datetime.fromisoformat(payload["timestamp"]).timestamp()
+            result.latencies.append(received - published)
+            result.messages += 1
+    except (OSError, http.client.HTTPException, ValueError):
+        result.errors += 1
+    finally:
+        connection.close()
+
+
+def summarize(results, elapsed):
+    """Throughput e percentili di latenza (ms) di un gruppo di client"""
+    latencies = [latency for result in results for latency in result.latencies]
+    messages = sum(result.messages for result in results)
+    return {
+        "clients": len(results),
+        "messages": messages,
+        "errors": sum(result.errors for result in results),
+        "throughput": round(messages / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(max(latencies, default=0) * 1000, 3),
+        },
+    }
+
+
+def run_load(args):
+    """Esegue la prova e ritorna i risultati in forma serializzabile"""
+    device = SimulatedDymo(report_interval=args.report_interval_ms / 1000, seed=1)
+    scale = ScaleDevice(backend=SimulatedDymoBackend([device]))
+    reader = ScaleReader(scale)
+    allocation = allocate_clients(args.clients, args.mix)
+    # Ogni stream occupa un thread dei backend a thread: il pool deve bastare per tutti
+    threads = args.threads or args.clients
+    api = ScaleAPI(scale, host="127.0.0.1", port=args.port, server=args.server,
+                   threads=threads, reader=reader)
+    if not api.start():
+        raise SystemExit("Impossibile avviare il server API")
+    reader.start()
+    time.sleep(0.5)
+
+    start = threading.Event()
+    deadline = [0.0]
+    clients = []
+    results = {}
+    try:
+        for name, count in allocation.items():
+            target = stream_client if name == "stream" else poll_client
+            results[name] = [ClientResult() for _ in range(count)]
+            for result in results[name]:
+                clients.append(threading.Thread(
+                    target=target, args=(args.port, ENDPOINTS[name], start, deadline, result),
+                    daemon=True
+                ))
+        for client in clients:
+            client.start()
+        started = time.perf_counter()
+        deadline[0] = started + args.duration
+        start.set()
+        for client in clients:
+            client.join(args.duration + 10)
+        elapsed = time.perf_counter() - started
+        server_name = api.server.name
+    finally:
+        reader.stop()
+        api.stop()
+        if api.core is not None:
+            api.core.stop()
+
+    return {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "server": server_name,
+        "clients": args.clients,
+        "threads": threads,
+        "duration": round(elapsed, 3),
+        "report_interval_ms": args.report_interval_ms,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "endpoints": {
+            ENDPOINTS[name]: summarize(group, elapsed) for name, group in results.items()
+        },
+    }
+
+
+def print_report(report):
+    print(f"server: {report['server']}, client: {report['clients']}, durata: {report['duration']} s")
+    print(f"{'endpoint':<20} {'client':>6} {'msg/s':>9} {'errori':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for path, summary in report["endpoints"].items():
+        latency = summary["latency_ms"]
+        print(f"{path:<20} {summary['clients']:>6} {summary['throughput']:>9.1f} {summary['errors']:>7} "
+              f"{latency['p50']:>8.3f} {latency['p95']:>8.3f} {latency['p99']:>8.3f} {latency['max']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test di carico dell'API di Scale Manager con bilancia simulata")
+    parser.add_argument("--clients", type=int, default=100, help="client contemporanei")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"ripartizione dei client tra gli endpoint (default: {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float, default=10.0, help="durata della prova (s)")
+    parser.add_argument("--server", choices=sorted(SERVER_BACKENDS) + ["auto"], default="auto",
+                        help="backend del server API")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="thread del server (default: uno per client)")
+    parser.add_argument("--port", type=int, default=5098, help="porta del server API")
+    parser.add_argument("--report-interval-ms", type=float, default=5.0,
+                        help="intervallo tra i report della bilancia simulata (ms)")
+    parser.add_argument("--output", default=None,
+                        help="file JSON dei risultati (default: loadtest-<server>-<data>.json)")
+    args = parser.parse_args()
+
+    report = run_load(args)
+    print_report(report)
+    output = args.output or f"loadtest-{report['server']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nRisultati salvati in {output}")
+
+
+if __name__ == "__main__":
+    main()
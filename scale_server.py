@@ -8,30 +8,64 @@ Features:
 - API RESTful per l'accesso ai dati da altre applicazioni
 - Avvio automatico all'avvio di Windows
 - Configurazione del server API
+- Modalità headless (--headless) senza interfaccia grafica
+
+L'interfaccia grafica (PyQt6) si trova in scale_gui.py e viene importata
+solo quando serve, così il servizio può girare anche su Linux senza Qt.
 """
 
 import sys
+import argparse
+import asyncio
+import concurrent.futures
+import signal
+import statistics
 import time
 import json
+import hashlib
+import math
 import os
+import re
 import logging
 from datetime import datetime
 import threading
-import winreg
+import errno
+import mmap
+import queue
+import struct
+from array import array
+import bisect
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
 
 import usb.core
 import usb.util
 import usb.backend.libusb1
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request
+from werkzeug.serving import make_server
 
-from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QLabel, QPushButton, QGroupBox, QGridLayout, QSpinBox, QCheckBox,
-    QMessageBox, QFileDialog, QStatusBar, QDialog, QTextEdit, QDialogButtonBox,
-    QLineEdit
-)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject, QThread
-from PyQt6.QtGui import QFont, QIcon
+# waitress è opzionale: se presente viene usato come server di produzione
+try:
+    from waitress import wasyncore
+    from waitress.server import create_server as create_waitress_server
+except ImportError:
+    wasyncore = None
+    create_waitress_server = None
+
+# python-libusb1 è opzionale: abilita le notifiche hotplug di libusb
+try:
+    import usb1
+except ImportError:
+    usb1 = None
+
+# aiohttp è opzionale: abilita il backend "asyncio", in cui letture USB,
+# long-poll e stream condividono un unico loop di eventi
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
 
 # Configurazione del logger
 logging.basicConfig(
@@ -48,151 +82,1004 @@ logger = logging.getLogger("ScaleManagerLite")
 DYMO_VENDOR_ID = 0x0922
 DYMO_PRODUCT_ID = 0x8003
 MAX_ATTEMPTS = 5
+# Timeout della lettura bloccante sull'endpoint interrupt (ms): la bilancia
+# invia un report HID ad ogni variazione, il timeout serve solo a controllare
+# periodicamente se il worker deve fermarsi
+READ_TIMEOUT_MS = 500
+# Pausa (s) prima di ripetere una lettura fallita per un errore transitorio
+READ_RETRY_DELAY = 0.5
+# Intervallo minimo (s) tra due pubblicazioni consecutive del peso
+MIN_PUBLISH_INTERVAL = 0.05
+# Campionamento adattivo: si legge a piena velocità mentre il peso cambia o
+# ci sono client interessati; dopo SAMPLING_IDLE_AFTER secondi di peso
+# invariato e senza client si legge un report ogni SAMPLING_IDLE_INTERVAL s.
+# Una richiesta del peso negli ultimi SAMPLING_DEMAND_WINDOW s conta come client
+SAMPLING_ADAPTIVE = True
+SAMPLING_IDLE_AFTER = 10.0
+SAMPLING_IDLE_INTERVAL = 1.0
+SAMPLING_DEMAND_WINDOW = 5.0
+# Intervallo (s) del controllo di salute esplicito quando la bilancia non invia dati
+HEALTH_CHECK_INTERVAL = 5.0
+# Riconnessione con backoff esponenziale: il primo nuovo tentativo avviene
+# dopo RECONNECT_MIN_DELAY secondi, poi l'attesa raddoppia fino al massimo
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+# Attesa massima (s) del risultato di un comando inviato al lettore
+COMMAND_TIMEOUT = 5.0
+# Collegamento/scollegamento delle bilance: notifiche hotplug di libusb se
+# disponibili, altrimenti controllo ogni HOTPLUG_POLL_INTERVAL secondi di
+# un'impronta economica dei dispositivi (su Linux l'elenco di sysfs). Senza
+# sysfs l'impronta richiede un'enumerazione USB: l'intervallo raddoppia
+# finché nulla cambia, fino a HOTPLUG_POLL_MAX_INTERVAL secondi
+HOTPLUG_POLL_INTERVAL = 1.0
+HOTPLUG_POLL_MAX_INTERVAL = 16.0
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+
+# Rilevamento del peso stabile: finestra (s), tolleranza (g) e uso del flag HID
+STABILITY_WINDOW = 0.5
+STABILITY_TOLERANCE = 2.0
+STABILITY_USE_STATUS_BIT = True
+# Attesa massima (s) accettata da /api/weight/stable
+MAX_STABLE_WAIT = 60.0
+# Attesa predefinita (s) di un peso assestato per POST /api/tare
+TARE_STABLE_WAIT = 5.0
+# Attesa massima (ms) del long-poll di /api/weight?since=&wait=
+MAX_LONG_POLL_WAIT_MS = 60000
+
+# Storico in memoria: numero di letture conservate e risultati per richiesta
+HISTORY_CAPACITY = 6000
+HISTORY_DEFAULT_LIMIT = 500
+
+# Registro persistente delle pesate assestate: cartella, rotazione per
+# dimensione (byte) o età (s) del file, sincronizzazione su disco ogni
+# JOURNAL_FSYNC_INTERVAL secondi o ogni JOURNAL_FSYNC_BATCH record
+JOURNAL_ENABLED = True
+JOURNAL_DIRECTORY = "journal"
+JOURNAL_MAX_BYTES = 16 * 1024 * 1024
+JOURNAL_ROTATE_SECONDS = 24 * 3600
+JOURNAL_FSYNC_INTERVAL = 1.0
+JOURNAL_FSYNC_BATCH = 64
+JOURNAL_BUFFER_SIZE = 64 * 1024
+JOURNAL_QUERY_LIMIT = 1000
+
+# Sessioni di pesatura a lotti: sotto BATCH_MIN_WEIGHT grammi il piatto è
+# considerato vuoto (articolo tolto), pesate per sessione e sessioni conservate.
+# Le sessioni aperte sono al massimo BATCH_MAX_OPEN_SESSIONS e si chiudono da
+# sole dopo BATCH_IDLE_TIMEOUT secondi senza pesate né richieste
+BATCH_MIN_WEIGHT = 5.0
+BATCH_MAX_CAPTURES = 1000
+BATCH_MAX_SESSIONS = 50
+BATCH_MAX_OPEN_SESSIONS = 10
+BATCH_IDLE_TIMEOUT = 1800.0
+
+# Server API: backend ("auto", "waitress", "werkzeug", "asyncio"), pool di thread,
+# timeout (s) delle connessioni keep-alive inattive e attesa massima all'arresto
+API_SERVER_BACKEND = "auto"
+API_THREADS = 16
+API_KEEPALIVE_TIMEOUT = 15
+SERVER_SHUTDOWN_TIMEOUT = 5.0
+
+# Stream del peso: intervallo (s) dei messaggi keep-alive
+STREAM_HEARTBEAT = 15.0
+
+# Le risposte JSON serializzate vengono riusate finché lo stato non cambia;
+# /api/status al massimo per questo intervallo (s), perché i tempi del
+# lettore avanzano anche senza nuovi campioni
+STATUS_CACHE_SECONDS = 0.25
+
+# Comandi accettati dal lettore, unico proprietario del dispositivo USB
+COMMAND_RESCAN = "rescan"
+COMMAND_RECONNECT = "reconnect"
+COMMAND_TARE = "tare"
+COMMAND_ZERO = "zero"
+DEVICE_COMMANDS = (COMMAND_RESCAN, COMMAND_RECONNECT, COMMAND_TARE, COMMAND_ZERO)
+
+# Profilo di tara predefinito e lunghezza massima del nome di un profilo
+DEFAULT_PROFILE = "default"
+PROFILE_NAME_MAX_LENGTH = 64
+
+# Stati del lettore: nessun dispositivo (attesa con backoff), ricerca in
+# corso, dispositivo aperto, lettura bloccante sull'endpoint in corso
+READER_DISCONNECTED = "disconnected"
+READER_PROBING = "probing"
+READER_CONNECTED = "connected"
+READER_READING = "reading"
+READER_IDLE = "idle"
+READER_STATES = (READER_DISCONNECTED, READER_PROBING, READER_CONNECTED, READER_READING, READER_IDLE)
+
+# Classi di errore USB, ricavate dall'errno dell'eccezione
+USB_ERROR_TIMEOUT = "timeout"
+USB_ERROR_DISCONNECTED = "disconnected"
+USB_ERROR_STALL = "stall"
+USB_ERROR_TRANSIENT = "transient"
+
+# Errno che indicano un dispositivo scollegato (libusb: NO_DEVICE, NOT_FOUND)
+DISCONNECT_ERRNOS = frozenset(
+    code for code in (
+        getattr(errno, "ENODEV", None),
+        getattr(errno, "ENOENT", None),
+        getattr(errno, "ESHUTDOWN", None),
+    ) if code is not None
+)
+
+# Stato della bilancia nel report HID Dymo (byte 1)
+DYMO_STATUS_FAULT = 1
+DYMO_STATUS_STABLE_ZERO = 2
+DYMO_STATUS_IN_MOTION = 3
+DYMO_STATUS_STABLE = 4
+DYMO_STATUS_UNDER_ZERO = 5
+DYMO_STATUS_OVERLOAD = 6
+DYMO_STATUS_CALIBRATION = 7
+DYMO_STATUS_REZERO = 8
+
+# Unità di misura HID Point-of-Sale (byte 2)
+DYMO_UNITS = {1: "mg", 2: "g", 3: "kg", 11: "oz", 12: "lb"}
+UNIT_CODES = {unit: code for code, unit in DYMO_UNITS.items()}
+# Fattori di conversione in grammi
+UNIT_TO_GRAMS = {"mg": 0.001, "g": 1.0, "kg": 1000.0, "oz": 28.349523125, "lb": 453.59237}
+
+# Bucket degli istogrammi esposti su /metrics (secondi)
+METRICS_USB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Librerie libusb cercate accanto allo script, per piattaforma, prima di
+# quella di sistema; su macOS anche nelle cartelle di Homebrew e MacPorts
+LIBUSB_LIBRARIES = {
+    "win32": ("libusb-1.0.dll",),
+    "darwin": ("libusb-1.0.dylib", "libusb-1.0.0.dylib"),
+    "linux": ("libusb-1.0.so", "libusb-1.0.so.0"),
+}
+MACOS_LIBUSB_DIRS = ("/opt/homebrew/lib", "/usr/local/lib", "/opt/local/lib")
+
+# Interfaccia HID della Dymo M5/M10 (unica configurazione, unica interfaccia)
+DYMO_INTERFACE = 0
 
 # Nome dell'applicazione per il registro di Windows
 APP_NAME = "ScaleManagerLite"
 APP_PATH = os.path.abspath(sys.argv[0])
 
+
+# Metriche in formato Prometheus (text exposition 0.0.4), senza dipendenze esterne.
+# Ogni metrica ha un proprio lock, tenuto solo per l'incremento: i contatori USB
+# sono aggiornati dal solo thread di lettura, quindi il lock non è mai conteso.
+class MetricCounter:
+    kind = "counter"
+    
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+            
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+        
+    def samples(self):
+        """Righe (suffisso, etichette, valore) della metrica"""
+        with self._lock:
+            values = list(self._values.items())
+        return [("", dict(zip(self.labelnames, labels)), value) for labels, value in values]
+
+
+class MetricHistogram:
+    kind = "histogram"
+    
+    def __init__(self, name, help, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per ogni combinazione di etichette: conteggi per bucket, somma, totale
+        self._values = {}
+        self._lock = threading.Lock()
+        
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+            
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(counts), total, count)
+                      for labels, (counts, total, count) in self._values.items()]
+        rows = []
+        for labels, counts, total, count in values:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                rows.append(("_bucket", dict(base, le=repr(float(bound))), cumulative))
+            rows.append(("_bucket", dict(base, le="+Inf"), count))
+            rows.append(("_sum", base, total))
+            rows.append(("_count", base, count))
+        return rows
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        # Funzioni che producono metriche calcolate al momento della lettura
+        # (stato del lettore, client collegati): (nome, tipo, help, [(etichette, valore)])
+        self._collectors = []
+        self._lock = threading.Lock()
+        
+    def counter(self, name, help, labelnames=()) -> MetricCounter:
+        metric = MetricCounter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+        
+    def histogram(self, name, help, labelnames=(), buckets=METRICS_LATENCY_BUCKETS) -> MetricHistogram:
+        metric = MetricHistogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+        
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+            
+    def remove_collector(self, collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+                
+    @staticmethod
+    def _format_labels(labels) -> str:
+        if not labels:
+            return ""
+        parts = []
+        for key, value in labels.items():
+            value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            parts.append(f'{key}="{value}"')
+        return "{" + ",".join(parts) + "}"
+        
+    @staticmethod
+    def _format_value(value) -> str:
+        if isinstance(value, int):
+            return str(value)
+        return repr(float(value))
+        
+    def render(self) -> str:
+        """Tutte le metriche nel formato testuale di Prometheus"""
+        # Le famiglie con lo stesso nome (es. un lettore per bilancia) vengono unite
+        families = {}
+        for metric in self._metrics:
+            families[metric.name] = [metric.kind, metric.help, metric.samples()]
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                for name, kind, help, values in collector():
+                    family = families.setdefault(name, [kind, help, []])
+                    family[2].extend(("", labels, value) for labels, value in values)
+            except Exception as e:
+                logger.error(f"Errore nella raccolta delle metriche: {str(e)}")
+                
+        lines = []
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{self._format_labels(labels)} {self._format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+USB_READ_SECONDS = METRICS.histogram(
+    "scale_usb_read_seconds", "Durata delle letture USB andate a buon fine",
+    ("scale",), METRICS_USB_BUCKETS
+)
+USB_SAMPLES = METRICS.counter(
+    "scale_samples_total", "Campioni di peso decodificati (rate() = campioni al secondo)", ("scale",)
+)
+USB_READ_RETRIES = METRICS.counter(
+    "scale_usb_read_retries_total", "Letture USB ripetute dopo un errore", ("scale",)
+)
+USB_TIMEOUTS = METRICS.counter(
+    "scale_usb_timeouts_total", "Letture USB scadute senza report (bilancia ferma)", ("scale",)
+)
+USB_ERRORS = METRICS.counter(
+    "scale_usb_errors_total", "Errori USB per errno e classe (esclusi i timeout)", ("scale", "errno", "kind")
+)
+USB_RECONNECTS = METRICS.counter(
+    "scale_reconnects_total", "Riconnessioni riuscite dopo una perdita della bilancia", ("scale",)
+)
+HTTP_REQUESTS = METRICS.counter(
+    "scale_http_requests_total", "Richieste HTTP servite", ("route", "method", "status")
+)
+HTTP_REQUEST_SECONDS = METRICS.histogram(
+    "scale_http_request_seconds", "Durata delle richieste HTTP (per gli stream: fino all'apertura)",
+    ("route",), METRICS_LATENCY_BUCKETS
+)
+
+
+# Classificazione degli errori USB
+def classify_usb_error(error) -> str:
+    """Classifica un USBError in base al suo errno"""
+    if isinstance(error, usb.core.USBTimeoutError) or error.errno == errno.ETIMEDOUT:
+        return USB_ERROR_TIMEOUT
+    if error.errno in DISCONNECT_ERRNOS:
+        return USB_ERROR_DISCONNECTED
+    if error.errno == errno.EPIPE:
+        return USB_ERROR_STALL
+    return USB_ERROR_TRANSIENT
+
+
+# Campione di peso decodificato dal report HID
+class WeightSample(NamedTuple):
+    value: float
+    unit: str
+    raw: int
+    exponent: int
+    status: int
+    stable: bool
+    under_zero: bool
+    overload: bool
+    timestamp: float
+
+    @property
+    def grams(self) -> float:
+        """Peso convertito in grammi"""
+        return self.value * UNIT_TO_GRAMS.get(self.unit, 1.0)
+
+    def format_value(self) -> str:
+        """Peso formattato con il numero di decimali indicato dall'esponente"""
+        if self.exponent < 0:
+            return f"{self.value:.{-self.exponent}f}"
+        return str(self.value)
+
+    def to_dict(self) -> dict:
+        """Rappresentazione JSON del campione"""
+        return {
+            "weight": self.value,
+            "unit": self.unit,
+            "raw": self.raw,
+            "exponent": self.exponent,
+            "status": self.status,
+            "stable": self.stable,
+            "under_zero": self.under_zero,
+            "overload": self.overload,
+        }
+
+
+# Istantanea immutabile dello stato della bilancia
+class ScaleState(NamedTuple):
+    seq: int
+    weight: float
+    unit: str
+    stable: bool
+    connected: bool
+    captured_at: float
+    timestamp: float
+    sample: Optional[WeightSample]
+
+
+def scale_value(raw, exponent):
+    """Applica l'esponente del report al valore grezzo"""
+    if exponent < 0:
+        return round(raw * 10 ** exponent, -exponent)
+    return raw * 10 ** exponent
+
+
+def offset_sample(sample, grams) -> WeightSample:
+    """Sottrae `grams` al campione, convertiti nell'unità e nella risoluzione del report"""
+    step = UNIT_TO_GRAMS.get(sample.unit, 1.0) * 10 ** sample.exponent
+    raw = sample.raw - round(grams / step)
+    return sample._replace(raw=raw, value=scale_value(raw, sample.exponent), under_zero=raw < 0)
+
+
+def decode_report(data) -> Optional[WeightSample]:
+    """Decodifica un report HID della Dymo M5/M10
+
+    Formato: [report id, stato, unità, esponente con segno, peso LSB, peso MSB]
+    """
+    if not data or len(data) < 6:
+        return None
+    status = data[1]
+    unit = DYMO_UNITS.get(data[2], f"unit_{data[2]}")
+    exponent = data[3] - 256 if data[3] > 127 else data[3]
+    raw = data[4] + (256 * data[5])
+    if status == DYMO_STATUS_UNDER_ZERO:
+        raw = -raw
+    return WeightSample(
+        value=scale_value(raw, exponent),
+        unit=unit,
+        raw=raw,
+        exponent=exponent,
+        status=status,
+        stable=status in (DYMO_STATUS_STABLE, DYMO_STATUS_STABLE_ZERO),
+        under_zero=status == DYMO_STATUS_UNDER_ZERO,
+        overload=status == DYMO_STATUS_OVERLOAD,
+        timestamp=time.monotonic(),
+    )
+
+
+def usb_device_id(device) -> str:
+    """Identificativo stabile di un dispositivo USB
+
+    Usa il percorso bus/porte fisiche (stabile finché la bilancia resta sulla
+    stessa porta), altrimenti il numero di serie, altrimenti bus e indirizzo.
+    """
+    try:
+        ports = device.port_numbers
+    except Exception:
+        ports = None
+    if ports:
+        return f"{device.bus}-{'.'.join(str(port) for port in ports)}"
+    try:
+        if device.iSerialNumber:
+            serial = usb.util.get_string(device, device.iSerialNumber)
+            if serial:
+                return f"sn-{serial}"
+    except Exception:
+        pass
+    return f"{device.bus}-addr{device.address}"
+
+
+def libusb_candidates() -> list:
+    """Librerie libusb presenti sul disco da provare, nell'ordine di preferenza"""
+    if sys.platform.startswith('win'):
+        platform_key = "win32"
+    elif sys.platform == "darwin":
+        platform_key = "darwin"
+    else:
+        platform_key = "linux"
+    directories = [os.path.dirname(os.path.abspath(__file__))]
+    if platform_key == "darwin":
+        directories.extend(MACOS_LIBUSB_DIRS)
+    return [
+        os.path.join(directory, name)
+        for directory in directories
+        for name in LIBUSB_LIBRARIES[platform_key]
+        if os.path.exists(os.path.join(directory, name))
+    ]
+
+
+def load_usb_backend():
+    """Crea il backend libusb: prima le librerie note, poi la ricerca di sistema"""
+    for path in libusb_candidates():
+        backend = usb.backend.libusb1.get_backend(find_library=lambda name, path=path: path)
+        if backend is not None:
+            logger.info(f"Backend libusb creato da {path}")
+            return backend
+        logger.warning(f"Impossibile caricare libusb da {path}")
+    backend = usb.backend.libusb1.get_backend()
+    if backend is None:
+        logger.error("ERRORE: libusb-1.0 non trovata nel sistema")
+    else:
+        logger.info("Backend libusb di sistema creato con successo")
+    return backend
+
+
+_usb_backend = None
+_usb_backend_loaded = False
+_usb_backend_lock = threading.Lock()
+
+
+def get_usb_backend():
+    """Backend libusb condiviso da tutte le bilance, caricato una sola volta
+
+    Anche l'esito negativo viene ricordato: una libreria mancante non viene
+    cercata di nuovo a ogni tentativo di riconnessione.
+    """
+    global _usb_backend, _usb_backend_loaded
+    with _usb_backend_lock:
+        if not _usb_backend_loaded:
+            _usb_backend = load_usb_backend()
+            _usb_backend_loaded = True
+        return _usb_backend
+
+
 # Classe per gestire la bilancia
 class ScaleDevice:
-    def __init__(self):
+    def __init__(self, health_check_interval=HEALTH_CHECK_INTERVAL, device_id=None, backend=None):
+        # Identificativo della bilancia da usare; None per la prima trovata
+        self.device_id = device_id
         self.device = None
         self.endpoint = None
-        self.connected = False
-        self.last_weight = 0
+        # Stato pubblicato: viene sostituito in blocco ad ogni variazione, per
+        # cui chi lo legge non ha bisogno di lock. Solo gli scrittori si
+        # serializzano tra loro per non duplicare i numeri di sequenza.
+        self.state = ScaleState(
+            seq=0, weight=0, unit="g", stable=False, connected=False,
+            captured_at=time.monotonic(), timestamp=time.time(), sample=None
+        )
+        self._state_lock = threading.Lock()
+        self._state_changed = threading.Condition(self._state_lock)
+        self._sample_listeners = []
+        self._state_listeners = []
         self.device_type = "Unknown"
         self.device_name = "Unknown Scale"
-        self.backend = None
+        self.backend = backend
+        self.health_check_interval = health_check_interval
+        # Tentativi di lettura e pausa dopo un errore transitorio
+        self.max_attempts = MAX_ATTEMPTS
+        self.retry_delay = READ_RETRY_DELAY
+        self._last_alive = 0.0
+        # Ultimo dispositivo collegato e sua identità (vendor, prodotto, bus,
+        # indirizzo): finché resta sul bus la riconnessione lo riusa
+        self._known_device = None
+        self._identity = None
+        # Tara software e correzione dello zero, in grammi, sottratte ai
+        # report successivi in qualsiasi unità; le imposta il profilo attivo
+        self.tare_grams = 0.0
+        self.zero_offset = 0.0
+        # Versione delle correzioni, aumentata a ogni set_offsets: chi salva
+        # una tara presa dal lettore sa a quale profilo apparteneva
+        self.offsets_version = 0
+        self._offsets_lock = threading.Lock()
+        self._gross_sample = None
+        self._offset_listeners = []
+        # Correzione totale usata per l'ultimo peso netto: quando cambia, il
+        # netto salta senza che sul piatto sia cambiato nulla
+        self._net_offset = 0.0
+        # Tara e zero (in grammi) sottratti all'ultimo peso netto pubblicato
+        self.applied_offsets = (0.0, 0.0)
+        self._rebase_listeners = []
+        
+        # Inizializza il backend esplicitamente, se non è già stato fornito
+        if self.backend is None:
+            self._init_backend()
+    
+    @property
+    def connected(self) -> bool:
+        return self.state.connected
+    
+    @connected.setter
+    def connected(self, value):
+        if value != self.state.connected:
+            self._publish_state(connected=value)
+    
+    @property
+    def last_weight(self):
+        return self.state.weight
+    
+    @property
+    def last_sample(self) -> Optional[WeightSample]:
+        return self.state.sample
+    
+    @staticmethod
+    def _content_key(sample, connected):
+        """Contenuto pubblicato di uno stato: peso, unità, stato della bilancia e connessione"""
+        if sample is None:
+            return None, connected
+        return (sample.raw, sample.exponent, sample.unit, sample.status), connected
+        
+    def _publish_state(self, sample=None, connected=None) -> ScaleState:
+        """Pubblica atomicamente una nuova istantanea dello stato
+
+        Un report identico al precedente non crea un nuovo stato: la sequenza
+        (ETag e `since` dell'API) cambia solo quando cambia il contenuto.
+        """
+        with self._state_lock:
+            previous = self.state
+            if sample is None:
+                sample = previous.sample
+            if connected is None:
+                connected = previous.connected
+            if self._content_key(sample, connected) == self._content_key(previous.sample, previous.connected):
+                return previous
+            state = ScaleState(
+                seq=previous.seq + 1,
+                weight=sample.value if sample is not None else 0,
+                unit=sample.unit if sample is not None else "g",
+                stable=sample.stable if sample is not None else False,
+                connected=connected,
+                captured_at=time.monotonic(),
+                timestamp=time.time(),
+                sample=sample,
+            )
+            self.state = state
+            # Notifica sotto lock per mantenere l'ordine delle sequenze
+            self._notify_state(state)
+            self._state_changed.notify_all()
+        return state
+    
+    def wait_for_state(self, since, timeout, cancelled=None) -> ScaleState:
+        """Attende uno stato con sequenza successiva a `since` (long-poll)
+
+        Alla scadenza ritorna lo stato attuale. Un `since` maggiore della
+        sequenza attuale (es. dopo un riavvio) non viene atteso. L'attesa
+        termina anche quando `cancelled()` diventa vero (vedi wake_waiters).
+        """
+        state = self.state
+        if state.seq != since:
+            return state
+        with self._state_changed:
+            self._state_changed.wait_for(
+                lambda: self.state.seq != since or (cancelled is not None and cancelled()), timeout
+            )
+        return self.state
         
-        # Inizializza il backend esplicitamente
-        self._init_backend()
+    def wake_waiters(self):
+        """Risveglia i long-poll in attesa, che ricontrollano la propria condizione"""
+        with self._state_changed:
+            self._state_changed.notify_all()
     
     def _init_backend(self):
-        """Inizializza il backend libusb utilizzando la DLL nella stessa cartella dello script"""
+        """Usa il backend libusb condiviso, cercato una sola volta per processo"""
         try:
-            # Percorso alla DLL nella stessa cartella dello script
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            dll_path = os.path.join(script_dir, "libusb-1.0.dll")
-            
-            logger.info(f"Usando DLL: {dll_path}")
-            
-            # Verifica che la DLL esista
-            if not os.path.exists(dll_path):
-                logger.error(f"ERRORE: DLL non trovata in {dll_path}")
-                return False
-            
-            # Crea il backend in modo esplicito
-            self.backend = usb.backend.libusb1.get_backend(find_library=lambda x: dll_path)
-            
-            if self.backend is None:
-                logger.error("ERRORE: Impossibile creare il backend con la DLL specificata")
-                return False
-                
-            logger.info("Backend libusb creato con successo")
-            return True
-            
+            self.backend = get_usb_backend()
         except Exception as e:
             logger.error(f"Errore nell'inizializzazione del backend: {str(e)}")
-            return False
+            self.backend = None
+        return self.backend is not None
     
     def find_usb_scale(self) -> bool:
-        """Cerca una bilancia Dymo connessa via USB utilizzando il backend esplicito"""
+        """Cerca una bilancia Dymo connessa via USB utilizzando il backend esplicito
+
+        Se la bilancia usata in precedenza è ancora sul bus con lo stesso
+        indirizzo (non è stata scollegata) viene riaperta direttamente, senza
+        creare gli oggetti di tutti i dispositivi e senza riconfigurarla.
+        """
         try:
             # Verifica che il backend sia stato inizializzato
             if self.backend is None:
                 if not self._init_backend():
                     return False
             
-            # Cerca la bilancia Dymo utilizzando il backend esplicito
-            self.device = usb.core.find(
-                idVendor=DYMO_VENDOR_ID, 
-                idProduct=DYMO_PRODUCT_ID,
-                backend=self.backend
-            )
+            known = self._find_known_device()
+            device = known if known is not None else self._find_device()
             
-            if self.device is not None:
-                # Se su Linux, potrebbe essere necessario detach il kernel driver
-                if sys.platform.startswith('linux'):
-                    if self.device.is_kernel_driver_active(0):
-                        self.device.detach_kernel_driver(0)
-                
-                # Configura il dispositivo
-                self.device.set_configuration()
-                self.endpoint = self.device[0][(0,0)][0]
-                self.connected = True
+            if device is not None:
+                self._attach(device, reattach=known is not None)
+                self.device = device
+                self.endpoint = device[0][(DYMO_INTERFACE, 0)][0]
+                self._known_device = device
+                self._identity = (device.idVendor, device.idProduct, device.bus, device.address)
                 self.device_type = "USB"
                 self.device_name = "Dymo M5/M10"
-                logger.info(f"Bilancia USB trovata: {self.device_name}")
+                self._last_alive = time.monotonic()
+                # Una bilancia senza identificativo resta legata al dispositivo
+                # aperto: l'identificativo è noto prima di risultare connessa
+                if self.device_id is None:
+                    self.device_id = usb_device_id(device)
+                self.connected = True
+                logger.info(f"Bilancia USB {'riaperta' if known is not None else 'trovata'}: "
+                            f"{self.device_name} ({usb_device_id(device)})")
                 return True
             
-            logger.warning("Bilancia Dymo non trovata")
+            logger.warning(f"Bilancia Dymo non trovata{f' ({self.device_id})' if self.device_id else ''}")
             return False
             
         except Exception as e:
             logger.error(f"Errore nella ricerca della bilancia USB: {str(e)}")
             return False
-    
-    def read_weight(self) -> int:
-        """Legge il peso dalla bilancia Dymo USB con controlli migliorati"""
+            
+    def _find_known_device(self):
+        """Ultimo dispositivo usato, se è ancora presente con lo stesso indirizzo
+
+        Confronta i descrittori già in memoria di libusb, senza costruire un
+        oggetto pyusb per ogni dispositivo del bus.
+        """
+        if self._identity is None:
+            return None
+        try:
+            for dev in self.backend.enumerate_devices():
+                desc = self.backend.get_device_descriptor(dev)
+                if (desc.idVendor, desc.idProduct, desc.bus, desc.address) == self._identity:
+                    device = self._known_device or usb.core.Device(dev, self.backend)
+                    # La bilancia principale può essere stata legata a un'altra porta
+                    if self.device_id is not None and usb_device_id(device) != self.device_id:
+                        break
+                    # Stesso dispositivo mai scollegato: si riusa anche l'oggetto pyusb
+                    return device
+        except usb.core.USBError as e:
+            logger.warning(f"Errore nella ricerca della bilancia nota: {str(e)}")
+        self._forget_device()
+        return None
+        
+    def _find_device(self):
+        """Ricerca completa sul bus (prima bilancia, o quella con `device_id`)"""
+        if self.device_id is None:
+            return usb.core.find(
+                idVendor=DYMO_VENDOR_ID, 
+                idProduct=DYMO_PRODUCT_ID,
+                backend=self.backend
+            )
+        devices = usb.core.find(
+            find_all=True,
+            idVendor=DYMO_VENDOR_ID,
+            idProduct=DYMO_PRODUCT_ID,
+            backend=self.backend
+        )
+        return next((d for d in devices if usb_device_id(d) == self.device_id), None)
+        
+    def _attach(self, device, reattach=False):
+        """Prepara il dispositivo: driver del kernel, configurazione, interfaccia
+
+        Il driver del kernel staccato resta staccato finché la bilancia non
+        viene scollegata (e cambia indirizzo), quindi nella riapertura non
+        viene ricontrollato.
+        """
+        if not reattach and sys.platform.startswith('linux'):
+            if device.is_kernel_driver_active(DYMO_INTERFACE):
+                device.detach_kernel_driver(DYMO_INTERFACE)
+        self._ensure_configured(device)
+        # L'interfaccia viene reclamata subito: un dispositivo occupato da un
+        # altro processo emerge qui e non alla prima lettura
+        usb.util.claim_interface(device, DYMO_INTERFACE)
+        
+    @staticmethod
+    def _ensure_configured(device) -> bool:
+        """Imposta la configurazione solo se il dispositivo non è configurato
+
+        SET_CONFIGURATION reinizializza gli endpoint della bilancia; su un
+        dispositivo già configurato basta leggere la configurazione attiva.
+        """
+        try:
+            if device.get_active_configuration().bConfigurationValue:
+                return False
+        except usb.core.USBError:
+            # pyusb segnala così una configurazione 0 (non configurato)
+            pass
+        device.set_configuration()
+        return True
+        
+    def bind(self, device_id) -> bool:
+        """Lega la bilancia al dispositivo `device_id` se non è connessa
+
+        Da chiamare dal thread proprietario del dispositivo: una bilancia
+        connessa resta legata al dispositivo che ha aperto.
+        """
+        if self.connected:
+            return False
+        self.device_id = device_id
+        return True
+        
+    def _forget_device(self):
+        """Dimentica il dispositivo noto: alla prossima ricerca si enumera il bus"""
+        self._known_device = None
+        self._identity = None
+        
+    def read_weight(self, timeout=READ_TIMEOUT_MS) -> Optional[WeightSample]:
+        """Legge il peso dalla bilancia Dymo USB con controlli migliorati
+
+        La lettura è bloccante sull'endpoint interrupt: ritorna non appena la
+        bilancia invia un report, oppure None se entro `timeout` ms non è
+        arrivato nessun report (bilancia ferma, nessuna variazione).
+        La lettura stessa fa da controllo di connessione: gli errori USB sono
+        classificati per errno e il controllo di salute esplicito viene
+        eseguito solo dopo un errore o quando la bilancia tace da tempo.
+        """
         if not self.connected or self.device is None:
-            return 0
+            return None
             
-        attempts = MAX_ATTEMPTS
+        scale_label = self.device_id or "primary"
+        attempts = self.max_attempts
         while attempts > 0:
+            started = time.perf_counter()
             try:
-                # Verifica lo stato della connessione prima di tentare la lettura
-                if not self.is_device_connected():
-                    logger.warning("Bilancia disconnessa durante la lettura")
-                    self.connected = False
-                    self.device = None
-                    self.endpoint = None
-                    return 0
-                
                 data = self.device.read(
                     self.endpoint.bEndpointAddress, 
                     self.endpoint.wMaxPacketSize,
-                    timeout=1000
+                    timeout=timeout
                 )
-                
-                if data and len(data) >= 6:
-                    # Per Dymo M5/M10: peso in grammi = data[4] + data[5] * 256
-                    grams = data[4] + (256 * data[5])
-                    self.last_weight = grams
-                    logger.debug(f"Peso letto: {grams}g")
-                    return grams
-                else:
-                    logger.warning(f"Dati letti non validi: {data}")
-                    # Se riceviamo dati vuoti, potrebbe indicare disconnessione
-                    if not data or len(data) == 0:
-                        attempts -= 1
-                        if attempts == 0:
-                            logger.error("Dispositivo probabilmente disconnesso - dati vuoti")
-                            self.connected = False
-                            return 0
             except usb.core.USBError as e:
+                error_kind = classify_usb_error(e)
+                
+                if error_kind == USB_ERROR_TIMEOUT:
+                    # Nessun report entro il timeout: non è un errore, ma se la
+                    # bilancia tace da troppo verifichiamo che sia ancora collegata
+                    USB_TIMEOUTS.inc(scale_label)
+                    if not self.check_health():
+                        logger.warning("Bilancia non raggiungibile durante l'attesa dei dati")
+                        self._mark_disconnected()
+                    return None
+                
+                USB_ERRORS.inc(scale_label, str(e.errno), error_kind)
+                if error_kind == USB_ERROR_DISCONNECTED:
+                    logger.error(f"Dispositivo disconnesso: {str(e)}")
+                    self._mark_disconnected()
+                    return None
+                
                 attempts -= 1
-                logger.warning(f"Errore lettura USB: {str(e)}. Tentativi rimasti: {attempts}")
+                USB_READ_RETRIES.inc(scale_label)
+                logger.warning("Errore lettura USB (%s): %s. Tentativi rimasti: %d", error_kind, e, attempts)
+                
+                if error_kind == USB_ERROR_STALL:
+                    # Endpoint in stallo: basta sbloccarlo e riprovare subito
+                    try:
+                        self.device.clear_halt(self.endpoint.bEndpointAddress)
+                        continue
+                    except usb.core.USBError as halt_error:
+                        logger.warning(f"Errore nello sblocco dell'endpoint: {str(halt_error)}")
                 
-                # Disconnessione o errore critico
-                if "no such device" in str(e).lower() or "device disconnected" in str(e).lower():
+                # Errore transitorio: verifica subito lo stato del dispositivo
+                if not self.check_health(force=True):
                     logger.error("Dispositivo disconnesso")
-                    self.connected = False
-                    self.device = None
-                    self.endpoint = None
-                    return 0
+                    self._mark_disconnected()
+                    return None
                 
-                # Altrimenti prova a riconfigurare
+                # Il dispositivo risponde: si riconfigura solo se ha perso la
+                # configurazione, altrimenti si riprova dopo una breve pausa
                 try:
-                    self.device.set_configuration()
+                    self._ensure_configured(self.device)
                 except Exception as config_error:
                     logger.error(f"Errore nella riconfigurazione: {str(config_error)}")
                     self.connected = False
-                    return 0
+                    return None
                     
-                time.sleep(0.5)
+                time.sleep(self.retry_delay)
+                continue
+                
+            # La lettura è andata a buon fine: il dispositivo è vivo
+            USB_READ_SECONDS.observe(time.perf_counter() - started, scale_label)
+            self._last_alive = time.monotonic()
+            
+            sample = decode_report(data)
+            if sample is not None:
+                USB_SAMPLES.inc(scale_label)
+                self._gross_sample = sample
+                sample = self._net_sample(sample)
+                self._publish_state(sample)
+                # Si formatta solo se il debug è attivo: siamo nel percorso di ogni lettura
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Peso letto: %s%s (stato %s)", sample.format_value(), sample.unit, sample.status)
+                self._notify_sample(sample)
+                return sample
+            
+            logger.warning("Dati letti non validi: %s", data)
+            attempts -= 1
+            # Se riceviamo solo dati vuoti, potrebbe indicare disconnessione
+            if attempts == 0 and not data:
+                logger.error("Dispositivo probabilmente disconnesso - dati vuoti")
+                self.connected = False
+                return None
                 
         logger.error("Impossibile leggere il peso dalla bilancia dopo diversi tentativi")
-        return 0
+        return None
+        
+    def _net_sample(self, gross) -> WeightSample:
+        """Peso netto del campione lordo: sottrae correzione dello zero e tara
+
+        Se le correzioni sono cambiate dall'ultimo peso netto, avvisa prima i
+        listener del salto, così non lo scambiano per un articolo messo o tolto.
+        """
+        with self._offsets_lock:
+            self.applied_offsets = (self.tare_grams, self.zero_offset)
+            offset = self.zero_offset + self.tare_grams
+        sample = offset_sample(gross, offset) if offset else gross
+        if offset != self._net_offset:
+            delta = self._net_offset - offset
+            self._net_offset = offset
+            for listener in self._rebase_listeners:
+                try:
+                    listener(delta, sample)
+                except Exception as e:
+                    logger.error(f"Errore nel listener delle correzioni: {str(e)}")
+        return sample
+        
+    def set_offsets(self, tare_grams=None, zero_offset=None) -> int:
+        """Imposta tara e correzione dello zero (es. al cambio di profilo)
+
+        Il nuovo peso netto viene pubblicato con il report successivo.
+        Ritorna la nuova versione delle correzioni.
+        """
+        with self._offsets_lock:
+            if tare_grams is not None:
+                self.tare_grams = float(tare_grams)
+            if zero_offset is not None:
+                self.zero_offset = float(zero_offset)
+            self.offsets_version += 1
+            return self.offsets_version
+            
+    def set_tare(self) -> Optional[WeightSample]:
+        """Usa il peso lordo attuale (al netto dello zero) come tara e ripubblica il peso netto
+
+        Ritorna il campione lordo usato come tara, None se non c'è ancora un peso.
+        Da chiamare dal thread proprietario del dispositivo.
+        """
+        sample = self._gross_sample
+        if sample is None:
+            return None
+        with self._offsets_lock:
+            self.tare_grams = sample.grams - self.zero_offset
+            offsets = (self.tare_grams, self.zero_offset, self.offsets_version)
+        self._republish_net(sample, offsets)
+        logger.info(f"Tara impostata: {sample.format_value()}{sample.unit}")
+        return sample
+        
+    def set_zero(self) -> Optional[WeightSample]:
+        """Usa il peso lordo attuale (piatto vuoto) come zero, mantenendo la tara
+
+        Ritorna il campione lordo usato come zero, None se non c'è ancora un peso.
+        Da chiamare dal thread proprietario del dispositivo.
+        """
+        sample = self._gross_sample
+        if sample is None:
+            return None
+        with self._offsets_lock:
+            self.zero_offset = sample.grams
+            offsets = (self.tare_grams, self.zero_offset, self.offsets_version)
+        self._republish_net(sample, offsets)
+        logger.info(f"Zero impostato: {sample.format_value()}{sample.unit}")
+        return sample
+        
+    def _republish_net(self, gross, offsets):
+        """Pubblica il peso netto dell'ultimo campione e notifica le nuove correzioni"""
+        net = self._net_sample(gross._replace(timestamp=time.monotonic()))
+        self._publish_state(net)
+        self._notify_sample(net)
+        for listener in self._offset_listeners:
+            try:
+                listener(*offsets)
+            except Exception as e:
+                logger.error(f"Errore nel listener della tara: {str(e)}")
+                
+    def add_offset_listener(self, listener):
+        """Registra una funzione chiamata con (tara, zero, versione) quando il lettore li reimposta"""
+        self._offset_listeners.append(listener)
+        
+    def add_rebase_listener(self, listener):
+        """Registra una funzione chiamata con (variazione in grammi, nuovo campione netto)
+        quando tara o zero cambiano il peso netto senza che cambi il carico"""
+        self._rebase_listeners.append(listener)
+        
+    def add_sample_listener(self, listener):
+        """Registra una funzione chiamata ad ogni campione letto"""
+        self._sample_listeners.append(listener)
+        
+    def add_state_listener(self, listener):
+        """Registra una funzione chiamata ad ogni nuova istantanea dello stato"""
+        self._state_listeners.append(listener)
+        
+    def _notify_state(self, state):
+        for listener in self._state_listeners:
+            try:
+                listener(state)
+            except Exception as e:
+                logger.error(f"Errore nel listener dello stato: {str(e)}")
+        
+    def _notify_sample(self, sample):
+        """Inoltra il campione ai listener senza interrompere la lettura"""
+        for listener in self._sample_listeners:
+            try:
+                listener(sample)
+            except Exception as e:
+                logger.error(f"Errore nel listener dei campioni: {str(e)}")
+        
+    def check_health(self, force=False) -> bool:
+        """Controllo di salute a cadenza lenta
+
+        Esegue davvero il round-trip di controllo (get_active_configuration)
+        solo se forzato o se dall'ultima attività del dispositivo è passato
+        più di `health_check_interval`; altrimenti si fida delle letture.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_alive < self.health_check_interval:
+            return True
+        if not self.is_device_connected():
+            return False
+        self._last_alive = now
+        return True
+        
+    def _mark_disconnected(self):
+        """Segna la bilancia come disconnessa e rilascia i riferimenti USB
+
+        Il dispositivo non è più sul bus: l'handle viene chiuso e la
+        riconnessione ripartirà da una ricerca completa.
+        """
+        device = self.device
+        self.connected = False
+        self.device = None
+        self.endpoint = None
+        self._forget_device()
+        if device is not None:
+            try:
+                usb.util.dispose_resources(device)
+            except Exception:
+                pass
         
     def is_device_connected(self) -> bool:
         """Verifica se il dispositivo è ancora connesso"""
@@ -209,8 +1096,16 @@ class ScaleDevice:
             return False
         
     def disconnect(self):
-        """Disconnette la bilancia"""
+        """Disconnette la bilancia rilasciando interfaccia e handle
+
+        L'identità del dispositivo resta in memoria: se è ancora collegato,
+        la riconnessione lo riapre senza enumerare il bus.
+        """
         if self.device is not None:
+            try:
+                usb.util.release_interface(self.device, DYMO_INTERFACE)
+            except usb.core.USBError as e:
+                logger.debug(f"Rilascio dell'interfaccia non riuscito: {str(e)}")
             usb.util.dispose_resources(self.device)
             self.device = None
             self.endpoint = None
@@ -218,158 +1113,2446 @@ class ScaleDevice:
             logger.info("Bilancia disconnessa")
 
 
-# Worker per la lettura della bilancia in un thread separato
-class ScaleReaderWorker(QObject):
-    weight_read = pyqtSignal(int)
-    error_occurred = pyqtSignal(str)
-    connected = pyqtSignal(bool, str)
-    
-    def __init__(self, scale):
-        super().__init__()
+# Lettore della bilancia: unico proprietario dell'handle USB. Gira su un
+# thread dedicato e riceve i comandi di GUI e API tramite una coda
+class ScaleReader:
+    def __init__(self, scale, min_publish_interval=MIN_PUBLISH_INTERVAL,
+                 on_weight=None, on_error=None, on_connection=None,
+                 read_timeout_ms=READ_TIMEOUT_MS, adaptive=SAMPLING_ADAPTIVE,
+                 idle_after=SAMPLING_IDLE_AFTER, idle_interval=SAMPLING_IDLE_INTERVAL):
         self.scale = scale
         self.running = False
-        self.reconnect_timer = None
         self.consecutive_errors = 0
         self.max_consecutive_errors = 3
+        self.min_publish_interval = min_publish_interval
+        self.read_timeout_ms = read_timeout_ms
+        # Campionamento adattivo: funzioni che dicono se qualcuno attende
+        # letture fresche (stream aperti, richieste recenti)
+        self.adaptive = adaptive
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self._demand_sources = []
+        self._last_change = time.monotonic()
+        self._last_sample_key = None
+        # Callback chiamati dal thread di lettura
+        self.on_weight = on_weight
+        self.on_error = on_error
+        self.on_connection = on_connection
+        self._last_publish = 0.0
+        self._pending_weight = None
+        self._reconnect_delay = RECONNECT_MIN_DELAY
+        self._missing_reported = False
+        self._connected_once = False
+        self._commands = queue.SimpleQueue()
+        self._thread = None
+        # Stato della macchina a stati e tempo trascorso in ciascuno stato
+        self.state = READER_DISCONNECTED
+        self._state_since = time.monotonic()
+        self._state_seconds = dict.fromkeys(READER_STATES, 0.0)
+        self._state_entries = dict.fromkeys(READER_STATES, 0)
+        self._metrics_lock = threading.Lock()
         
-    def run(self):
-        """Esegue la lettura continua dalla bilancia con gestione migliorata delle disconnessioni"""
+    def start(self):
+        """Avvia il thread di lettura"""
+        if self._thread is not None and self._thread.is_alive():
+            return
         self.running = True
-        self.reconnect_timer = None
-        self.consecutive_errors = 0
+        METRICS.add_collector(self.collect_metrics)
+        self._thread = threading.Thread(
+            target=self.run,
+            name=f"ScaleReader-{self.scale.device_id or 'primary'}",
+            daemon=True
+        )
+        self._thread.start()
         
-        # Prima ricerca dispositivo USB
-        if not self.scale.connected:
-            if self.scale.find_usb_scale():
-                self.connected.emit(True, "USB")
-                self.consecutive_errors = 0
-            else:
-                self.connected.emit(False, "")
-                self.error_occurred.emit("Nessuna bilancia trovata")
-                self.start_reconnect_timer()
-                return
-                
-        # Lettura continua
-        while self.running:
+    def call(self, function) -> concurrent.futures.Future:
+        """Esegue `function` nel thread del lettore, tra una lettura e l'altra
+
+        Con il lettore fermo la funzione viene eseguita subito dal chiamante.
+        """
+        future = concurrent.futures.Future()
+        if not self.running:
+            future.set_running_or_notify_cancel()
             try:
-                if not self.scale.connected:
-                    # Se non siamo connessi, prova a riconnettersi
-                    if self.scale.find_usb_scale():
-                        self.connected.emit(True, "USB")
-                        self.consecutive_errors = 0
-                    else:
-                        # Se non ci riusciamo, attendi prima di riprovare
-                        time.sleep(2)
-                        self.consecutive_errors += 1
-                        
-                        if self.consecutive_errors >= self.max_consecutive_errors:
-                            self.error_occurred.emit("Impossibile trovare la bilancia dopo diversi tentativi")
-                            self.start_reconnect_timer()
-                            return
-                        continue
-                
-                # Tenta la lettura solo se connessi
-                weight = self.scale.read_weight()
-                
-                # Se non siamo più connessi dopo il tentativo di lettura, usciamo dal ciclo
-                if not self.scale.connected:
-                    self.connected.emit(False, "")
-                    self.error_occurred.emit("Bilancia disconnessa durante la lettura")
-                    self.start_reconnect_timer()
-                    return
-                    
-                # Leggiamo con successo, resettiamo il contatore errori
-                self.consecutive_errors = 0
-                self.weight_read.emit(weight)
-                
+                future.set_result(function())
             except Exception as e:
-                logger.error(f"Errore nel ciclo di lettura: {str(e)}")
-                self.consecutive_errors += 1
-                
-                if self.consecutive_errors >= self.max_consecutive_errors:
-                    self.error_occurred.emit(f"Errore ripetuto di lettura: {str(e)}")
-                    self.connected.emit(False, "")
-                    self.start_reconnect_timer()
-                    return
-                    
-            # Pausa tra le letture
-            time.sleep(0.2)
-            
-    def start_reconnect_timer(self):
-        """Avvia un timer per verificare periodicamente se la bilancia è stata collegata"""
-        if self.reconnect_timer is None:
-            self.reconnect_timer = QTimer()
-            self.reconnect_timer.timeout.connect(self.attempt_reconnect)
-            self.reconnect_timer.start(5000)  # Controlla ogni 5 secondi
-            
-    def attempt_reconnect(self):
-        """Tenta di riconnettersi alla bilancia"""
+                future.set_exception(e)
+            return future
+        self._commands.put((function, future))
+        return future
+        
+    def submit(self, command) -> concurrent.futures.Future:
+        """Accoda un comando per il lettore; ritorna il Future del risultato
+
+        rescan e reconnect risolvono con lo stato della connessione (bool),
+        tare e zero con il campione lordo usato (None se non c'è un peso).
+        """
+        if command not in DEVICE_COMMANDS:
+            raise ValueError(f"Comando sconosciuto: {command}")
+        future = concurrent.futures.Future()
         if not self.running:
-            if self.reconnect_timer:
-                self.reconnect_timer.stop()
-                self.reconnect_timer = None
+            future.set_exception(RuntimeError("Lettore della bilancia non attivo"))
+            return future
+        self._commands.put((command, future))
+        return future
+        
+    def add_demand_source(self, source):
+        """Registra una funzione che ritorna True se servono letture a piena velocità"""
+        self._demand_sources.append(source)
+        self.wake()
+        
+    def wake(self):
+        """Interrompe l'attesa in idle: un client chiede letture a piena velocità"""
+        if self.state == READER_IDLE:
+            self._commands.put(None)
+            
+    def _has_demand(self) -> bool:
+        for source in self._demand_sources:
+            try:
+                if source():
+                    return True
+            except Exception as e:
+                logger.error(f"Errore nella verifica dei client del lettore: {str(e)}")
+                return True
+        return False
+        
+    def _should_idle(self) -> bool:
+        """Peso invariato da idle_after secondi, nessun peso da pubblicare e nessun client"""
+        if not self.adaptive or self._pending_weight is not None:
+            return False
+        if time.monotonic() - self._last_change < self.idle_after:
+            return False
+        return not self._has_demand()
+        
+    def _emit(self, callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Errore nel callback del lettore: {str(e)}")
+            
+    def run(self):
+        """Macchina a stati del lettore, in un unico ciclo senza ricorsione
+
+        disconnected -> probing -> connected <-> reading: ogni disconnessione
+        riporta a disconnected, da cui si riprova con backoff esponenziale.
+        Con il campionamento adattivo, a bilancia ferma e senza client,
+        connected alterna reading e idle (attesa tra due letture).
+        I comandi in coda vengono eseguiti tra un passo e l'altro.
+        """
+        self.consecutive_errors = 0
+        self._set_state(READER_CONNECTED if self.scale.connected else READER_PROBING)
+        steps = {
+            READER_DISCONNECTED: self._step_disconnected,
+            READER_PROBING: self._step_probing,
+            READER_CONNECTED: self._step_connected,
+            READER_IDLE: self._step_connected,
+        }
+        try:
+            while self.running:
+                self._process_commands()
+                if not self.running:
+                    break
+                steps[self.state]()
+        finally:
+            self._cancel_pending()
+            
+    def _step_disconnected(self):
+        """Attesa con backoff esponenziale, interrotta subito da un comando"""
+        delay = self._reconnect_delay
+        self._reconnect_delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        self._wait(delay)
+        if self.state == READER_DISCONNECTED:
+            self._set_state(READER_PROBING)
+            
+    def _step_probing(self):
+        self._connect()
+        
+    def _step_connected(self):
+        """Una lettura bloccante dall'endpoint, poi la pubblicazione del peso
+
+        In idle si attende idle_interval prima della lettura: senza
+        trasferimenti in corso l'host non interroga la bilancia.
+        """
+        if self._should_idle():
+            self._set_state(READER_IDLE)
+            self._wait(self.idle_interval)
+            # Un comando eseguito durante l'attesa può aver cambiato stato
+            if not self.running or self.state != READER_IDLE:
+                return
+        self._set_state(READER_READING)
+        try:
+            # Se c'è un peso in attesa di pubblicazione, non bloccare oltre la sua scadenza
+            weight = self.scale.read_weight(timeout=self._read_timeout())
+        except Exception as e:
+            self._set_state(READER_CONNECTED)
+            logger.error(f"Errore nel ciclo di lettura: {str(e)}")
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= self.max_consecutive_errors:
+                self._emit(self.on_error, f"Errore ripetuto di lettura: {str(e)}")
+                self._drop_device()
             return
             
-        logger.info("Tentativo di riconnessione automatica alla bilancia...")
+        if not self.scale.connected:
+            self._emit(self.on_error, "Bilancia disconnessa durante la lettura")
+            self._drop_device()
+            return
+            
+        # Leggiamo con successo, resettiamo il contatore errori
+        self._set_state(READER_CONNECTED)
+        self.consecutive_errors = 0
+        if weight is not None:
+            key = (weight.raw, weight.status, weight.unit)
+            if key != self._last_sample_key:
+                self._last_sample_key = key
+                self._last_change = time.monotonic()
+        self.publish_weight(weight)
+        
+    def _set_state(self, state):
+        """Passa a un nuovo stato accumulando il tempo trascorso nel precedente"""
+        if state == self.state:
+            return
+        now = time.monotonic()
+        with self._metrics_lock:
+            self._state_seconds[self.state] += now - self._state_since
+            self._state_entries[state] += 1
+            self.state = state
+            self._state_since = now
+        logger.debug("Lettore %s: %s", self.scale.device_id or "primary", state)
+        
+    def state_metrics(self) -> dict:
+        """Stato attuale e, per ogni stato, tempo totale trascorso (s) e numero di ingressi"""
+        with self._metrics_lock:
+            elapsed = time.monotonic() - self._state_since
+            seconds = dict(self._state_seconds)
+            seconds[self.state] += elapsed
+            return {
+                "state": self.state,
+                "state_elapsed": round(elapsed, 3),
+                "reconnect_delay": self._reconnect_delay,
+                "seconds": {state: round(value, 3) for state, value in seconds.items()},
+                "entries": dict(self._state_entries),
+            }
+            
+    def collect_metrics(self):
+        """Tempo cumulativo in ogni stato e stato attuale, per /metrics"""
+        metrics = self.state_metrics()
+        scale_label = self.scale.device_id or "primary"
+        yield ("scale_reader_state_seconds_total", "counter",
+               "Tempo trascorso dal lettore in ciascuno stato",
+               [({"scale": scale_label, "state": state}, seconds)
+                for state, seconds in metrics["seconds"].items()])
+        yield ("scale_reader_state", "gauge",
+               "Stato attuale del lettore (1 = stato corrente)",
+               [({"scale": scale_label, "state": state}, int(state == metrics["state"]))
+                for state in READER_STATES])
+        
+    def _connect(self) -> bool:
+        """Cerca la bilancia; l'assenza viene notificata una sola volta finché non ricompare"""
+        self._set_state(READER_PROBING)
+        if self.scale.find_usb_scale():
+            self._set_state(READER_CONNECTED)
+            self._last_change = time.monotonic()
+            if self._connected_once:
+                USB_RECONNECTS.inc(self.scale.device_id or "primary")
+            self._connected_once = True
+            self.consecutive_errors = 0
+            self._reconnect_delay = RECONNECT_MIN_DELAY
+            self._missing_reported = False
+            self._emit(self.on_connection, True, "USB")
+            return True
+        self._set_state(READER_DISCONNECTED)
+        if not self._missing_reported:
+            self._missing_reported = True
+            self._emit(self.on_connection, False, "")
+            self._emit(self.on_error, "Nessuna bilancia trovata")
+        return False
+        
+    def _drop_device(self):
+        """Rilascia l'handle USB; la riconnessione riparte dal ritardo minimo"""
+        self.scale.disconnect()
+        self.scale.connected = False
+        self._set_state(READER_DISCONNECTED)
+        self._reconnect_delay = RECONNECT_MIN_DELAY
+        self._missing_reported = True
+        self._emit(self.on_connection, False, "")
+        
+    def _wait(self, timeout):
+        """Attende fino a `timeout` secondi, eseguendo subito un eventuale comando"""
+        try:
+            item = self._commands.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if item is not None:
+            self._execute(*item)
+            
+    def _process_commands(self):
+        """Esegue i comandi in coda senza attendere"""
+        while True:
+            try:
+                item = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self._execute(*item)
+                
+    def _execute(self, command, future):
+        """Esegue un comando nel thread proprietario del dispositivo"""
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            if callable(command):
+                result = command()
+            elif command == COMMAND_RECONNECT:
+                if self.scale.connected:
+                    self._drop_device()
+                self._missing_reported = False
+                result = self._connect()
+            elif command == COMMAND_RESCAN:
+                if self.scale.connected and not self.scale.check_health(force=True):
+                    logger.warning("Bilancia disconnessa rilevata dalla ricerca manuale")
+                    self._drop_device()
+                if not self.scale.connected:
+                    self._reconnect_delay = RECONNECT_MIN_DELAY
+                    self._missing_reported = False
+                    self._connect()
+                result = self.scale.connected
+            elif command == COMMAND_ZERO:
+                result = self.scale.set_zero()
+            else:
+                result = self.scale.set_tare()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+            
+    def _cancel_pending(self):
+        """Annulla i comandi rimasti in coda all'arresto del lettore"""
+        while True:
+            try:
+                item = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[1].cancel()
+                
+    def _read_timeout(self) -> int:
+        """Timeout (ms) della prossima lettura bloccante"""
+        if self._pending_weight is None:
+            return self.read_timeout_ms
+        remaining = self._last_publish + self.min_publish_interval - time.monotonic()
+        return max(1, min(self.read_timeout_ms, int(remaining * 1000)))
+        
+    def publish_weight(self, weight):
+        """Pubblica il peso rispettando l'intervallo minimo di pubblicazione
+
+        Un peso None (nessun nuovo report) pubblica l'eventuale peso rimasto
+        in attesa, così l'ultimo valore letto non viene mai perso.
+        """
+        if weight is None:
+            weight = self._pending_weight
+            if weight is None:
+                return
+        now = time.monotonic()
+        if now - self._last_publish < self.min_publish_interval:
+            self._pending_weight = weight
+            return
+        self._pending_weight = None
+        self._last_publish = now
+        self._emit(self.on_weight, weight)
+            
+    def stop(self, timeout=None):
+        """Ferma il lettore e attende la fine del thread"""
+        self.running = False
+        METRICS.remove_collector(self.collect_metrics)
+        # Risveglia il lettore se è in attesa di riconnessione
+        self._commands.put(None)
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+
+
+# Loop asyncio condiviso da lettori USB e server HTTP asincrono
+class AsyncScaleCore:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+        
+    def start(self):
+        """Avvia il loop di eventi nel proprio thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="AsyncScaleCore", daemon=True)
+        self._thread.start()
+        
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        # Termina i thread dell'executor predefinito (letture del registro pesate)
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Pianifica una coroutine sul loop da un qualsiasi thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+        
+    def call(self, coro, timeout=None):
+        """Esegue una coroutine sul loop e ne attende il risultato"""
+        return self.submit(coro).result(timeout)
+        
+    def stop(self):
+        """Ferma il loop; le coroutine ancora pendenti vengono abbandonate"""
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+
+
+# Lettore per il backend asincrono: lo stesso ciclo del ScaleReader gira in un
+# executor dedicato a un solo thread, così le chiamate USB bloccanti non
+# fermano mai il loop; i campioni arrivano ai client tramite l'AsyncStateHub
+class AsyncScaleReader(ScaleReader):
+    def __init__(self, scale, core, **kwargs):
+        super().__init__(scale, **kwargs)
+        self.core = core
+        self.executor = None
+        self._future = None
+        
+    def start(self):
+        """Avvia il ciclo di lettura nell'executor, pianificato dal loop condiviso"""
+        if self._future is not None and not self._future.done():
+            return
+        self.running = True
+        METRICS.add_collector(self.collect_metrics)
+        self.executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"ScaleUSB-{self.scale.device_id or 'primary'}"
+        )
+        self._future = self.core.submit(self.run_async())
+        
+    async def run_async(self):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.run)
+        
+    def stop(self, timeout=None):
+        """Ferma il ciclo di lettura e attende la fine dell'operazione USB in corso"""
+        self.running = False
+        METRICS.remove_collector(self.collect_metrics)
+        self._commands.put(None)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self._future = None
+
+
+# Registro di tutte le bilance Dymo collegate, identificate in modo stabile
+class ScaleRegistry:
+    def __init__(self, primary, binder=None):
+        # La bilancia principale è quella servita da /api/weight e dalla GUI
+        self.primary = primary
+        # Funzione (bilancia, id) che lega la principale a un dispositivo nel
+        # thread del suo lettore; senza, l'identificativo viene scritto subito
+        self.binder = binder
+        self.backend = primary.backend
+        self.scales = {}
+        self._scale_listeners = []
+        self._lock = threading.Lock()
+        
+    def add_scale_listener(self, listener):
+        """Registra una funzione chiamata per ogni nuova bilancia aggiunta"""
+        self._scale_listeners.append(listener)
+        
+    def enumerate_ids(self) -> list:
+        """Identificativi di tutte le bilance collegate, in ordine stabile"""
+        if self.backend is None:
+            return []
+        try:
+            devices = usb.core.find(
+                find_all=True,
+                idVendor=DYMO_VENDOR_ID,
+                idProduct=DYMO_PRODUCT_ID,
+                backend=self.backend
+            )
+            return sorted(usb_device_id(device) for device in devices)
+        except Exception as e:
+            logger.error(f"Errore nell'enumerazione delle bilance USB: {str(e)}")
+            return []
+            
+    def scan(self) -> list:
+        """Enumera le bilance e registra quelle nuove; ritorna le bilance aggiunte
+
+        La bilancia principale viene associata alla prima bilancia libera e
+        resta legata a quella finché è presente; le altre ricevono ciascuna
+        un proprio ScaleDevice. Le bilance scollegate restano registrate con
+        lo stesso identificativo, pronte per la riconnessione.
+        """
+        ids = self.enumerate_ids()
+        added = []
+        with self._lock:
+            primary = self.primary
+            primary_id = primary.device_id
+            if primary.connected:
+                # Il lettore ha aperto un dispositivo: la principale resta
+                # registrata con il suo identificativo, escluso dalle aggiuntive
+                if primary_id is not None and primary_id not in self.scales:
+                    self._forget_primary()
+                    self.scales[primary_id] = primary
+            elif primary_id not in ids:
+                free = [scale_id for scale_id in ids if self.scales.get(scale_id, primary) is primary]
+                if free:
+                    self._forget_primary()
+                    self.scales[free[0]] = primary
+                    self._bind_primary(free[0])
+                    
+            for scale_id in ids:
+                if scale_id not in self.scales:
+                    scale = ScaleDevice(device_id=scale_id, backend=self.backend)
+                    self.scales[scale_id] = scale
+                    added.append(scale)
+                    
+        for scale in added:
+            logger.info(f"Nuova bilancia registrata: {scale.device_id}")
+            for listener in self._scale_listeners:
+                try:
+                    listener(scale)
+                except Exception as e:
+                    logger.error(f"Errore nel listener delle bilance: {str(e)}")
+        return added
+        
+    def _forget_primary(self):
+        """Toglie dal registro gli identificativi associati alla principale"""
+        for scale_id in [scale_id for scale_id, scale in self.scales.items() if scale is self.primary]:
+            del self.scales[scale_id]
+            
+    def _bind_primary(self, scale_id):
+        if self.binder is not None:
+            self.binder(self.primary, scale_id)
+        else:
+            self.primary.device_id = scale_id
+            
+    def get(self, scale_id) -> Optional["ScaleDevice"]:
+        return self.scales.get(scale_id)
+        
+    def items(self) -> list:
+        with self._lock:
+            return sorted(self.scales.items())
+
+
+# Notifica il collegamento e lo scollegamento delle bilance Dymo: callback
+# hotplug di libusb se disponibili, altrimenti un controllo periodico a basso
+# costo che segnala solo quando l'insieme dei dispositivi cambia
+class HotplugMonitor:
+    def __init__(self, backend=None, poll_interval=HOTPLUG_POLL_INTERVAL,
+                 max_poll_interval=HOTPLUG_POLL_MAX_INTERVAL):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        # "hotplug" (callback libusb) oppure "poll" (impronta periodica)
+        self.mode = None
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._context = None
+        self._callback_handle = None
+        self._pending = False
+        
+    def add_listener(self, listener):
+        """Registra una funzione chiamata, senza argomenti, ad ogni variazione dei dispositivi"""
+        self._listeners.append(listener)
+        
+    def start(self):
+        """Avvia il rilevamento nel proprio thread"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        if self._start_hotplug():
+            self.mode = "hotplug"
+            target = self._run_hotplug
+        else:
+            self.mode = "poll"
+            target = self._run_poll
+        self._thread = threading.Thread(target=target, name="HotplugMonitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Rilevamento collegamento bilance: {self.mode}")
+        
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            
+    def _start_hotplug(self) -> bool:
+        """Registra il callback hotplug di libusb; False se non supportato"""
+        if usb1 is None:
+            return False
+        try:
+            if not usb1.hasCapability(usb1.CAP_HAS_HOTPLUG):
+                return False
+            context = usb1.USBContext()
+            context.open()
+            self._callback_handle = context.hotplugRegisterCallback(
+                self._on_hotplug,
+                flags=0,
+                vendor_id=DYMO_VENDOR_ID,
+                product_id=DYMO_PRODUCT_ID
+            )
+            self._context = context
+            return True
+        except Exception as e:
+            logger.warning(f"Notifiche hotplug libusb non disponibili: {str(e)}")
+            return False
+            
+    def _on_hotplug(self, context, device, event):
+        # Nel callback di libusb non si può fare I/O sul bus: si annota solo la variazione
+        self._pending = True
+        return False
+        
+    def _run_hotplug(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self._context.handleEventsTimeout(tv=self.poll_interval)
+                except Exception as e:
+                    logger.error(f"Errore nella gestione degli eventi hotplug: {str(e)}")
+                    self._stop_event.wait(self.poll_interval)
+                if self._pending:
+                    self._pending = False
+                    self._notify()
+        finally:
+            try:
+                self._context.hotplugDeregisterCallback(self._callback_handle)
+                self._context.close()
+            except Exception as e:
+                logger.warning(f"Errore nella chiusura del contesto hotplug: {str(e)}")
+            self._context = None
+            
+    def _fingerprint(self):
+        """Impronta dell'insieme dei dispositivi collegati, senza traffico sul bus
+
+        Su Linux basta l'elenco di sysfs; altrove si usa l'enumerazione di
+        libusb, che legge i descrittori già in memoria. None se non disponibile.
+        """
+        try:
+            if os.path.isdir(SYSFS_USB_DEVICES):
+                return frozenset(os.listdir(SYSFS_USB_DEVICES))
+            devices = usb.core.find(
+                find_all=True,
+                idVendor=DYMO_VENDOR_ID,
+                idProduct=DYMO_PRODUCT_ID,
+                backend=self.backend
+            )
+            return frozenset(usb_device_id(device) for device in devices)
+        except Exception as e:
+            logger.debug(f"Impronta dei dispositivi USB non disponibile: {str(e)}")
+            return None
+            
+    def _run_poll(self):
+        # L'elenco di sysfs non costa nulla; l'enumerazione USB sì, e finché
+        # i dispositivi non cambiano la si ripete sempre più di rado
+        backoff = not os.path.isdir(SYSFS_USB_DEVICES)
+        interval = self.poll_interval
+        previous = self._fingerprint()
+        while not self._stop_event.wait(interval):
+            current = self._fingerprint()
+            if current is not None and current != previous:
+                previous = current
+                interval = self.poll_interval
+                self._notify()
+            elif backoff:
+                interval = min(interval * 2, self.max_poll_interval)
+                
+    def _notify(self):
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Errore nel listener hotplug: {str(e)}")
+
+
+# Rilevatore di peso stabile costruito sul flusso dei campioni
+class StabilityDetector:
+    def __init__(self, window=STABILITY_WINDOW, tolerance=STABILITY_TOLERANCE,
+                 use_status_bit=STABILITY_USE_STATUS_BIT):
+        self.window = window
+        self.tolerance = tolerance
+        self.use_status_bit = use_status_bit
+        self.settle_id = 0
+        self._settle_listeners = []
+        self._samples = deque()
+        self._settled = None
+        self._condition = threading.Condition()
+        
+    def add_settle_listener(self, listener):
+        """Registra una funzione chiamata con (settle_id, campione) ad ogni nuovo assestamento"""
+        self._settle_listeners.append(listener)
+        
+    def add_sample(self, sample):
+        """Aggiunge un campione alla finestra e notifica chi attende"""
+        with self._condition:
+            if self._samples and self._samples[-1].unit != sample.unit:
+                self._samples.clear()
+            self._samples.append(sample)
+            self._evaluate(sample.timestamp)
+            self._condition.notify_all()
+            
+    def _evaluate(self, now):
+        """Aggiorna lo stato di stabilità; da chiamare con la condition acquisita
+
+        Il peso è stabile quando i campioni dell'ultima finestra restano entro
+        la tolleranza (in grammi), la finestra è interamente coperta e, se
+        richiesto, la bilancia stessa segnala il peso come stabile.
+        """
+        # Scarta i campioni usciti dalla finestra, mantenendo l'ultimo che
+        # era ancora valido all'inizio della finestra
+        while len(self._samples) > 1 and self._samples[1].timestamp <= now - self.window:
+            self._samples.popleft()
+            
+        latest = self._samples[-1] if self._samples else None
+        stable = (
+            latest is not None
+            and not latest.overload
+            and self._samples[0].timestamp <= now - self.window
+            and (latest.stable or not self.use_status_bit)
+        )
+        if stable:
+            values = [s.grams for s in self._samples]
+            stable = max(values) - min(values) <= self.tolerance
+            
+        if not stable:
+            self._settled = None
+            return
+        if self._settled is None:
+            self.settle_id += 1
+            for listener in self._settle_listeners:
+                try:
+                    listener(self.settle_id, latest)
+                except Exception as e:
+                    logger.error(f"Errore nel listener degli assestamenti: {str(e)}")
+        self._settled = latest
+            
+    def current(self):
+        """Ritorna (settle_id, campione) se il peso è stabile ora, altrimenti None"""
+        with self._condition:
+            if self._samples:
+                self._evaluate(time.monotonic())
+            if self._settled is None:
+                return None
+            return self.settle_id, self._settled
+            
+    def rebase(self, delta, sample):
+        """Sposta la finestra di `delta` grammi dopo un cambio di tara o zero
+
+        Il carico sul piatto non è cambiato: un peso già assestato resta tale,
+        con lo stesso identificativo, invece di contare come nuova pesata.
+        """
+        with self._condition:
+            self._samples = deque(offset_sample(s, -delta) for s in self._samples)
+            if self._settled is not None:
+                self._settled = offset_sample(self._settled, -delta)
+            self._condition.notify_all()
+            
+    def wait_for_stable(self, timeout, after=None, cancelled=None):
+        """Attende un peso stabile per al massimo `timeout` secondi
+
+        Se `after` è indicato, attende un assestamento successivo a quello
+        con quell'identificativo (cioè una nuova pesata).
+        Ritorna (settle_id, campione) oppure None alla scadenza o quando
+        `cancelled()` diventa vero (vedi wake_waiters).
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._samples:
+                    self._evaluate(now)
+                if self._settled is not None and (after is None or self.settle_id > after):
+                    return self.settle_id, self._settled
+                remaining = deadline - now
+                if remaining <= 0 or (cancelled is not None and cancelled()):
+                    return None
+                # La finestra può completarsi anche senza nuovi report:
+                # rivaluta almeno una volta per finestra
+                self._condition.wait(min(remaining, self.window))
+                
+    def wake_waiters(self):
+        """Risveglia chi attende un peso stabile, che ricontrolla la propria condizione"""
+        with self._condition:
+            self._condition.notify_all()
+
+
+# Storico delle letture in un buffer circolare a capacità fissa, su array compatti
+class WeightHistory:
+    FLAG_CONNECTED = 0x01
+    FLAG_STABLE = 0x02
+    
+    def __init__(self, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.seq = array('q', bytes(8 * capacity))
+        self.captured_at = array('d', bytes(8 * capacity))
+        self.timestamp = array('d', bytes(8 * capacity))
+        self.raw = array('l', bytes(array('l').itemsize * capacity))
+        self.exponent = array('b', bytes(capacity))
+        self.unit = array('B', bytes(capacity))
+        self.status = array('B', bytes(capacity))
+        self.flags = array('B', bytes(capacity))
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        
+    def __len__(self):
+        return self._count
+        
+    def append(self, state):
+        """Registra un'istantanea dello stato sovrascrivendo la più vecchia"""
+        sample = state.sample
+        flags = (self.FLAG_CONNECTED if state.connected else 0) | (self.FLAG_STABLE if state.stable else 0)
+        with self._lock:
+            if self._count < self.capacity:
+                index = (self._start + self._count) % self.capacity
+                self._count += 1
+            else:
+                index = self._start
+                self._start = (self._start + 1) % self.capacity
+            self.seq[index] = state.seq
+            self.captured_at[index] = state.captured_at
+            self.timestamp[index] = state.timestamp
+            self.raw[index] = sample.raw if sample is not None else 0
+            self.exponent[index] = sample.exponent if sample is not None else 0
+            self.unit[index] = UNIT_CODES.get(state.unit, 0)
+            self.status[index] = sample.status if sample is not None else 0
+            self.flags[index] = flags
+            
+    def _bisect(self, column, target):
+        """Prima posizione logica con valore > target (colonna crescente)"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if column[(self._start + middle) % self.capacity] <= target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+        
+    def query(self, since=None, max_age=None, limit=HISTORY_DEFAULT_LIMIT) -> list:
+        """Ritorna al massimo `limit` letture
+
+        Con `since` le letture con sequenza successiva, con `max_age` quelle
+        degli ultimi `max_age` secondi (dalla più vecchia), altrimenti le
+        `limit` più recenti. Viene copiata solo la porzione richiesta.
+        """
+        with self._lock:
+            if since is not None:
+                first = self._bisect(self.seq, since)
+            elif max_age is not None:
+                first = self._bisect(self.captured_at, time.monotonic() - max_age)
+            else:
+                first = max(0, self._count - limit)
+            last = min(self._count, first + limit)
+            rows = []
+            for position in range(first, last):
+                index = (self._start + position) % self.capacity
+                rows.append((
+                    self.seq[index], self.timestamp[index], self.raw[index], self.exponent[index],
+                    self.unit[index], self.status[index], self.flags[index]
+                ))
+        return [
+            {
+                "seq": seq,
+                "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+                "weight": scale_value(raw, exponent),
+                "unit": DYMO_UNITS.get(unit, "g"),
+                "status": status,
+                "stable": bool(flags & self.FLAG_STABLE),
+                "connected": bool(flags & self.FLAG_CONNECTED),
+            }
+            for seq, timestamp, raw, exponent, unit, status, flags in rows
+        ]
+
+
+# Registro persistente delle pesate assestate, a record binari di dimensione fissa
+class WeightJournal:
+    MAGIC = b"SCALEJNL"
+    VERSION = 2
+    # magic, versione, dimensione del record
+    HEADER = struct.Struct("<8sHH4x")
+    # timestamp, settle_id, valore grezzo netto, esponente, unità, stato, flag,
+    # tara e correzione dello zero in grammi applicate al peso
+    RECORD = struct.Struct("<dqibBBBdd")
+    # Versione 1, senza tara e zero: ancora leggibile
+    RECORDS = {1: struct.Struct("<dqibBBB"), 2: RECORD}
+    FLAG_UNDER_ZERO = 0x01
+    FLAG_OVERLOAD = 0x02
+    
+    def __init__(self, directory=JOURNAL_DIRECTORY, max_bytes=JOURNAL_MAX_BYTES,
+                 rotate_seconds=JOURNAL_ROTATE_SECONDS, fsync_interval=JOURNAL_FSYNC_INTERVAL,
+                 fsync_batch=JOURNAL_FSYNC_BATCH):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._file = None
+        self._opened_at = 0.0
+        
+    def start(self):
+        """Avvia il thread di scrittura"""
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="WeightJournal", daemon=True)
+        self._thread.start()
+        logger.info(f"Registro pesate attivo in {os.path.abspath(self.directory)}")
+        
+    def close(self):
+        """Scrive i record in coda, sincronizza su disco e ferma il thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        
+    def record_settled(self, settle_id, sample, tare=0.0, zero_offset=0.0):
+        """Accoda una pesata assestata (netta) con le correzioni applicate: non blocca mai il chiamante"""
+        self._queue.put((time.time(), settle_id, sample, tare, zero_offset))
+        
+    def _run(self):
+        unsynced = 0
+        last_sync = time.monotonic()
+        running = True
+        while running:
+            try:
+                batch = [self._queue.get(timeout=self.fsync_interval)]
+            except queue.Empty:
+                batch = []
+            # Raccoglie tutto ciò che è già in coda per scriverlo in blocco
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is None:
+                    running = False
+                    continue
+                try:
+                    self._write(*item)
+                    unsynced += 1
+                except Exception as e:
+                    logger.error(f"Errore nella scrittura del registro pesate: {str(e)}")
+            now = time.monotonic()
+            if unsynced and (not running or unsynced >= self.fsync_batch or now - last_sync >= self.fsync_interval):
+                self._sync()
+                unsynced = 0
+                last_sync = now
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            
+    def _write(self, timestamp, settle_id, sample, tare, zero_offset):
+        if self._file is None or self._should_rotate():
+            self._rotate()
+        flags = (self.FLAG_UNDER_ZERO if sample.under_zero else 0) | (self.FLAG_OVERLOAD if sample.overload else 0)
+        self._file.write(self.RECORD.pack(
+            timestamp, settle_id, sample.raw, sample.exponent,
+            UNIT_CODES.get(sample.unit, 0), sample.status, flags, tare, zero_offset
+        ))
+        
+    def _sync(self):
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception as e:
+            logger.error(f"Errore nella sincronizzazione del registro pesate: {str(e)}")
+            
+    def _should_rotate(self) -> bool:
+        return (self._file.tell() >= self.max_bytes
+                or time.time() - self._opened_at >= self.rotate_seconds)
+        
+    def _rotate(self):
+        """Chiude il file corrente e ne apre uno nuovo"""
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        name = datetime.now().strftime("weights-%Y%m%d-%H%M%S-%f.bin")
+        self._file = open(os.path.join(self.directory, name), "ab", buffering=JOURNAL_BUFFER_SIZE)
+        self._file.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.RECORD.size))
+        self._opened_at = time.time()
+        
+    def _files(self) -> list:
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.startswith("weights-") and n.endswith(".bin"))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, n) for n in names]
+        
+    def _search(self, view, record, count, target) -> int:
+        """Primo record con timestamp >= target (i record sono in ordine di tempo)"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            timestamp = record.unpack_from(view, self.HEADER.size + middle * record.size)[0]
+            if timestamp < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+        
+    def query(self, start=None, end=None, limit=JOURNAL_QUERY_LIMIT) -> list:
+        """Pesate registrate tra `start` ed `end` (timestamp epoch), dalla più vecchia
+
+        I file vengono letti tramite mmap; i record ancora nel buffer di
+        scrittura compaiono entro `fsync_interval` secondi.
+        """
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        results = []
+        for path in self._files():
+            if len(results) >= limit:
+                break
+            try:
+                with open(path, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if size <= self.HEADER.size:
+                        continue
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                        magic, version, record_size = self.HEADER.unpack_from(view, 0)
+                        layout = self.RECORDS.get(version)
+                        if magic != self.MAGIC or layout is None or record_size != layout.size:
+                            logger.warning(f"File di registro non riconosciuto: {path}")
+                            continue
+                        count = (size - self.HEADER.size) // layout.size
+                        index = self._search(view, layout, count, start)
+                        while index < count and len(results) < limit:
+                            record = layout.unpack_from(view, self.HEADER.size + index * layout.size)
+                            if record[0] > end:
+                                break
+                            results.append(self._record_dict(record))
+                            index += 1
+            except (OSError, ValueError) as e:
+                logger.error(f"Errore nella lettura del registro {path}: {str(e)}")
+        return results
+        
+    def _record_dict(self, record) -> dict:
+        """Pesata registrata; i record della versione 1 non hanno tara, zero né peso lordo"""
+        timestamp, settle_id, raw, exponent, unit, status, flags = record[:7]
+        unit = DYMO_UNITS.get(unit, "g")
+        tare, zero_offset, gross = None, None, None
+        if len(record) > 7:
+            tare, zero_offset = record[7:]
+            step = UNIT_TO_GRAMS.get(unit, 1.0) * 10 ** exponent
+            gross = scale_value(raw + round((tare + zero_offset) / step), exponent)
+        return {
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+            "settle_id": settle_id,
+            "weight": scale_value(raw, exponent),
+            "gross_weight": gross,
+            "unit": unit,
+            "raw": raw,
+            "exponent": exponent,
+            "status": status,
+            "under_zero": bool(flags & self.FLAG_UNDER_ZERO),
+            "overload": bool(flags & self.FLAG_OVERLOAD),
+            "tare": tare,
+            "zero_offset": zero_offset,
+        }
+
+
+# Sessione di pesatura a lotti: registra un peso assestato per ogni articolo
+# appoggiato, rilevando il ciclo appoggio -> assestamento -> rimozione
+class BatchSession:
+    def __init__(self, session_id, name=None, min_weight=BATCH_MIN_WEIGHT,
+                 max_captures=BATCH_MAX_CAPTURES):
+        self.id = session_id
+        self.name = name
+        self.min_weight = min_weight
+        self.max_captures = max_captures
+        self.started_at = time.time()
+        self.closed_at = None
+        self.expired = False
+        # Ultima pesata o richiesta sulla sessione (orologio monotono)
+        self.last_activity = time.monotonic()
+        self.captures = []
+        # Pronta a registrare un nuovo articolo: si riarma quando il piatto torna vuoto
+        self.armed = True
+        # Peso netto subito dopo un cambio di tara o zero: finché il carico non
+        # si sposta da qui, un piatto "vuoto" è solo l'effetto della correzione
+        self.held_at = None
+        
+    @property
+    def open(self) -> bool:
+        return self.closed_at is None
+        
+    def is_empty(self, sample) -> bool:
+        """Piatto vuoto (o sotto zero): l'articolo precedente è stato tolto"""
+        return sample.under_zero or sample.grams < self.min_weight
+        
+    def add_sample(self, sample):
+        if self.held_at is not None:
+            if abs(sample.grams - self.held_at) < self.min_weight:
+                return
+            self.held_at = None
+        if not self.armed and self.is_empty(sample):
+            self.armed = True
+            
+    def rebase(self, sample):
+        """Tara o zero sono cambiati: l'articolo sul piatto resta lo stesso"""
+        if not self.armed:
+            self.held_at = sample.grams
+            
+    def on_settled(self, settle_id, sample):
+        """Registra il peso assestato se è il primo dall'ultima rimozione"""
+        if not self.armed or sample.overload or self.is_empty(sample):
+            return
+        if len(self.captures) >= self.max_captures:
+            return
+        self.armed = False
+        self.captures.append((time.time(), settle_id, sample))
+        self.last_activity = time.monotonic()
+        
+    def close(self):
+        if self.closed_at is None:
+            self.closed_at = time.time()
+            self.armed = False
+            
+    def statistics(self) -> dict:
+        """Numero di articoli e statistiche dei pesi, in grammi"""
+        grams = [sample.grams for _, _, sample in self.captures]
+        if not grams:
+            return {"count": 0, "total": 0.0, "mean": None, "min": None, "max": None, "stdev": None, "unit": "g"}
+        return {
+            "count": len(grams),
+            "total": round(sum(grams), 3),
+            "mean": round(statistics.fmean(grams), 3),
+            "min": round(min(grams), 3),
+            "max": round(max(grams), 3),
+            "stdev": round(statistics.stdev(grams), 3) if len(grams) > 1 else 0.0,
+            "unit": "g",
+        }
+        
+    def to_dict(self, captures=True) -> dict:
+        """Rappresentazione JSON della sessione, con o senza l'elenco delle pesate"""
+        payload = {
+            "id": self.id,
+            "name": self.name,
+            "open": self.open,
+            "expired": self.expired,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "closed_at": datetime.fromtimestamp(self.closed_at).isoformat() if self.closed_at else None,
+            "min_weight": self.min_weight,
+            "waiting_removal": self.open and not self.armed,
+            "statistics": self.statistics(),
+        }
+        if captures:
+            payload["captures"] = [
+                dict(
+                    sample.to_dict(),
+                    index=index,
+                    settle_id=settle_id,
+                    grams=round(sample.grams, 3),
+                    timestamp=datetime.fromtimestamp(timestamp).isoformat()
+                )
+                for index, (timestamp, settle_id, sample) in enumerate(self.captures, 1)
+            ]
+        return payload
+
+
+# Sessioni di pesatura a lotti della bilancia principale, alimentate dal
+# flusso dei campioni e dagli assestamenti del rilevatore di stabilità
+class BatchSessionManager:
+    def __init__(self, stability, max_sessions=BATCH_MAX_SESSIONS,
+                 max_open_sessions=BATCH_MAX_OPEN_SESSIONS, idle_timeout=BATCH_IDLE_TIMEOUT):
+        self.stability = stability
+        self.max_sessions = max_sessions
+        self.max_open_sessions = max_open_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        stability.add_settle_listener(self.on_settled)
+        
+    def has_open(self) -> bool:
+        with self._lock:
+            self._expire_idle()
+            return any(session.open for session in self.sessions.values())
+            
+    def _expire_idle(self):
+        """Chiude le sessioni aperte e dimenticate; da chiamare con il lock acquisito
+
+        Una sessione aperta tiene il lettore a piena velocità ed elabora ogni
+        campione: un client che non la chiude non deve farlo per sempre.
+        """
+        now = time.monotonic()
+        for session in self.sessions.values():
+            if session.open and now - session.last_activity > self.idle_timeout:
+                session.close()
+                session.expired = True
+                logger.info(f"Sessione di pesatura {session.id} chiusa per inattività")
+                
+    def start(self, name=None, min_weight=BATCH_MIN_WEIGHT) -> Optional[BatchSession]:
+        """Apre una nuova sessione; un articolo già assestato sul piatto viene registrato subito
+
+        Ritorna None se ci sono già max_open_sessions sessioni aperte.
+        """
+        current = self.stability.current()
+        with self._lock:
+            self._expire_idle()
+            if sum(session.open for session in self.sessions.values()) >= self.max_open_sessions:
+                return None
+            session = BatchSession(self._next_id, name=name, min_weight=min_weight)
+            self._next_id += 1
+            if current is not None:
+                session.on_settled(*current)
+            self.sessions[session.id] = session
+            # Oltre il limite si dimenticano le sessioni chiuse più vecchie
+            closed = [session_id for session_id, s in self.sessions.items() if not s.open]
+            for session_id in closed[:max(0, len(self.sessions) - self.max_sessions)]:
+                del self.sessions[session_id]
+        logger.info(f"Sessione di pesatura {session.id} avviata")
+        return session
+        
+    def close(self, session_id) -> Optional[BatchSession]:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None and session.open:
+                session.close()
+                logger.info(f"Sessione di pesatura {session.id} chiusa: {len(session.captures)} articoli")
+        return session
+        
+    def add_sample(self, sample):
+        with self._lock:
+            for session in self.sessions.values():
+                if session.open:
+                    session.add_sample(sample)
+                    
+    def rebase(self, delta, sample):
+        with self._lock:
+            for session in self.sessions.values():
+                if session.open:
+                    session.rebase(sample)
+                    
+    def on_settled(self, settle_id, sample):
+        with self._lock:
+            for session in self.sessions.values():
+                if session.open:
+                    session.on_settled(settle_id, sample)
+                    
+    def payload(self, session_id):
+        """Corpo JSON e codice HTTP di una sessione"""
+        with self._lock:
+            self._expire_idle()
+            session = self.sessions.get(session_id)
+            if session is None:
+                return {"error": f"Sessione sconosciuta: {session_id}"}, 404
+            session.last_activity = time.monotonic()
+            return session.to_dict(), 200
+            
+    def list_payload(self) -> dict:
+        """Corpo JSON dell'elenco delle sessioni, senza le singole pesate"""
+        with self._lock:
+            self._expire_idle()
+            sessions = [session.to_dict(captures=False) for session in self.sessions.values()]
+        return {"count": len(sessions), "sessions": sessions}
+
+
+# Profili di tara della bilancia principale: per ogni profilo (es. un tipo di
+# contenitore) tara e correzione dello zero in grammi, applicate dalla
+# bilancia a ogni report e salvate nel file di impostazioni se disponibile
+class TareProfiles:
+    def __init__(self, scale, settings_manager=None):
+        self.scale = scale
+        self.settings_manager = settings_manager
+        self.profiles = {DEFAULT_PROFILE: {"tare": 0.0, "zero_offset": 0.0}}
+        self.current = DEFAULT_PROFILE
+        if settings_manager is not None:
+            profiles, current = settings_manager.get_profiles()
+            for name, values in profiles.items():
+                try:
+                    profile = {
+                        "tare": float(values.get("tare", 0.0)),
+                        "zero_offset": float(values.get("zero_offset", 0.0)),
+                    }
+                    if not all(math.isfinite(value) for value in profile.values()):
+                        raise ValueError("valore non finito")
+                except (AttributeError, ValueError, TypeError) as e:
+                    logger.error(f"Profilo di tara non valido ignorato: {name} ({str(e)})")
+                    continue
+                self.profiles[name] = profile
+            if current in self.profiles:
+                self.current = current
+        self._lock = threading.Lock()
+        # Versione delle correzioni applicate alla bilancia dal profilo attivo
+        self._applied_version = None
+        # Il file di impostazioni viene scritto da un thread dedicato: tara e
+        # zero arrivano dal lettore, che non deve attendere il disco
+        self._save_queue = queue.SimpleQueue()
+        self._save_thread = None
+        if settings_manager is not None:
+            self._save_thread = threading.Thread(target=self._run_saves, name="TareProfiles", daemon=True)
+            self._save_thread.start()
+        # Tara e zero presi dal lettore vengono salvati nel profilo attivo
+        scale.add_offset_listener(self.on_offsets_changed)
+        self._apply()
+        
+    @staticmethod
+    def valid_name(name) -> bool:
+        return bool(name) and len(name) <= PROFILE_NAME_MAX_LENGTH and name.strip() == name
+        
+    def _apply(self):
+        profile = self.profiles[self.current]
+        self._applied_version = self.scale.set_offsets(profile["tare"], profile["zero_offset"])
+        
+    def _save(self):
+        """Chiede il salvataggio dei profili: non blocca mai il chiamante"""
+        if self._save_thread is not None:
+            self._save_queue.put(True)
+            
+    def _run_saves(self):
+        running = True
+        while running:
+            # Più richieste in coda diventano un solo salvataggio dei valori più recenti
+            pending = [self._save_queue.get()]
+            while True:
+                try:
+                    pending.append(self._save_queue.get_nowait())
+                except queue.Empty:
+                    break
+            running = None not in pending
+            if any(pending):
+                with self._lock:
+                    profiles = {name: dict(values) for name, values in self.profiles.items()}
+                    current = self.current
+                self.settings_manager.update_profiles(profiles, current)
+                
+    def close(self):
+        """Salva le modifiche in sospeso e ferma il thread di salvataggio"""
+        if self._save_thread is None:
+            return
+        self._save_queue.put(None)
+        self._save_thread.join()
+        self._save_thread = None
+        
+    def select(self, name, tare=None, zero_offset=None) -> dict:
+        """Attiva il profilo `name`, creandolo se non esiste, e ne aggiorna i valori indicati
+
+        Un nuovo profilo parte senza tara e con la correzione dello zero del
+        profilo attivo, che dipende dalla bilancia e non dal contenitore.
+        """
+        with self._lock:
+            if name not in self.profiles:
+                self.profiles[name] = {"tare": 0.0, "zero_offset": self.profiles[self.current]["zero_offset"]}
+                logger.info(f"Profilo di tara creato: {name}")
+            self.current = name
+            profile = self.profiles[name]
+            if tare is not None:
+                profile["tare"] = float(tare)
+            if zero_offset is not None:
+                profile["zero_offset"] = float(zero_offset)
+            self._apply()
+            self._save()
+            return self._profile_dict(name)
+            
+    def update_current(self, tare=None, zero_offset=None) -> dict:
+        """Aggiorna tara e/o zero del profilo attivo"""
+        return self.select(self.current, tare=tare, zero_offset=zero_offset)
+        
+    def on_offsets_changed(self, tare, zero_offset, version):
+        """Salva nel profilo attivo la tara o lo zero presi dal lettore
+
+        Se nel frattempo è stato attivato un altro profilo, i valori
+        appartengono al precedente e vengono scartati.
+        """
+        with self._lock:
+            if version != self._applied_version:
+                logger.warning("Tara scartata: il profilo attivo è cambiato durante la misura")
+                return
+            self.profiles[self.current] = {"tare": tare, "zero_offset": zero_offset}
+            self._save()
+            
+    def _profile_dict(self, name) -> dict:
+        profile = self.profiles[name]
+        return {"name": name, "tare": round(profile["tare"], 3), "zero_offset": round(profile["zero_offset"], 3)}
+        
+    def current_dict(self) -> dict:
+        with self._lock:
+            return self._profile_dict(self.current)
+            
+    def payload(self) -> dict:
+        """Corpo JSON dell'elenco dei profili"""
+        with self._lock:
+            return {
+                "current": self.current,
+                "unit": "g",
+                "profiles": [self._profile_dict(name) for name in sorted(self.profiles)],
+            }
+
+
+# Abbonato allo stream: conserva solo l'ultimo stato non ancora inviato,
+# perché ogni evento porta lo stato completo e quelli intermedi sono superati
+class StreamSubscription:
+    def __init__(self):
+        self.latest = None
+        self.closed = False
+        self._condition = threading.Condition()
+        
+    def put(self, state):
+        with self._condition:
+            self.latest = state
+            self._condition.notify()
+            
+    def close(self):
+        """Chiude l'abbonamento e risveglia il client in attesa"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+            
+    def get(self, timeout) -> Optional[ScaleState]:
+        """Attende un nuovo stato e lo ritorna; None alla scadenza o alla chiusura"""
+        with self._condition:
+            if self.latest is None and not self.closed:
+                self._condition.wait(timeout)
+            state, self.latest = self.latest, None
+            return state
+
+
+# Distribuisce ogni nuovo stato della bilancia a tutti gli abbonati allo stream
+class StateBroadcaster:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+        
+    def subscribe(self) -> StreamSubscription:
+        subscription = StreamSubscription()
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+        
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            
+    def close_all(self):
+        """Chiude tutti gli stream aperti (all'arresto del server)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
+            
+    def publish(self, state):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(state)
+
+
+# Abbonamento asincrono allo stream: come StreamSubscription, ma attende nel loop
+class AsyncSubscription:
+    def __init__(self):
+        self.latest = None
+        self.closed = False
+        self._event = asyncio.Event()
+        
+    def put(self, state):
+        self.latest = state
+        self._event.set()
+        
+    def close(self):
+        self.closed = True
+        self._event.set()
+        
+    async def get(self, timeout) -> Optional[ScaleState]:
+        """Attende un nuovo stato e lo ritorna; None alla scadenza o alla chiusura"""
+        if self.latest is None and not self.closed:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._event.clear()
+        state, self.latest = self.latest, None
+        return state
+
+
+# Porta nel loop asyncio gli stati pubblicati dallo ScaleDevice (dal thread
+# USB): risveglia i long-poll e alimenta gli stream, senza un thread per client
+class AsyncStateHub:
+    def __init__(self, scale, loop):
+        self.scale = scale
+        self.loop = loop
+        self._changed = None
+        self._subscribers = set()
+        scale.add_state_listener(self._on_state_threadsafe)
+        
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+        
+    def _on_state_threadsafe(self, state):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self._on_state, state)
+        
+    def _on_state(self, state):
+        changed, self._changed = self._changed, None
+        if changed is not None and not changed.done():
+            changed.set_result(state)
+        for subscription in self._subscribers:
+            subscription.put(state)
+            
+    async def wait_for_change(self, timeout) -> bool:
+        """Attende un nuovo stato per al massimo `timeout` secondi"""
+        if self._changed is None:
+            self._changed = self.loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._changed), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+            
+    async def wait_for_state(self, since, timeout, cancelled=None) -> ScaleState:
+        """Versione asincrona di ScaleDevice.wait_for_state (long-poll)"""
+        deadline = self.loop.time() + timeout
+        while self.scale.state.seq == since and not (cancelled is not None and cancelled()):
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            await self.wait_for_change(remaining)
+        return self.scale.state
+        
+    def wake_waiters(self):
+        """Risveglia i long-poll in attesa, che ricontrollano la propria condizione"""
+        changed, self._changed = self._changed, None
+        if changed is not None and not changed.done():
+            changed.set_result(self.scale.state)
+        
+    def subscribe(self) -> AsyncSubscription:
+        subscription = AsyncSubscription()
+        self._subscribers.add(subscription)
+        return subscription
+        
+    def unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+        
+    def close_all(self):
+        """Chiude tutti gli stream aperti (all'arresto del server)"""
+        subscribers = list(self._subscribers)
+        self._subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
+
+
+# Intestazioni delle risposte Server-Sent Events
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+# Backend di serving HTTP: waitress (pool di thread, consigliato) se installato
+class WaitressServerBackend:
+    name = "waitress"
+    
+    def __init__(self, api, host, port, threads, keepalive_timeout):
+        # Il socket viene aperto subito, così gli errori di bind emergono in start()
+        self.server = create_waitress_server(
+            api.app, host=host, port=port, threads=threads,
+            channel_timeout=keepalive_timeout, ident="ScaleManagerLite"
+        )
+        
+    def serve(self):
+        self.server.run()
+        
+    def shutdown(self, timeout=SERVER_SHUTDOWN_TIMEOUT):
+        """Arresto pulito: completa le richieste in corso, poi chiude tutti i socket"""
+        self.server.task_dispatcher.shutdown(cancel_pending=False, timeout=timeout)
+        # La chiusura deve avvenire nel thread del loop di waitress
+        self.server.trigger.pull_trigger(lambda: wasyncore.close_all(self.server._map))
+
+
+# Backend di serving HTTP: server multithread di werkzeug (incluso con Flask)
+class WerkzeugServerBackend:
+    name = "werkzeug"
+    
+    def __init__(self, api, host, port, threads, keepalive_timeout):
+        # werkzeug usa un thread per richiesta e chiude sempre la connessione:
+        # pool di thread e keep-alive sono disponibili solo con waitress
+        self.server = make_server(host, port, api.app, threaded=True)
+        self.server.daemon_threads = True
+        
+    def serve(self):
+        self.server.serve_forever()
+        
+    def shutdown(self, timeout=SERVER_SHUTDOWN_TIMEOUT):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Backend di serving HTTP asincrono (aiohttp): long-poll e stream sono
+# coroutine sul loop condiviso con i lettori USB, non thread del sistema
+# Parametri delle route aiohttp, convertiti nel formato di Flask per le metriche
+ASYNC_INT_ROUTE_PARAM = re.compile(r"\{(\w+):\\d\+\}")
+ASYNC_ROUTE_PARAM = re.compile(r"\{(\w+)\}")
+# Istante di arrivo di una richiesta, per la durata nelle metriche (chiave
+# tipizzata di aiohttp; le versioni che non la prevedono usano una stringa)
+if web is not None and hasattr(web, "RequestKey"):
+    REQUEST_STARTED = web.RequestKey("scale_started", float)
+else:
+    REQUEST_STARTED = "scale.started"
+
+
+class AsyncioServerBackend:
+    name = "asyncio"
+    
+    def __init__(self, api, host, port, threads, keepalive_timeout):
+        self.api = api
+        self.hub = api.async_hub()
+        self.core = api.core
+        self._stopped = threading.Event()
+        # Route registrate, con il loro nome nel formato di Flask per le metriche
+        self._route_labels = {}
+        
+        @web.middleware
+        async def start_request_timer(request, handler):
+            request[REQUEST_STARTED] = time.perf_counter()
+            self.api.note_request(request.path)
+            return await handler(request)
+            
+        app = web.Application(middlewares=[start_request_timer])
+        # Le metriche sono registrate all'invio degli header, come con Flask
+        app.on_response_prepare.append(self._record_request_metrics)
+        self._add_route(app.router.add_get, '/api/weight', self.get_weight)
+        self._add_route(app.router.add_get, '/api/weight/stable', self.get_stable_weight)
+        self._add_route(app.router.add_get, '/api/weight/stream', self.stream_weight)
+        self._add_route(app.router.add_get, '/api/weight/history', self.get_weight_history)
+        self._add_route(app.router.add_get, '/api/scales', self.get_scales)
+        self._add_route(app.router.add_get, '/api/scales/{scale_id}/weight', self.get_scale_weight)
+        self._add_route(app.router.add_get, '/api/journal', self.get_journal)
+        self._add_route(app.router.add_post, '/api/batch', self.start_batch)
+        self._add_route(app.router.add_get, '/api/batch', self.list_batches)
+        self._add_route(app.router.add_get, r'/api/batch/{session_id:\d+}', self.get_batch)
+        self._add_route(app.router.add_post, r'/api/batch/{session_id:\d+}/close', self.close_batch)
+        self._add_route(app.router.add_post, '/api/tare', self.post_tare)
+        self._add_route(app.router.add_get, '/api/profile', self.get_profiles)
+        self._add_route(app.router.add_post, '/api/profile', self.post_profile)
+        self._add_route(app.router.add_post, '/api/device/{command}', self.post_device_command)
+        self._add_route(app.router.add_get, '/api/status', self.get_status)
+        self._add_route(app.router.add_get, '/metrics', self.get_metrics)
+        self._add_route(app.router.add_get, '/', self.api_docs)
+        self.runner = web.AppRunner(
+            app, access_log=None, keepalive_timeout=keepalive_timeout,
+            shutdown_timeout=SERVER_SHUTDOWN_TIMEOUT
+        )
+        # Il socket viene aperto subito, così gli errori di bind emergono in start()
+        self.core.call(self._start(host, port))
+        
+    async def _start(self, host, port):
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, host, port).start()
+        except Exception:
+            await self.runner.cleanup()
+            raise
+            
+    def serve(self):
+        # Le richieste sono servite dal loop condiviso: qui si attende solo l'arresto
+        self._stopped.wait()
+        
+    def shutdown(self, timeout=SERVER_SHUTDOWN_TIMEOUT):
+        try:
+            self.core.call(self._shutdown(), timeout)
+        except concurrent.futures.TimeoutError:
+            logger.error(f"Arresto del server asincrono non completato entro {timeout:g}s")
+        except Exception as e:
+            logger.error(f"Errore nell'arresto del server asincrono: {str(e)}")
+        finally:
+            self._stopped.set()
+            
+    async def _shutdown(self):
+        # Stream, long-poll e attese del peso stabile terminano prima della
+        # chiusura, che altrimenti attenderebbe le richieste parcheggiate
+        self.hub.close_all()
+        self.hub.wake_waiters()
+        await self.runner.cleanup()
+        
+    async def _record_request_metrics(self, request, response):
+        started = request.get(REQUEST_STARTED)
+        if started is None:
+            return
+        route = self._route_labels.get(request.match_info.route.resource, "unmatched")
+        self.api.record_request(route, request.method, response.status, time.perf_counter() - started)
+        
+    def _add_route(self, add, path, handler):
+        """Registra una route annotandone il nome nel formato di Flask
+
+        Così le metriche non dipendono dal backend: /api/batch/{session_id:\\d+}
+        diventa /api/batch/<int:session_id>, come la route Flask corrispondente
+        (il nome canonico di aiohttp perde il tipo del parametro).
+        """
+        route = add(path, handler)
+        label = ASYNC_INT_ROUTE_PARAM.sub(r"<int:\1>", path)
+        self._route_labels[route.resource] = ASYNC_ROUTE_PARAM.sub(r"<\1>", label)
+        
+    @staticmethod
+    def _respond(reply):
+        status, body, headers = reply
+        return web.Response(body=body, status=status, headers=headers)
+        
+    async def get_weight(self, request):
+        since, wait = self.api._weight_wait(request.query)
+        if since is not None:
+            with self.api.waiting():
+                state = await self.hub.wait_for_state(since, wait, self.api._closing.is_set)
+        else:
+            state = self.api.scale.state
+        return self._respond(self.api._weight_reply(state, request.headers.get("If-None-Match")))
+        
+    async def _wait_for_stable(self, timeout, after):
+        """Versione asincrona di StabilityDetector.wait_for_stable"""
+        stability = self.api.stability
+        deadline = self.core.loop.time() + timeout
+        while True:
+            result = stability.current()
+            if result is not None and (after is None or result[0] > after):
+                return result
+            remaining = deadline - self.core.loop.time()
+            if remaining <= 0 or self.api._closing.is_set():
+                return None
+            # La finestra può completarsi anche senza nuovi report
+            await self.hub.wait_for_change(min(remaining, stability.window))
+            
+    async def get_stable_weight(self, request):
+        timeout, after = self.api._stable_wait(request.query)
+        result = None
+        if self.api.scale.state.connected:
+            with self.api.waiting():
+                result = await self._wait_for_stable(timeout, after)
+        return self._respond(self.api._stable_reply(result))
+        
+    async def stream_weight(self, request):
+        response = web.StreamResponse(headers=SSE_HEADERS)
+        response.content_type = "text/event-stream"
+        await response.prepare(request)
+        subscription = self.hub.subscribe()
+        try:
+            await response.write(b"retry: 2000\n\n")
+            await response.write(self.api._sse_event(self.api.scale.state))
+            sent = self.core.loop.time()
+            while not subscription.closed:
+                delay = sent + self.api.stream_interval - self.core.loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                state = await subscription.get(STREAM_HEARTBEAT)
+                if state is not None:
+                    await response.write(self.api._sse_event(state))
+                    sent = self.core.loop.time()
+                elif not subscription.closed:
+                    await response.write(b": keep-alive\n\n")
+        except ConnectionResetError:
+            pass
+        finally:
+            self.hub.unsubscribe(subscription)
+        return response
+        
+    async def get_weight_history(self, request):
+        return self._respond(self.api._history_reply(request.query))
+        
+    async def get_scales(self, request):
+        return self._respond(self.api._scales_reply())
+        
+    async def get_scale_weight(self, request):
+        return self._respond(self.api._scale_weight_reply(
+            request.match_info['scale_id'], request.headers.get("If-None-Match")
+        ))
+        
+    async def get_journal(self, request):
+        # La lettura dei file del registro non deve bloccare il loop
+        return self._respond(await asyncio.get_running_loop().run_in_executor(
+            None, self.api._journal_reply, request.query
+        ))
+        
+    async def start_batch(self, request):
+        return self._respond(self.api._batch_start_reply(request.query))
+        
+    async def list_batches(self, request):
+        return self._respond(self.api._json_reply(self.api.batches.list_payload()))
+        
+    async def get_batch(self, request):
+        return self._respond(self.api._batch_reply(int(request.match_info['session_id'])))
+        
+    async def close_batch(self, request):
+        return self._respond(self.api._batch_close_reply(int(request.match_info['session_id'])))
+        
+    async def post_tare(self, request):
+        command, timeout, reply = self.api._tare_request(request.query)
+        if reply is None:
+            with self.api.waiting():
+                result = await self._wait_for_stable(timeout, None)
+            reply = self.api._tare_stable_reply(result, timeout) or await self._run_command(command)
+        return self._respond(reply)
+        
+    async def get_profiles(self, request):
+        return self._respond(self.api._json_reply(self.api.profiles.payload()))
+        
+    async def post_profile(self, request):
+        return self._respond(self.api._profile_reply(request.query))
+        
+    async def post_device_command(self, request):
+        return self._respond(await self._run_command(request.match_info['command'], request.query.get('scale')))
+        
+    async def _run_command(self, command, scale_id=None):
+        """Invia un comando al lettore e ne attende il risultato senza bloccare il loop"""
+        future, reply = self.api._submit_command(command, scale_id)
+        if future is None:
+            return reply
+        await asyncio.wait([asyncio.wrap_future(future)], timeout=COMMAND_TIMEOUT)
+        return self.api._command_reply(command, future, scale_id)
+        
+    async def get_status(self, request):
+        return self._respond(self.api._status_reply())
+        
+    async def get_metrics(self, request):
+        return self._respond(self.api._metrics_reply())
+        
+    async def api_docs(self, request):
+        return self._respond(self.api._docs_reply(request.headers.get("If-None-Match")))
+
+
+SERVER_BACKENDS = {
+    WaitressServerBackend.name: WaitressServerBackend,
+    WerkzeugServerBackend.name: WerkzeugServerBackend,
+    AsyncioServerBackend.name: AsyncioServerBackend,
+}
+
+
+def create_server_backend(name, api, host, port, threads=API_THREADS, keepalive_timeout=API_KEEPALIVE_TIMEOUT):
+    """Crea il backend di serving richiesto ("auto" preferisce waitress se installato)"""
+    if name == "asyncio" and web is None:
+        logger.warning("aiohttp non installato, backend asyncio non disponibile")
+        name = "auto"
+    if name == "auto":
+        name = "waitress" if create_waitress_server is not None else "werkzeug"
+    if name == "waitress" and create_waitress_server is None:
+        logger.warning("waitress non installato, uso il server werkzeug")
+        name = "werkzeug"
+    if name not in SERVER_BACKENDS:
+        raise ValueError(f"Backend di serving sconosciuto: {name}")
+    return SERVER_BACKENDS[name](api, host, port, threads, keepalive_timeout)
+
+
+# Classe per l'API RESTful
+class ScaleAPI:
+    def __init__(self, scale, host='0.0.0.0', port=5000, server=API_SERVER_BACKEND,
+                 threads=API_THREADS, keepalive_timeout=API_KEEPALIVE_TIMEOUT, journal=None,
+                 registry=None, core=None, command_handler=None, reader=None, profiles=None,
+                 stream_interval=MIN_PUBLISH_INTERVAL):
+        self.app = Flask(__name__)
+        self.scale = scale
+        self.registry = registry
+        # Invio dei comandi al lettore: funzione (comando, id bilancia) -> Future
+        self.command_handler = command_handler
+        # Lettore della bilancia principale, per lo stato e le metriche
+        self.reader = reader
+        self.host = host
+        self.port = port
+        self.server_backend = server
+        self.threads = threads
+        self.keepalive_timeout = keepalive_timeout
+        # Intervallo minimo tra due eventi dello stream: gli stati arrivati
+        # nel frattempo vengono riuniti e si invia solo l'ultimo
+        self.stream_interval = stream_interval
+        self.server = None
+        self.thread = None
+        self.running = False
+        
+        # Loop asyncio del backend "asyncio", condiviso con i lettori se fornito
+        self.core = core
+        self._async_hub = None
+        # Ultima richiesta del peso, per il campionamento adattivo dei lettori
+        self._last_weight_request = 0.0
+        # Richieste in attesa di un nuovo stato o di un peso stabile (long-poll)
+        self._waiters = 0
+        self._waiters_lock = threading.Lock()
+        # Funzioni chiamate all'arrivo di un client che vuole letture fresche
+        self._demand_listeners = []
+        # Impostato durante l'arresto: le attese terminano subito e non ne
+        # iniziano di nuove, così i thread del server si liberano
+        self._closing = threading.Event()
+        
+        # Rilevatore di stabilità alimentato da ogni campione letto
+        self.stability = StabilityDetector()
+        self.scale.add_sample_listener(self.stability.add_sample)
+        self.scale.add_rebase_listener(self.stability.rebase)
+        
+        # Registro persistente delle pesate assestate (opzionale)
+        self.journal = journal
+        if journal is not None:
+            self.stability.add_settle_listener(self._record_settled)
+        
+        # Profili di tara (in memoria se il servizio non ne fornisce di persistenti)
+        self.profiles = profiles if profiles is not None else TareProfiles(scale)
+        
+        # Sessioni di pesatura a lotti, rilevate dal flusso dei campioni
+        self.batches = BatchSessionManager(self.stability)
+        self.scale.add_sample_listener(self.batches.add_sample)
+        self.scale.add_rebase_listener(self.batches.rebase)
+        
+        # Distribuzione dei nuovi stati ai client dello stream
+        self.broadcaster = StateBroadcaster()
+        self.scale.add_state_listener(self.broadcaster.publish)
+        
+        # Storico delle ultime letture
+        self.history = WeightHistory()
+        self.scale.add_state_listener(self.history.append)
+        
+        # Corpi delle risposte già serializzati: slot -> (versione, bytes)
+        self._response_cache = {}
+        # La documentazione dipende solo da costanti: viene generata una volta
+        self.docs_page = self.docs_html().encode()
+        self.docs_etag = hashlib.sha1(self.docs_page).hexdigest()[:16]
+        
+        self.setup_routes()
+        
+    def _weight_payload(self, state, sample=None):
+        """Corpo JSON del peso, ricavato da un'unica istantanea dello stato"""
+        if sample is None:
+            sample = state.sample
+        if sample is not None:
+            payload = sample.to_dict()
+        else:
+            payload = {"weight": state.weight, "unit": state.unit, "stable": state.stable, "overload": False}
+        payload["seq"] = state.seq
+        payload["timestamp"] = datetime.fromtimestamp(state.timestamp).isoformat()
+        payload["connected"] = state.connected
+        return payload
+        
+    def _cached(self, slot, version, build) -> bytes:
+        """Corpo della risposta per `slot`, ricostruito solo quando cambia `version`"""
+        cached = self._response_cache.get(slot)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        body = build()
+        self._response_cache[slot] = (version, body)
+        return body
+        
+    @staticmethod
+    def _encode(payload) -> bytes:
+        return json.dumps(payload, separators=(",", ":")).encode()
+        
+    def _weight_body(self, state, scale_id=None) -> bytes:
+        """JSON del peso, serializzato una volta per ogni istantanea dello stato
+
+        La versione è l'istantanea stessa e non solo la sequenza: una bilancia
+        ricollegata con lo stesso id riparte da seq 0 con istantanee diverse,
+        e non deve ricevere il corpo di quella precedente.
+        """
+        def build():
+            payload = self._weight_payload(state)
+            if scale_id is not None:
+                payload["id"] = scale_id
+            return self._encode(payload)
+        return self._cached(("weight", scale_id), state, build)
+        
+    def _status_body(self) -> bytes:
+        """JSON di /api/status, riusato finché sequenza e stato dell'API non cambiano"""
+        key = (self.scale.state.seq, self.running, int(time.monotonic() / STATUS_CACHE_SECONDS))
+        return self._cached("status", key, lambda: self._encode(self._status_payload()))
+        
+    def async_hub(self) -> AsyncStateHub:
+        """Ponte verso il loop asyncio, creato al primo avvio del backend asincrono"""
+        if self._async_hub is None:
+            if self.core is None:
+                self.core = AsyncScaleCore()
+            self.core.start()
+            self._async_hub = AsyncStateHub(self.scale, self.core.loop)
+        return self._async_hub
+        
+    def collect_metrics(self):
+        """Client collegati allo stream, per /metrics"""
+        count = self.broadcaster.subscriber_count
+        if self._async_hub is not None:
+            count += self._async_hub.subscriber_count
+        yield ("scale_stream_subscribers", "gauge", "Client collegati allo stream del peso", [({}, count)])
+        
+    def add_demand_listener(self, listener):
+        """Registra una funzione chiamata quando un client chiede letture fresche (es. ScaleReader.wake)"""
+        self._demand_listeners.append(listener)
+        
+    def _notify_demand(self):
+        for listener in self._demand_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Errore nel listener delle richieste: {str(e)}")
+                
+    def note_request(self, path):
+        """Registra l'arrivo di una richiesta: quelle del peso tengono i lettori a piena velocità"""
+        if path.startswith(("/api/weight", "/api/scales")):
+            self._last_weight_request = time.monotonic()
+            self._notify_demand()
+            
+    @contextmanager
+    def waiting(self):
+        """Conta la richiesta come in attesa di letture finché resta parcheggiata"""
+        with self._waiters_lock:
+            self._waiters += 1
+        self._notify_demand()
+        try:
+            yield
+        finally:
+            with self._waiters_lock:
+                self._waiters -= 1
+                
+    def has_demand(self) -> bool:
+        """Ci sono client interessati a letture fresche (stream aperti, attese o richieste recenti)"""
+        if self.broadcaster.subscriber_count or self._waiters:
+            return True
+        if self._async_hub is not None and self._async_hub.subscriber_count:
+            return True
+        # Una sessione a lotti aperta non deve perdere gli articoli appoggiati
+        if self.batches.has_open():
+            return True
+        return time.monotonic() - self._last_weight_request < SAMPLING_DEMAND_WINDOW
+        
+    @staticmethod
+    def record_request(route, method, status, seconds):
+        """Conteggio e durata di una richiesta HTTP servita da uno dei backend"""
+        HTTP_REQUESTS.inc(route, method, str(status))
+        HTTP_REQUEST_SECONDS.observe(seconds, route)
+        
+    def _sse_event(self, state) -> bytes:
+        """Evento SSE di un'istantanea dello stato, condiviso da tutti i client"""
+        return self._cached(
+            "sse", state,
+            lambda: b"id: %d\ndata: %s\n\n" % (state.seq, self._weight_body(state))
+        )
+        
+    # Le risposte sono costruite qui, in comune per tutti i backend, come
+    # (codice HTTP, corpo in bytes, intestazioni): i backend si limitano a
+    # leggere la richiesta, a parcheggiare le attese e a convertire il risultato
+    
+    @staticmethod
+    def _arg(args, name, type, default=None):
+        """Parametro della query convertito come fa werkzeug (default se mancante o non valido)"""
+        value = args.get(name)
+        if value is None:
+            return default
+        try:
+            return type(value)
+        except (ValueError, TypeError):
+            return default
+            
+    def _json_reply(self, payload, status=200, headers=None):
+        """Risposta JSON"""
+        return status, self._encode(payload), dict(headers or {}, **{"Content-Type": "application/json"})
+        
+    @staticmethod
+    def _conditional(if_none_match, body, etag, headers=None, content_type="application/json"):
+        """Risposta con l'ETag indicato (es. la sequenza), 304 se il client è aggiornato"""
+        etag = f'"{etag}"'
+        headers = dict(headers or {}, ETag=etag)
+        tags = [tag.strip() for tag in (if_none_match or "").split(",")]
+        if "*" in tags or etag in tags or f"W/{etag}" in tags:
+            return 304, b"", headers
+        headers["Content-Type"] = content_type
+        return 200, body, headers
+        
+    def _closing_reply(self):
+        return self._json_reply({"error": "Server API in arresto"}, 503)
+        
+    def _weight_wait(self, args):
+        """Long-poll di /api/weight: (since, attesa in secondi); since è None senza long-poll"""
+        wait = max(0, min(self._arg(args, 'wait', int, 0), MAX_LONG_POLL_WAIT_MS))
+        return self._arg(args, 'since', int), wait / 1000
+        
+    def _weight_reply(self, state, if_none_match):
+        """Risposta di /api/weight per l'istantanea dello stato ottenuta"""
+        return self._conditional(if_none_match, self._weight_body(state), state.seq,
+                                 {"Cache-Control": "no-cache"})
+        
+    def _stable_wait(self, args):
+        """Attesa di /api/weight/stable: (timeout in secondi, settle_id da superare o None)"""
+        timeout = max(0.0, min(self._arg(args, 'timeout', float, 10.0), MAX_STABLE_WAIT))
+        return timeout, self._arg(args, 'after', int)
+        
+    def _stable_reply(self, result):
+        """Risposta di /api/weight/stable dato il risultato dell'attesa"""
+        if self._closing.is_set():
+            return self._closing_reply()
+        state = self.scale.state
+        if result is None:
+            payload = self._weight_payload(state)
+            payload["stable"] = False
+            payload["timed_out"] = True
+            return self._json_reply(payload)
+        settle_id, sample = result
+        payload = self._weight_payload(state, sample)
+        payload["stable"] = True
+        payload["settle_id"] = settle_id
+        return self._json_reply(payload)
+        
+    def _history_reply(self, args):
+        """Risposta di /api/weight/history"""
+        since = self._arg(args, 'since', int)
+        limit = max(1, min(self._arg(args, 'limit', int, HISTORY_DEFAULT_LIMIT), self.history.capacity))
+        entries = self.history.query(since=since, max_age=self._arg(args, 'seconds', float), limit=limit)
+        return self._json_reply({
+            "count": len(entries),
+            "next_since": entries[-1]["seq"] if entries else since,
+            "capacity": self.history.capacity,
+            "entries": entries,
+        })
+        
+    def _scales_reply(self):
+        """Risposta di /api/scales"""
+        scales = self.registry.items() if self.registry is not None else []
+        if not scales:
+            scales = [(self.scale.device_id, self.scale)]
+        entries = []
+        for scale_id, scale in scales:
+            payload = self._weight_payload(scale.state)
+            payload["id"] = scale_id
+            payload["primary"] = scale is self.scale
+            payload["device_name"] = scale.device_name
+            entries.append(payload)
+        return self._json_reply({"count": len(entries), "scales": entries})
+        
+    def _scale_weight_reply(self, scale_id, if_none_match):
+        """Risposta di /api/scales/<scale_id>/weight"""
+        scale = self.registry.get(scale_id) if self.registry is not None else None
+        if scale is None:
+            return self._json_reply({"error": f"Bilancia sconosciuta: {scale_id}"}, 404)
+        state = scale.state
+        return self._conditional(if_none_match, self._weight_body(state, scale_id), state.seq)
+        
+    def _record_settled(self, settle_id, sample):
+        """Registra la pesata netta insieme a tara e zero in vigore"""
+        self.journal.record_settled(settle_id, sample, *self.scale.applied_offsets)
+        
+    def _journal_reply(self, args):
+        """Risposta di /api/journal (date in formato ISO 8601); legge i file del registro"""
+        if self.journal is None:
+            return self._json_reply({"error": "Registro pesate non attivo"}, 404)
+        bounds = []
+        for name in ('start', 'end'):
+            value = args.get(name)
+            try:
+                bounds.append(datetime.fromisoformat(value).timestamp() if value else None)
+            except ValueError:
+                return self._json_reply({"error": f"Data non valida per '{name}', usare il formato ISO 8601"}, 400)
+        entries = self.journal.query(
+            start=bounds[0], end=bounds[1],
+            limit=max(1, min(self._arg(args, 'limit', int, JOURNAL_QUERY_LIMIT), JOURNAL_QUERY_LIMIT))
+        )
+        return self._json_reply({"count": len(entries), "entries": entries})
+        
+    def _batch_start_reply(self, args):
+        """Risposta all'apertura di una sessione a lotti"""
+        min_weight = self._arg(args, 'min_weight', float)
+        if min_weight is not None and not (math.isfinite(min_weight) and min_weight > 0):
+            return self._json_reply({"error": "min_weight deve essere un numero positivo"}, 400)
+        session = self.batches.start(name=args.get('name'), min_weight=min_weight or BATCH_MIN_WEIGHT)
+        if session is None:
+            return self._json_reply({
+                "error": f"Troppe sessioni aperte (massimo {self.batches.max_open_sessions}): chiuderne una"
+            }, 429)
+        self._notify_demand()
+        return self._json_reply(self.batches.payload(session.id)[0], 201)
+        
+    def _batch_reply(self, session_id):
+        """Risposta con le pesate di una sessione a lotti"""
+        return self._json_reply(*self.batches.payload(session_id))
+        
+    def _batch_close_reply(self, session_id):
+        """Risposta alla chiusura di una sessione a lotti"""
+        if self.batches.close(session_id) is None:
+            return self._json_reply({"error": f"Sessione sconosciuta: {session_id}"}, 404)
+        return self._batch_reply(session_id)
+        
+    def _submit_command(self, command, scale_id=None):
+        """Invia un comando al lettore; ritorna (Future, None) oppure (None, risposta di errore)"""
+        if command not in DEVICE_COMMANDS:
+            return None, self._json_reply({"error": f"Comando sconosciuto: {command}"}, 400)
+        if self.command_handler is None:
+            return None, self._json_reply({"error": "Lettore della bilancia non disponibile"}, 503)
+        try:
+            return self.command_handler(command, scale_id), None
+        except KeyError:
+            return None, self._json_reply({"error": f"Bilancia sconosciuta: {scale_id}"}, 404)
+            
+    def _command_reply(self, command, future, scale_id=None):
+        """Risposta a un comando, dopo che il backend ne ha atteso il Future per COMMAND_TIMEOUT secondi"""
+        if not future.done():
+            return self._json_reply({"error": f"Comando {command} non completato entro {COMMAND_TIMEOUT}s"}, 504)
+        if future.cancelled():
+            return self._json_reply({"error": "Comando annullato"}, 503)
+        error = future.exception()
+        if error is not None:
+            return self._json_reply({"error": str(error) or "Comando annullato"}, 503)
+        result = future.result()
+        state = self.scale.state
+        payload = {"command": command, "connected": state.connected, "seq": state.seq}
+        if command in (COMMAND_TARE, COMMAND_ZERO):
+            payload["ok"] = result is not None
+            payload[command] = result.to_dict() if result is not None else None
+            # I profili di tara valgono solo per la bilancia principale
+            if scale_id is None or scale_id == self.scale.device_id:
+                payload["profile"] = self.profiles.current_dict()
+        else:
+            payload["ok"] = bool(result)
+        return self._json_reply(payload)
+        
+    def _tare_request(self, args):
+        """Prima fase di POST /api/tare
+
+        Ritorna (comando, attesa in secondi, None) se serve un peso assestato
+        dal lettore, altrimenti (None, None, risposta) con la risposta già
+        pronta: una tara (o uno zero) esplicita in grammi non tocca il dispositivo.
+        """
+        zero = self._arg(args, 'zero', int, 0)
+        grams = self._arg(args, 'grams', float)
+        command = COMMAND_ZERO if zero else COMMAND_TARE
+        if grams is not None:
+            if not math.isfinite(grams):
+                return None, None, self._json_reply({"error": "Valore in grammi non valido"}, 400)
+            if zero:
+                profile = self.profiles.update_current(zero_offset=grams)
+            else:
+                profile = self.profiles.update_current(tare=grams)
+            state = self.scale.state
+            return None, None, self._json_reply({"command": command, "ok": True, "connected": state.connected,
+                                                 "seq": state.seq, "profile": profile})
+        if not self.scale.state.connected:
+            return None, None, self._json_reply({"error": "Bilancia non connessa"}, 503)
+        timeout = max(0.0, min(self._arg(args, 'timeout', float, TARE_STABLE_WAIT), MAX_STABLE_WAIT))
+        return command, timeout, None
+        
+    def _tare_stable_reply(self, result, timeout):
+        """Risposta di errore se l'attesa del peso assestato per la tara è fallita, altrimenti None"""
+        if self._closing.is_set():
+            return self._closing_reply()
+        if result is None:
+            return self._json_reply({"error": f"Peso non stabile entro {timeout:g}s"}, 409)
+        return None
+        
+    def _profile_reply(self, args):
+        """Risposta di POST /api/profile"""
+        name = args.get('name')
+        tare = self._arg(args, 'tare', float)
+        zero_offset = self._arg(args, 'zero_offset', float)
+        if name is None or not TareProfiles.valid_name(name):
+            return self._json_reply(
+                {"error": f"Nome del profilo mancante o non valido (max {PROFILE_NAME_MAX_LENGTH} caratteri)"}, 400
+            )
+        for value in (tare, zero_offset):
+            if value is not None and not math.isfinite(value):
+                return self._json_reply({"error": "Valore in grammi non valido"}, 400)
+        self.profiles.select(name, tare=tare, zero_offset=zero_offset)
+        return self._json_reply(self.profiles.payload())
+        
+    def _status_payload(self) -> dict:
+        """Corpo JSON di /api/status"""
+        state = self.scale.state
+        return {
+            "connected": state.connected,
+            "seq": state.seq,
+            "device_id": self.scale.device_id,
+            "device_type": self.scale.device_type,
+            "device_name": self.scale.device_name,
+            "api_running": self.running,
+            "reader": self.reader.state_metrics() if self.reader is not None else None
+        }
         
-        if self.scale.find_usb_scale():
-            self.connected.emit(True, "USB")
-            # Riavvia il ciclo di lettura
-            if self.reconnect_timer:
-                self.reconnect_timer.stop()
-                self.reconnect_timer = None
-            # Riavvia il ciclo di lettura
-            self.consecutive_errors = 0
-            self.run()
-            
-    def stop(self):
-        """Ferma il worker e i timer"""
-        self.running = False
-        if self.reconnect_timer:
-            self.reconnect_timer.stop()
-            self.reconnect_timer = None
-
-
-# Classe per l'API RESTful
-class ScaleAPI:
-    def __init__(self, scale, host='0.0.0.0', port=5000):
-        self.app = Flask(__name__)
-        self.scale = scale
-        self.host = host
-        self.port = port
-        self.thread = None
-        self.running = False
-        self.setup_routes()
+    def _status_reply(self):
+        return 200, self._status_body(), {"Content-Type": "application/json"}
+        
+    @staticmethod
+    def _metrics_reply():
+        return 200, METRICS.render().encode(), {"Content-Type": METRICS_CONTENT_TYPE}
+        
+    def _docs_reply(self, if_none_match):
+        return self._conditional(if_none_match, self.docs_page, self.docs_etag,
+                                 content_type="text/html; charset=utf-8")
         
     def setup_routes(self):
         """Configura i percorsi dell'API"""
         
+        def respond(reply):
+            status, body, headers = reply
+            return Response(body, status=status, headers=headers)
+            
+        def run_command(command, scale_id=None):
+            future, reply = self._submit_command(command, scale_id)
+            if future is None:
+                return reply
+            concurrent.futures.wait([future], COMMAND_TIMEOUT)
+            return self._command_reply(command, future, scale_id)
+            
+        @self.app.before_request
+        def start_request_timer():
+            request.environ["scale.started"] = time.perf_counter()
+            self.note_request(request.path)
+            
+        @self.app.after_request
+        def record_request_metrics(response):
+            # Per lo stream la durata è quella fino all'apertura della risposta
+            started = request.environ.get("scale.started")
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+                self.record_request(route, request.method, response.status_code,
+                                    time.perf_counter() - started)
+            return response
+            
         @self.app.route('/api/weight', methods=['GET'])
         def get_weight():
-            """Ottiene l'ultimo peso misurato"""
-            weight = self.scale.last_weight
-            return jsonify({
-                "weight": weight,
-                "unit": "g",
-                "timestamp": datetime.now().isoformat(),
-                "connected": self.scale.connected
-            })
+            """Ottiene l'ultimo peso misurato, con unità e flag di stabilità
+
+            L'ETag è il numero di sequenza dello stato, che cambia solo quando
+            cambia il peso: con If-None-Match una lettura invariata risponde 304. Con `since=<seq>&wait=<ms>` la
+            richiesta resta in attesa finché non arriva uno stato più recente.
+            """
+            since, wait = self._weight_wait(request.args)
+            if since is not None:
+                with self.waiting():
+                    state = self.scale.wait_for_state(since, wait, self._closing.is_set)
+            else:
+                state = self.scale.state
+            return respond(self._weight_reply(state, request.headers.get("If-None-Match")))
+            
+        @self.app.route('/api/weight/stable', methods=['GET'])
+        def get_stable_weight():
+            """Attende fino a `timeout` secondi un peso stabile
+
+            Con `after=<settle_id>` attende un assestamento successivo a quello
+            indicato, cioè la pesata seguente.
+            """
+            timeout, after = self._stable_wait(request.args)
+            result = None
+            if self.scale.state.connected:
+                with self.waiting():
+                    result = self.stability.wait_for_stable(timeout, after, self._closing.is_set)
+            return respond(self._stable_reply(result))
+            
+        @self.app.route('/api/weight/stream', methods=['GET'])
+        def stream_weight():
+            """Stream Server-Sent Events: un evento per ogni nuovo stato della bilancia"""
+            def events():
+                subscription = self.broadcaster.subscribe()
+                try:
+                    yield b"retry: 2000\n\n"
+                    yield self._sse_event(self.scale.state)
+                    sent = time.monotonic()
+                    while not subscription.closed:
+                        delay = sent + self.stream_interval - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                        state = subscription.get(STREAM_HEARTBEAT)
+                        if state is not None:
+                            yield self._sse_event(state)
+                            sent = time.monotonic()
+                        elif not subscription.closed:
+                            yield b": keep-alive\n\n"
+                finally:
+                    self.broadcaster.unsubscribe(subscription)
+                    
+            return Response(events(), mimetype="text/event-stream", headers=SSE_HEADERS)
+            
+        @self.app.route('/api/weight/history', methods=['GET'])
+        def get_weight_history():
+            """Ultime letture conservate in memoria
+
+            `since=<seq>` restituisce le letture successive (per paginare),
+            `seconds=<s>` quelle degli ultimi secondi, `limit` ne limita il numero.
+            """
+            return respond(self._history_reply(request.args))
+            
+        @self.app.route('/api/scales', methods=['GET'])
+        def get_scales():
+            """Elenco di tutte le bilance registrate con il loro ultimo peso"""
+            return respond(self._scales_reply())
+            
+        @self.app.route('/api/scales/<scale_id>/weight', methods=['GET'])
+        def get_scale_weight(scale_id):
+            """Ultimo peso di una bilancia specifica"""
+            return respond(self._scale_weight_reply(scale_id, request.headers.get("If-None-Match")))
+            
+        @self.app.route('/api/journal', methods=['GET'])
+        def get_journal():
+            """Pesate assestate registrate su disco tra `start` ed `end` (ISO 8601)"""
+            return respond(self._journal_reply(request.args))
+            
+        @self.app.route('/api/batch', methods=['POST'])
+        def start_batch():
+            """Apre una sessione di pesatura a lotti (`name`, `min_weight` in grammi)"""
+            return respond(self._batch_start_reply(request.args))
+            
+        @self.app.route('/api/batch', methods=['GET'])
+        def list_batches():
+            """Sessioni di pesatura a lotti con le loro statistiche"""
+            return respond(self._json_reply(self.batches.list_payload()))
+            
+        @self.app.route('/api/batch/<int:session_id>', methods=['GET'])
+        def get_batch(session_id):
+            """Pesate registrate in una sessione, con totale e statistiche"""
+            return respond(self._batch_reply(session_id))
+            
+        @self.app.route('/api/batch/<int:session_id>/close', methods=['POST'])
+        def close_batch(session_id):
+            """Chiude una sessione e restituisce il riepilogo finale"""
+            return respond(self._batch_close_reply(session_id))
+            
+        @self.app.route('/api/tare', methods=['POST'])
+        def post_tare():
+            """Tara (o zero con `zero=1`) dal primo peso assestato, salvata nel profilo attivo
+
+            Con `grams` la tara (o lo zero) viene impostata direttamente.
+            """
+            command, timeout, reply = self._tare_request(request.args)
+            if reply is None:
+                with self.waiting():
+                    result = self.stability.wait_for_stable(timeout, cancelled=self._closing.is_set)
+                reply = self._tare_stable_reply(result, timeout) or run_command(command)
+            return respond(reply)
+            
+        @self.app.route('/api/profile', methods=['GET'])
+        def get_profiles():
+            """Profili di tara e profilo attivo"""
+            return respond(self._json_reply(self.profiles.payload()))
+            
+        @self.app.route('/api/profile', methods=['POST'])
+        def post_profile():
+            """Attiva (o crea) il profilo `name`, con `tare` e `zero_offset` opzionali in grammi"""
+            return respond(self._profile_reply(request.args))
+            
+        @self.app.route('/api/device/<command>', methods=['POST'])
+        def post_device_command(command):
+            """Comando (rescan, reconnect, tare, zero) eseguito dal lettore che possiede il dispositivo"""
+            return respond(run_command(command, request.args.get('scale')))
             
         @self.app.route('/api/status', methods=['GET'])
         def get_status():
             """Ottiene lo stato della bilancia"""
-            return jsonify({
-                "connected": self.scale.connected,
-                "device_type": self.scale.device_type,
-                "device_name": self.scale.device_name,
-                "api_running": self.running
-            })
+            return respond(self._status_reply())
+            
+        @self.app.route('/metrics', methods=['GET'])
+        def get_metrics():
+            """Metriche del lettore e dell'API in formato Prometheus"""
+            return respond(self._metrics_reply())
             
         # Aggiunta di una route di base per la documentazione
         @self.app.route('/', methods=['GET'])
         def api_docs():
             """Pagina di documentazione API basilare"""
-            docs_html = f"""
+            return respond(self._docs_reply(request.headers.get("If-None-Match")))
+            
+    def docs_html(self) -> str:
+        """Pagina HTML di documentazione dell'API"""
+        return f"""
             <html>
             <head>
                 <title>Scale Manager API</title>
@@ -388,58 +3571,222 @@ class ScaleAPI:
                 <div class="endpoint">
                     <h2>GET /api/weight</h2>
                     <p>Restituisce il peso attuale misurato dalla bilancia.</p>
+                    <p>La risposta ha come <code>ETag</code> il numero di sequenza <code>seq</code>, che aumenta solo quando cambiano peso, unità, stato della bilancia o connessione: inviando <code>If-None-Match</code> una lettura invariata risponde <code>304 Not Modified</code>.
+                    Con <code>?since=&lt;seq&gt;&amp;wait=&lt;ms&gt;</code> (max {MAX_LONG_POLL_WAIT_MS} ms) la richiesta resta in attesa finché il peso non cambia.</p>
                     <p><strong>URL:</strong> <a href="/api/weight">/api/weight</a></p>
                     <p><strong>Esempio di risposta:</strong></p>
                     <pre>{{
   "weight": 245,
   "unit": "g",
+  "raw": 245,
+  "exponent": 0,
+  "status": 4,
+  "stable": true,
+  "under_zero": false,
+  "overload": false,
+  "seq": 1842,
   "timestamp": "2025-05-21T21:45:30.123456",
   "connected": true
 }}</pre>
                 </div>
                 
+                <div class="endpoint">
+                    <h2>GET /api/weight/stable?timeout=10&amp;after=&lt;settle_id&gt;</h2>
+                    <p>Attende fino a <code>timeout</code> secondi (max {int(MAX_STABLE_WAIT)}) che il peso si assesti e lo restituisce con un <code>settle_id</code>.
+                    Passando <code>after</code> con l'ultimo <code>settle_id</code> ricevuto si attende la pesata successiva.
+                    Alla scadenza risponde con <code>"stable": false</code> e <code>"timed_out": true</code>.</p>
+                    <p><strong>URL:</strong> <a href="/api/weight/stable">/api/weight/stable</a></p>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>GET /api/weight/stream</h2>
+                    <p>Stream <a href="https://html.spec.whatwg.org/multipage/server-sent-events.html">Server-Sent Events</a>: invia subito lo stato attuale e poi un evento per ogni variazione del peso, con lo stesso formato di <code>/api/weight</code> e <code>id</code> pari a <code>seq</code>.
+                    Le variazioni ravvicinate sono riunite (al massimo un evento ogni {int(MIN_PUBLISH_INTERVAL * 1000)} ms, con l'ultimo stato); a peso fermo viene inviato solo un commento keep-alive ogni {int(STREAM_HEARTBEAT)} s.</p>
+                    <pre>const source = new EventSource("/api/weight/stream");
+source.onmessage = (e) =&gt; console.log(JSON.parse(e.data).weight);</pre>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>GET /api/weight/history?since=&amp;seconds=&amp;limit=</h2>
+                    <p>Restituisce le ultime letture conservate in memoria (al massimo {HISTORY_CAPACITY}).
+                    Con <code>since=&lt;seq&gt;</code> restituisce le letture successive, da usare con <code>next_since</code> per paginare;
+                    con <code>seconds</code> quelle degli ultimi secondi; senza parametri le <code>limit</code> più recenti (predefinito {HISTORY_DEFAULT_LIMIT}).</p>
+                    <p><strong>URL:</strong> <a href="/api/weight/history?seconds=60">/api/weight/history?seconds=60</a></p>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>GET /api/scales</h2>
+                    <p>Elenca tutte le bilance Dymo collegate con il loro ultimo peso. Ogni bilancia ha un <code>id</code> stabile ricavato dal percorso bus/porta USB (o dal numero di serie).</p>
+                    <p><strong>URL:</strong> <a href="/api/scales">/api/scales</a></p>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>GET /api/scales/&lt;id&gt;/weight</h2>
+                    <p>Restituisce l'ultimo peso della bilancia indicata, nello stesso formato di <code>/api/weight</code>.</p>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>GET /api/journal?start=&amp;end=&amp;limit=</h2>
+                    <p>Restituisce le pesate assestate registrate su disco tra <code>start</code> ed <code>end</code> (date ISO 8601), al massimo {JOURNAL_QUERY_LIMIT} per richiesta.
+                    Ogni pesata riporta il peso netto (<code>weight</code>), il peso lordo (<code>gross_weight</code>) e la tara e lo zero applicati, in grammi.</p>
+                    <p><strong>URL:</strong> <a href="/api/journal">/api/journal</a></p>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>POST /api/batch?name=&amp;min_weight=</h2>
+                    <p>Apre una sessione di pesatura a lotti sulla bilancia principale. Il server registra un peso assestato per ogni articolo appoggiato:
+                    dopo la registrazione attende che il piatto torni sotto <code>min_weight</code> grammi (predefinito {BATCH_MIN_WEIGHT:g}) prima di accettare l'articolo successivo.
+                    Risponde <code>201</code> con la sessione e il suo <code>id</code>, oppure <code>429</code> se sono già aperte {BATCH_MAX_OPEN_SESSIONS} sessioni.
+                    Una sessione senza pesate né richieste per {BATCH_IDLE_TIMEOUT:g} secondi viene chiusa automaticamente (<code>expired</code>).</p>
+                    <h2>GET /api/batch</h2>
+                    <p>Elenca le sessioni (le ultime {BATCH_MAX_SESSIONS}) con le loro statistiche, senza le singole pesate.</p>
+                    <h2>GET /api/batch/&lt;id&gt;</h2>
+                    <p>Restituisce in una sola risposta le pesate registrate (al massimo {BATCH_MAX_CAPTURES}) e numero, totale, media, minimo, massimo e deviazione standard in grammi.</p>
+                    <h2>POST /api/batch/&lt;id&gt;/close</h2>
+                    <p>Chiude la sessione e restituisce il riepilogo finale.</p>
+                    <p><strong>Esempio di risposta:</strong></p>
+                    <pre>{{
+  "id": 3,
+  "name": "kit-A12",
+  "open": true,
+  "started_at": "2025-05-21T08:00:00.000000",
+  "closed_at": null,
+  "min_weight": 5.0,
+  "waiting_removal": true,
+  "statistics": {{"count": 2, "total": 1450.0, "mean": 725.0, "min": 250.0, "max": 1200.0, "stdev": 671.751, "unit": "g"}},
+  "captures": [
+    {{"index": 1, "weight": 250, "unit": "g", "grams": 250.0, "settle_id": 41, "timestamp": "2025-05-21T08:00:03.512000", ...}},
+    {{"index": 2, "weight": 1200, "unit": "g", "grams": 1200.0, "settle_id": 43, "timestamp": "2025-05-21T08:00:07.948000", ...}}
+  ]
+}}</pre>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>POST /api/device/&lt;comando&gt;?scale=&lt;id&gt;</h2>
+                    <p>Invia un comando al lettore, unico proprietario del dispositivo USB: <code>rescan</code> (verifica o cerca subito la bilancia), <code>reconnect</code> (rilascia e riapre il dispositivo), <code>tare</code> (usa il peso attuale come tara), <code>zero</code> (usa il peso attuale, a piatto vuoto, come zero).
+                    Senza <code>scale</code> il comando va alla bilancia principale. La risposta contiene <code>ok</code> e lo stato della connessione; per <code>tare</code> e <code>zero</code> anche il campione lordo usato e il profilo di tara attivo.</p>
+                </div>
+                
+                <div class="endpoint">
+                    <h2>POST /api/tare?zero=&amp;grams=&amp;timeout={TARE_STABLE_WAIT:g}</h2>
+                    <p>Attende fino a <code>timeout</code> secondi un peso assestato e lo usa come tara del profilo attivo (con <code>zero=1</code> come correzione dello zero, a piatto vuoto); i pesi successivi sono netti in qualsiasi unità.
+                    Con <code>grams</code> la tara (o lo zero) viene impostata direttamente, senza leggere la bilancia. Risponde <code>409</code> se il peso non si assesta in tempo e <code>503</code> se la bilancia non è connessa.</p>
+                    <h2>GET /api/profile</h2>
+                    <p>Elenca i profili di tara (es. uno per tipo di contenitore) con tara e zero in grammi, e il profilo attivo.</p>
+                    <p><strong>URL:</strong> <a href="/api/profile">/api/profile</a></p>
+                    <h2>POST /api/profile?name=&amp;tare=&amp;zero_offset=</h2>
+                    <p>Attiva il profilo <code>name</code> (creandolo se non esiste) e ne imposta facoltativamente tara e zero in grammi. I profili sono salvati nel file di impostazioni.</p>
+                    <p><strong>Esempio di risposta:</strong></p>
+                    <pre>{{
+  "current": "cassetta",
+  "unit": "g",
+  "profiles": [
+    {{"name": "cassetta", "tare": 412.0, "zero_offset": 1.0}},
+    {{"name": "default", "tare": 0.0, "zero_offset": 1.0}}
+  ]
+}}</pre>
+                </div>
+                
                 <div class="endpoint">
                     <h2>GET /api/status</h2>
-                    <p>Restituisce lo stato attuale della bilancia e dell'API.</p>
+                    <p>Restituisce lo stato attuale della bilancia e dell'API.
+                    <code>reader</code> riporta lo stato del lettore (<code>disconnected</code>, <code>probing</code>, <code>connected</code>, <code>reading</code>, <code>idle</code>) e, per ogni stato, il tempo totale trascorso in secondi e il numero di ingressi.</p>
                     <p><strong>URL:</strong> <a href="/api/status">/api/status</a></p>
                     <p><strong>Esempio di risposta:</strong></p>
                     <pre>{{
   "connected": true,
+  "seq": 1842,
   "device_type": "USB",
   "device_name": "Dymo M5/M10",
-  "api_running": true
+  "api_running": true,
+  "reader": {{
+    "state": "reading",
+    "state_elapsed": 0.12,
+    "reconnect_delay": 0.5,
+    "seconds": {{"disconnected": 4.5, "probing": 0.02, "connected": 0.4, "reading": 3580.1, "idle": 612.3}},
+    "entries": {{"disconnected": 2, "probing": 3, "connected": 41830, "reading": 41830, "idle": 620}}
+  }}
 }}</pre>
                 </div>
+                
+                <div class="endpoint">
+                    <h2>GET /metrics</h2>
+                    <p>Metriche in formato testuale Prometheus: latenza delle letture USB (<code>scale_usb_read_seconds</code>), campioni letti (<code>scale_samples_total</code>, con <code>rate()</code> si ottengono i campioni al secondo),
+                    letture ripetute, timeout ed errori USB per errno, riconnessioni, tempo trascorso in ogni stato del lettore, richieste HTTP e latenza per route, client collegati allo stream.</p>
+                    <p><strong>URL:</strong> <a href="/metrics">/metrics</a></p>
+                    <p><strong>Esempio di risposta:</strong></p>
+                    <pre># HELP scale_samples_total Campioni di peso decodificati (rate() = campioni al secondo)
+# TYPE scale_samples_total counter
+scale_samples_total{{scale="primary"}} 41210
+# HELP scale_http_requests_total Richieste HTTP servite
+# TYPE scale_http_requests_total counter
+scale_http_requests_total{{route="/api/weight",method="GET",status="200"}} 1520</pre>
+                </div>
             </body>
             </html>
             """
-            return docs_html
             
-    def start(self):
+    def start(self) -> bool:
         """Avvia il server API in un thread separato"""
         if self.running:
-            return
+            return True
+            
+        try:
+            server = create_server_backend(
+                self.server_backend, self, self.host, self.port,
+                self.threads, self.keepalive_timeout
+            )
+        except Exception as e:
+            logger.error(f"Errore nell'avvio del server API: {str(e)}")
+            return False
             
         def run_app():
             try:
-                self.running = True
-                self.app.run(host=self.host, port=self.port)
+                server.serve()
             except Exception as e:
-                logger.error(f"Errore nell'avvio del server API: {str(e)}")
+                logger.error(f"Errore nel server API: {str(e)}")
             finally:
-                self.running = False
+                # Un server già sostituito da un riavvio non tocca lo stato
+                if self.server is server:
+                    self.running = False
             
-        self.thread = threading.Thread(target=run_app)
+        self.server = server
+        self.running = True
+        METRICS.add_collector(self.collect_metrics)
+        self.thread = threading.Thread(target=run_app, name="ScaleAPI")
         self.thread.daemon = True
         self.thread.start()
-        logger.info(f"API server avviato su http://{self.host}:{self.port}")
+        logger.info(f"API server avviato su http://{self.host}:{self.port} ({server.name})")
+        return True
         
     def stop(self):
-        """Ferma il server API"""
+        """Ferma il server API chiudendo il socket in ascolto e le connessioni"""
+        server, thread = self.server, self.thread
+        if server is None:
+            return
+        METRICS.remove_collector(self.collect_metrics)
+        # Stream e attese aperti terrebbero occupati i thread del server fino
+        # alla loro scadenza: vengono chiusi e risvegliati prima dell'arresto
+        self._closing.set()
+        self.scale.wake_waiters()
+        self.stability.wake_waiters()
+        self.broadcaster.close_all()
+        server.shutdown()
+        thread.join(SERVER_SHUTDOWN_TIMEOUT)
+        self._closing.clear()
+        self.server = None
+        self.thread = None
         self.running = False
-        # Nota: per una corretta implementazione, sarebbe necessario 
-        # usare un server WSGI come Waitress che supporti l'arresto pulito.
         logger.info("API server fermato")
+        
+    def restart(self, host=None, port=None) -> bool:
+        """Riavvia il server, eventualmente su un nuovo indirizzo"""
+        self.stop()
+        if host is not None:
+            self.host = host
+        if port is not None:
+            self.port = port
+        return self.start()
 
 
 # Classe per gestire l'avvio automatico
@@ -449,37 +3796,56 @@ class AutoStartManager:
         self.app_path = app_path
         self.startup_key = r"Software\Microsoft\Windows\CurrentVersion\Run"
         
+    @staticmethod
+    def _registry():
+        """Modulo winreg, importato solo quando serve (None fuori da Windows)"""
+        try:
+            import winreg
+        except ImportError:
+            return None
+        return winreg
+        
     def is_autostart_enabled(self):
         """Verifica se l'avvio automatico è abilitato"""
+        winreg = self._registry()
+        if winreg is None:
+            return False
         try:
             key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.startup_key)
             value, _ = winreg.QueryValueEx(key, self.app_name)
             winreg.CloseKey(key)
             return value == self.app_path
-        except WindowsError:
+        except OSError:
             return False
             
     def enable_autostart(self):
         """Abilita l'avvio automatico all'avvio di Windows"""
+        winreg = self._registry()
+        if winreg is None:
+            logger.warning("Avvio automatico disponibile solo su Windows")
+            return False
         try:
             key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.startup_key, 0, winreg.KEY_WRITE)
             winreg.SetValueEx(key, self.app_name, 0, winreg.REG_SZ, self.app_path)
             winreg.CloseKey(key)
             logger.info(f"Avvio automatico abilitato per {self.app_name}")
             return True
-        except WindowsError as e:
+        except OSError as e:
             logger.error(f"Errore nell'abilitazione dell'avvio automatico: {str(e)}")
             return False
             
     def disable_autostart(self):
         """Disabilita l'avvio automatico all'avvio di Windows"""
+        winreg = self._registry()
+        if winreg is None:
+            return False
         try:
             key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.startup_key, 0, winreg.KEY_WRITE)
             winreg.DeleteValue(key, self.app_name)
             winreg.CloseKey(key)
             logger.info(f"Avvio automatico disabilitato per {self.app_name}")
             return True
-        except WindowsError as e:
+        except OSError as e:
             logger.error(f"Errore nella disabilitazione dell'avvio automatico: {str(e)}")
             return False
 
@@ -488,16 +3854,43 @@ class AutoStartManager:
 class SettingsManager:
     def __init__(self, settings_file="scale_manager_settings.json"):
         self.settings_file = settings_file
+        # GUI, API e lettore salvano da thread diversi: modifiche e scrittura
+        # del file sono serializzate
+        self._lock = threading.RLock()
         self.settings = {
             "api": {
                 "host": "0.0.0.0",
                 "port": 5000,
-                "autostart": True
+                "autostart": True,
+                "server": API_SERVER_BACKEND,
+                "threads": API_THREADS,
+                "keepalive_timeout": API_KEEPALIVE_TIMEOUT
             },
             "application": {
                 "start_minimized": False,
                 "autostart_windows": False
-            }
+            },
+            "journal": {
+                "enabled": JOURNAL_ENABLED,
+                "directory": JOURNAL_DIRECTORY,
+                "max_bytes": JOURNAL_MAX_BYTES,
+                "rotate_seconds": JOURNAL_ROTATE_SECONDS,
+                "fsync_interval": JOURNAL_FSYNC_INTERVAL
+            },
+            "sampling": {
+                "read_timeout_ms": READ_TIMEOUT_MS,
+                "max_attempts": MAX_ATTEMPTS,
+                "retry_delay": READ_RETRY_DELAY,
+                "min_publish_interval": MIN_PUBLISH_INTERVAL,
+                "adaptive": SAMPLING_ADAPTIVE,
+                "idle_after": SAMPLING_IDLE_AFTER,
+                "idle_interval": SAMPLING_IDLE_INTERVAL
+            },
+            # Profili di tara (es. un contenitore): tara e zero in grammi
+            "profiles": {
+                DEFAULT_PROFILE: {"tare": 0.0, "zero_offset": 0.0}
+            },
+            "current_profile": DEFAULT_PROFILE
         }
         self.load_settings()
         
@@ -507,20 +3900,58 @@ class SettingsManager:
             if os.path.exists(self.settings_file):
                 with open(self.settings_file, 'r') as f:
                     loaded_settings = json.load(f)
-                    # Aggiorna solo le chiavi esistenti
-                    if "api" in loaded_settings:
-                        self.settings["api"].update(loaded_settings["api"])
-                    if "application" in loaded_settings:
-                        self.settings["application"].update(loaded_settings["application"])
+                    # Aggiorna solo le sezioni esistenti
+                    for section, values in self.settings.items():
+                        if isinstance(values, dict) and isinstance(loaded_settings.get(section), dict):
+                            values.update(loaded_settings[section])
+                    if isinstance(loaded_settings.get("current_profile"), str):
+                        self.settings["current_profile"] = loaded_settings["current_profile"]
                 logger.info("Impostazioni caricate")
         except Exception as e:
             logger.error(f"Errore nel caricamento delle impostazioni: {str(e)}")
+        self._validate_sampling()
+            
+    def _validate_sampling(self):
+        """Sostituisce con il valore predefinito i parametri di campionamento non validi
+
+        Tempi e tentativi arrivano direttamente al lettore: un intervallo
+        nullo o negativo lo farebbe girare a vuoto o bloccare.
+        """
+        def positive(value):
+            return (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and math.isfinite(value) and value > 0)
+            
+        sampling = self.settings["sampling"]
+        checks = {
+            "read_timeout_ms": (READ_TIMEOUT_MS, lambda v: positive(v) and isinstance(v, int)),
+            "max_attempts": (MAX_ATTEMPTS, lambda v: positive(v) and isinstance(v, int)),
+            "retry_delay": (READ_RETRY_DELAY, lambda v: v == 0 or positive(v)),
+            "min_publish_interval": (MIN_PUBLISH_INTERVAL, positive),
+            "adaptive": (SAMPLING_ADAPTIVE, lambda v: isinstance(v, bool)),
+            "idle_after": (SAMPLING_IDLE_AFTER, positive),
+            "idle_interval": (SAMPLING_IDLE_INTERVAL, positive),
+        }
+        for key, (default, valid) in checks.items():
+            if not valid(sampling.get(key)):
+                logger.error(f"Impostazione di campionamento non valida: {key}={sampling.get(key)!r}, uso {default}")
+                sampling[key] = default
+        # In idle non si legge più spesso che a piena velocità
+        if sampling["idle_interval"] < sampling["min_publish_interval"]:
+            logger.warning(f"idle_interval inferiore a min_publish_interval, uso {sampling['min_publish_interval']}")
+            sampling["idle_interval"] = sampling["min_publish_interval"]
             
     def save_settings(self):
-        """Salva le impostazioni su file"""
+        """Salva le impostazioni su file
+
+        Il file viene scritto accanto e poi sostituito in un solo passo, così
+        non resta mai troncato o mescolato se il salvataggio si interrompe.
+        """
+        temporary = f"{self.settings_file}.tmp"
         try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
+            with self._lock:
+                with open(temporary, 'w') as f:
+                    json.dump(self.settings, f, indent=2)
+                os.replace(temporary, self.settings_file)
             logger.info("Impostazioni salvate")
             return True
         except Exception as e:
@@ -535,845 +3966,267 @@ class SettingsManager:
         """Ottiene le impostazioni dell'applicazione"""
         return self.settings["application"]
         
+    def get_journal_settings(self):
+        """Ottiene le impostazioni del registro pesate"""
+        return self.settings["journal"]
+        
+    def get_sampling_settings(self):
+        """Ottiene le impostazioni di lettura e campionamento della bilancia"""
+        return self.settings["sampling"]
+        
+    def get_profiles(self):
+        """Ottiene i profili di tara e il nome del profilo attivo"""
+        return self.settings["profiles"], self.settings["current_profile"]
+        
     def update_api_settings(self, host=None, port=None, autostart=None):
         """Aggiorna le impostazioni dell'API"""
-        if host is not None:
-            self.settings["api"]["host"] = host
-        if port is not None:
-            self.settings["api"]["port"] = port
-        if autostart is not None:
-            self.settings["api"]["autostart"] = autostart
-        return self.save_settings()
+        with self._lock:
+            if host is not None:
+                self.settings["api"]["host"] = host
+            if port is not None:
+                self.settings["api"]["port"] = port
+            if autostart is not None:
+                self.settings["api"]["autostart"] = autostart
+            return self.save_settings()
         
     def update_application_settings(self, start_minimized=None, autostart_windows=None):
         """Aggiorna le impostazioni dell'applicazione"""
-        if start_minimized is not None:
-            self.settings["application"]["start_minimized"] = start_minimized
-        if autostart_windows is not None:
-            self.settings["application"]["autostart_windows"] = autostart_windows
-        return self.save_settings()
-
-
-# Dialog per il setup esterno API
-class SetupHelpDialog(QDialog):
-    def __init__(self, api_settings, parent=None):
-        super().__init__(parent)
-        self.api_settings = api_settings
-        self.setup_ui()
-        
-    def setup_ui(self):
-        """Configura l'interfaccia del dialog di setup"""
-        self.setWindowTitle("Setup API Esterno - Scale Manager Lite")
-        self.setMinimumSize(700, 600)
-        self.setModal(True)
-        
-        layout = QVBoxLayout(self)
-        
-        # Titolo
-        title_label = QLabel("🔧 Setup API per Accesso Esterno")
-        title_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #FF9A3C; margin-bottom: 15px;")
-        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(title_label)
-        
-        # Area di testo per i contenuti dell'aiuto
-        self.help_text = QTextEdit()
-        self.help_text.setReadOnly(True)
-        self.help_text.setFont(QFont("Consolas", 9))
-        
-        # Contenuto dell'aiuto per setup esterno
-        help_content = f"""
-<h3 style="color: #FF9A3C;">🌐 Configurazione Rete per Accesso Esterno</h3>
-
-<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">📍 Step 1: Configurazione Host</h4>
-
-<p><strong>Opzioni disponibili:</strong></p>
-<ul>
-<li><code>0.0.0.0</code> - <span style="color: #6BFF72;">CONSIGLIATO</span> - Accessibile da qualsiasi dispositivo sulla rete</li>
-<li><code>127.0.0.1</code> - Solo accesso locale (stesso computer)</li>
-<li><code>192.168.x.x</code> - IP specifico del computer sulla rete locale</li>
-</ul>
-
-<p><strong>⚠️ Importante:</strong> Per accesso da altri dispositivi, usa <code>0.0.0.0</code></p>
-</div>
-
-<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">🔍 Step 2: Trova l'IP del Computer</h4>
-
-<p><strong>Su Windows:</strong></p>
-<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
-# Apri Command Prompt (cmd) e digita:
-ipconfig
-
-# Cerca "Indirizzo IPv4" 
-# Esempio output:
-#   Indirizzo IPv4. . . . . . . . . : 192.168.1.100
-</pre>
-
-<p><strong>Su Linux/Mac:</strong></p>
-<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
-# Apri Terminal e digita:
-ip addr show  # Linux
-ifconfig      # Mac
-
-# Cerca inet 192.168.x.x
-</pre>
-</div>
-
-<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">🔥 Step 3: Configurazione Firewall Windows</h4>
-
-<p><strong>Opzione A - Rapida (Disabilita temporaneamente):</strong></p>
-<pre style="background-color: #2d2d30; color: #FFD700; padding: 8px; border-radius: 3px;">
-1. Pannello di Controllo > Sistema e Sicurezza > Windows Defender Firewall
-2. "Attiva o disattiva Windows Defender Firewall"
-3. Disattiva temporaneamente per "Rete privata"
-4. ⚠️ RIATTIVA dopo il test!
-</pre>
-
-<p><strong>Opzione B - Sicura (Crea regola specifica):</strong></p>
-<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
-1. Pannello di Controllo > Sistema e Sicurezza > Windows Defender Firewall
-2. "Impostazioni avanzate"
-3. "Regole connessioni in entrata" > "Nuova regola"
-4. Tipo: "Porta" > Avanti
-5. "TCP" > "Porte locali specifiche" > {self.api_settings['port']} > Avanti
-6. "Consenti connessione" > Avanti
-7. Seleziona "Privato" > Avanti
-8. Nome: "Scale Manager API" > Fine
-</pre>
-</div>
-
-<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">📱 Step 4: Test da Altri Dispositivi</h4>
-
-<p><strong>URL per test:</strong></p>
-<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
-# Sostituisci [IP-COMPUTER] con l'IP trovato nello Step 2
-http://[IP-COMPUTER]:{self.api_settings['port']}/
-
-# Esempi:
-http://192.168.1.100:{self.api_settings['port']}/
-http://192.168.1.100:{self.api_settings['port']}/api/weight
-http://192.168.1.100:{self.api_settings['port']}/api/status
-</pre>
-
-<p><strong>Test con smartphone/tablet:</strong></p>
-<ol>
-<li>Connetti il dispositivo alla stessa rete WiFi</li>
-<li>Apri il browser</li>
-<li>Vai all'URL sopra (sostituendo [IP-COMPUTER])</li>
-<li>Dovresti vedere la pagina di documentazione API</li>
-</ol>
-</div>
-
-<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">🐛 Risoluzione Problemi</h4>
-
-<p><strong>❌ Non riesco ad accedere dall'esterno:</strong></p>
-<ul>
-<li>Verifica che l'host sia impostato su <code>0.0.0.0</code></li>
-<li>Controlla che l'API sia attiva (verde nell'applicazione)</li>
-<li>Verifica l'IP del computer (può cambiare)</li>
-<li>Controlla le impostazioni firewall</li>
-<li>Assicurati che i dispositivi siano sulla stessa rete</li>
-</ul>
-
-<p><strong>❌ Errore "Connessione rifiutata":</strong></p>
-<ul>
-<li>Firewall di Windows blocca la connessione</li>
-<li>Porta {self.api_settings['port']} non accessibile</li>
-<li>Prova una porta diversa (es. 8080, 3000)</li>
-</ul>
-
-<p><strong>❌ "Timeout" o caricamento infinito:</strong></p>
-<ul>
-<li>IP errato o dispositivo non raggiungibile</li>
-<li>Rete WiFi diversa</li>
-<li>Router blocca comunicazioni interne</li>
-</ul>
-</div>
-
-<div style="background-color: #3F3F46; padding: 15px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">💡 Suggerimenti Avanzati</h4>
-
-<p><strong>🔒 Per maggiore sicurezza:</strong></p>
-<ul>
-<li>Usa <code>127.0.0.1</code> se non serve accesso esterno</li>
-<li>Cambia la porta default se usi più applicazioni</li>
-<li>Crea regole firewall specifiche invece di disabilitarlo</li>
-</ul>
-
-<p><strong>📊 Per uso professionale:</strong></p>
-<ul>
-<li>Considera l'uso di un reverse proxy (nginx)</li>
-<li>Implementa HTTPS per connessioni sicure</li>
-<li>Aggiungi log dettagliati per monitoraggio</li>
-</ul>
-</div>
-
-<h3 style="color: #FF9A3C;">✅ Checklist Finale</h3>
-<ul style="color: #CCCCCC;">
-<li>☐ Host impostato su <code>0.0.0.0</code></li>
-<li>☐ API attiva (stato verde)</li>
-<li>☐ IP computer identificato</li>
-<li>☐ Firewall configurato correttamente</li>
-<li>☐ Test dal browser locale: <code>http://127.0.0.1:{self.api_settings['port']}</code></li>
-<li>☐ Test da dispositivo esterno: <code>http://[IP-COMPUTER]:{self.api_settings['port']}</code></li>
-</ul>
-"""
-        
-        self.help_text.setHtml(help_content)
-        self.help_text.setStyleSheet("""
-            QTextEdit {
-                background-color: #2d2d30;
-                color: #ffffff;
-                border: 1px solid #3f3f46;
-                border-radius: 5px;
-                padding: 10px;
-            }
-        """)
-        
-        layout.addWidget(self.help_text)
+        with self._lock:
+            if start_minimized is not None:
+                self.settings["application"]["start_minimized"] = start_minimized
+            if autostart_windows is not None:
+                self.settings["application"]["autostart_windows"] = autostart_windows
+            return self.save_settings()
         
-        # Pulsanti
-        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
-        button_box.rejected.connect(self.accept)
-        
-        # Pulsante per test locale
-        test_local_btn = QPushButton("🧪 Test Locale")
-        test_local_btn.clicked.connect(self.test_local_api)
-        test_local_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold; padding: 8px 15px; border-radius: 3px;")
-        button_box.addButton(test_local_btn, QDialogButtonBox.ButtonRole.ActionRole)
-        
-        copy_ip_btn = QPushButton("📋 Copia Info IP")
-        copy_ip_btn.clicked.connect(self.copy_ip_info)
-        copy_ip_btn.setStyleSheet("background-color: #2196F3; color: white; font-weight: bold; padding: 8px 15px; border-radius: 3px;")
-        button_box.addButton(copy_ip_btn, QDialogButtonBox.ButtonRole.ActionRole)
+    def update_profiles(self, profiles, current_profile):
+        """Salva i profili di tara e il profilo attivo"""
+        with self._lock:
+            self.settings["profiles"] = profiles
+            self.settings["current_profile"] = current_profile
+            return self.save_settings()
+
+
+# Servizio della bilancia senza interfaccia: bilance, lettori, registro pesate e API
+class ScaleService:
+    def __init__(self, settings_manager=None):
+        self.settings_manager = settings_manager or SettingsManager()
+        api_settings = self.settings_manager.get_api_settings()
         
-        layout.addWidget(button_box)
+        # Con il backend "asyncio" lettori e server HTTP condividono un unico
+        # loop di eventi; altrimenti ogni lettore ha il proprio thread
+        self.core = None
+        if api_settings["server"] == "asyncio" and web is not None:
+            self.core = AsyncScaleCore()
         
-        # Applica stile al dialog
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #2d2d30;
-                color: #ffffff;
-            }
-            QLabel {
-                color: #ffffff;
-            }
-            QPushButton {
-                background-color: #0078d7;
-                color: white;
-                border: none;
-                border-radius: 3px;
-                padding: 8px 15px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #1c86d9;
-            }
-        """)
+        # Bilancia principale e registro di tutte le bilance collegate: ogni
+        # bilancia aggiuntiva ottiene un proprio lettore
+        self.scale = ScaleDevice()
+        self.configure_scale(self.scale)
+        self.reader = self.create_reader(self.scale)
+        # Il legame della principale a un dispositivo lo scrive il suo lettore
+        self.scale_registry = ScaleRegistry(
+            self.scale, binder=lambda scale, scale_id: self.reader.call(lambda: scale.bind(scale_id))
+        )
+        self.extra_readers = []
+        self.scale_registry.add_scale_listener(self.start_extra_reader)
         
-    def test_local_api(self):
-        """Apre l'API nel browser per test locale"""
-        import webbrowser
-        local_url = f"http://127.0.0.1:{self.api_settings['port']}"
-        webbrowser.open(local_url)
+        # Le nuove bilance e le riconnessioni sono guidate dagli eventi di
+        # collegamento (notifiche libusb o controllo leggero dell'elenco dei
+        # dispositivi), non da scansioni complete del bus a ogni ciclo
+        self.hotplug = HotplugMonitor(self.scale.backend)
+        self.hotplug.add_listener(self.on_devices_changed)
         
-    def copy_ip_info(self):
-        """Copia informazioni IP negli appunti"""
-        import socket
+        # Profili di tara della bilancia principale, salvati nelle impostazioni
+        self.profiles = TareProfiles(self.scale, self.settings_manager)
         
-        try:
-            # Ottieni IP locale
-            hostname = socket.gethostname()
-            local_ip = socket.gethostbyname(hostname)
+        # Registro persistente delle pesate assestate
+        journal_settings = self.settings_manager.get_journal_settings()
+        self.journal = None
+        if journal_settings["enabled"]:
+            self.journal = WeightJournal(
+                journal_settings["directory"],
+                max_bytes=journal_settings["max_bytes"],
+                rotate_seconds=journal_settings["rotate_seconds"],
+                fsync_interval=journal_settings["fsync_interval"]
+            )
             
-            info = f"""Informazioni IP per Scale Manager API:
-
-Host configurato: {self.api_settings['host']}
-Porta: {self.api_settings['port']}
-IP locale rilevato: {local_ip}
-
-URL per test locale:
-http://127.0.0.1:{self.api_settings['port']}
-
-URL per accesso esterno:
-http://{local_ip}:{self.api_settings['port']}
+        self.api = ScaleAPI(
+            self.scale, api_settings["host"], api_settings["port"],
+            server=api_settings["server"],
+            threads=api_settings["threads"],
+            keepalive_timeout=api_settings["keepalive_timeout"],
+            journal=self.journal,
+            registry=self.scale_registry,
+            core=self.core,
+            command_handler=self.submit_command,
+            reader=self.reader,
+            profiles=self.profiles,
+            stream_interval=self.settings_manager.get_sampling_settings()["min_publish_interval"]
+        )
+        # Un client in arrivo risveglia subito i lettori in idle
+        self.api.add_demand_listener(self.wake_readers)
+        
+    def start(self, start_api=None) -> bool:
+        """Avvia registro, API e lettori; ritorna False se l'API non parte
 
-Endpoint API:
-http://{local_ip}:{self.api_settings['port']}/api/weight
-http://{local_ip}:{self.api_settings['port']}/api/status"""
+        Con start_api=None l'API viene avviata secondo l'impostazione autostart.
+        """
+        if self.core is not None:
+            self.core.start()
+        if self.journal is not None:
+            self.journal.start()
             
-            # Copia negli appunti
-            import subprocess
-            subprocess.run(['clip'], input=info.encode('utf-8'), shell=True)
+        api_ok = True
+        if start_api is None:
+            start_api = self.settings_manager.get_api_settings()["autostart"]
+        if start_api:
+            api_ok = self.api.start()
             
-            QMessageBox.information(self, "Info Copiate", 
-                "Le informazioni IP sono state copiate negli appunti!\n\n"
-                "Incollale dove serve per accedere all'API.")
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Errore", f"Impossibile ottenere IP: {str(e)}")
-
-
-# Dialog personalizzato per l'aiuto API semplice
-class APIHelpDialog(QDialog):
-    def __init__(self, api_settings, parent=None):
-        super().__init__(parent)
-        self.api_settings = api_settings
-        self.setup_ui()
-        
-    def setup_ui(self):
-        """Configura l'interfaccia del dialog di aiuto"""
-        self.setWindowTitle("Aiuto API - Scale Manager Lite")
-        self.setMinimumSize(500, 400)
-        self.setModal(True)
-        
-        layout = QVBoxLayout(self)
-        
-        # Titolo
-        title_label = QLabel("📡 API Scale Manager Lite")
-        title_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #4DC0FF; margin-bottom: 15px;")
-        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(title_label)
-        
-        # Area di testo per i contenuti dell'aiuto
-        self.help_text = QTextEdit()
-        self.help_text.setReadOnly(True)
-        self.help_text.setFont(QFont("Consolas", 10))
-        
-        # Contenuto dell'aiuto base
-        base_url = f"http://{self.api_settings['host']}:{self.api_settings['port']}"
-        help_content = f"""
-<h3 style="color: #4DC0FF;">🔗 Informazioni di Accesso</h3>
-<p><strong>URL Base:</strong> <a href="{base_url}" style="color: #6BFF72;">{base_url}</a></p>
-
-<h3 style="color: #4DC0FF;">📋 Endpoint Disponibili</h3>
-
-<div style="background-color: #3F3F46; padding: 10px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">⚖️ GET /api/weight</h4>
-<p><strong>URL:</strong> <a href="{base_url}/api/weight" style="color: #6BFF72;">{base_url}/api/weight</a></p>
-<p>Restituisce il peso attuale della bilancia in formato JSON.</p>
-</div>
-
-<div style="background-color: #3F3F46; padding: 10px; margin: 10px 0; border-radius: 5px;">
-<h4 style="color: #FFD700;">📊 GET /api/status</h4>
-<p><strong>URL:</strong> <a href="{base_url}/api/status" style="color: #6BFF72;">{base_url}/api/status</a></p>
-<p>Restituisce lo stato della bilancia e dell'API.</p>
-</div>
-
-<h3 style="color: #4DC0FF;">💻 Esempi di Utilizzo</h3>
-<pre style="background-color: #2d2d30; color: #6BFF72; padding: 8px; border-radius: 3px;">
-# Command Line
-curl {base_url}/api/weight
-
-# Browser
-Vai a: {base_url}/
-</pre>
-"""
-        
-        self.help_text.setHtml(help_content)
-        self.help_text.setStyleSheet("""
-            QTextEdit {
-                background-color: #2d2d30;
-                color: #ffffff;
-                border: 1px solid #3f3f46;
-                border-radius: 5px;
-                padding: 10px;
-            }
-        """)
-        
-        layout.addWidget(self.help_text)
-        
-        # Pulsanti
-        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
-        button_box.rejected.connect(self.accept)
+        # Associa le bilance collegate e avvia i thread di lettura
+        self.scale_registry.scan()
+        self.reader.start()
+        self.hotplug.start()
+        return api_ok
         
-        # Pulsante per aprire nel browser
-        open_browser_btn = QPushButton("🌐 Apri nel Browser")
-        open_browser_btn.clicked.connect(self.open_in_browser)
-        open_browser_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold; padding: 8px 15px; border-radius: 3px;")
-        button_box.addButton(open_browser_btn, QDialogButtonBox.ButtonRole.ActionRole)
-        
-        layout.addWidget(button_box)
-        
-        # Applica stile al dialog
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #2d2d30;
-                color: #ffffff;
-            }
-            QLabel {
-                color: #ffffff;
-            }
-        """)
-        
-    def open_in_browser(self):
-        """Apre l'API nel browser predefinito"""
-        import webbrowser
-        base_url = f"http://{self.api_settings['host']}:{self.api_settings['port']}"
-        webbrowser.open(base_url)
-
+    def on_devices_changed(self):
+        """Una bilancia è stata collegata o scollegata
 
-# UI principale
-class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        
-        # Inizializzazione degli oggetti principali
-        self.scale = ScaleDevice()
-        self.settings_manager = SettingsManager()
-        
-        # Inizializza l'API con le impostazioni salvate
-        api_settings = self.settings_manager.get_api_settings()
-        self.api = ScaleAPI(self.scale, api_settings["host"], api_settings["port"])
-        
-        # Autostart dell'API se abilitato
-        if api_settings["autostart"]:
-            self.api.start()
-        
-        # Inizializza il gestore dell'avvio automatico
-        self.autostart_manager = AutoStartManager(APP_NAME, APP_PATH)
-        
-        # Sincronizza le impostazioni di avvio automatico con Windows
-        app_settings = self.settings_manager.get_application_settings()
-        if app_settings["autostart_windows"] != self.autostart_manager.is_autostart_enabled():
-            if app_settings["autostart_windows"]:
-                self.autostart_manager.enable_autostart()
-            else:
-                self.autostart_manager.disable_autostart()
-        
-        # Thread per la lettura della bilancia
-        self.scale_thread = QThread()
-        self.scale_worker = ScaleReaderWorker(self.scale)
-        self.scale_worker.moveToThread(self.scale_thread)
-        
-        # Connessione dei segnali
-        self.scale_thread.started.connect(self.scale_worker.run)
-        self.scale_worker.weight_read.connect(self.update_weight_display)
-        self.scale_worker.error_occurred.connect(self.show_error)
-        self.scale_worker.connected.connect(self.update_connection_status)
-        
-        # Timer per rilevamento automatico della bilancia
-        self.auto_detect_timer = QTimer(self)
-        self.auto_detect_timer.timeout.connect(self.auto_detect_scale)
-        
-        # Setup dell'interfaccia utente
-        self.setup_ui()
-        
-        # Avvio minimizzato se configurato
-        if app_settings["start_minimized"]:
-            self.showMinimized()
-        
-        # Timer per aggiornamento UI
-        self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.update_ui)
-        self.update_timer.start(1000)  # Aggiorna UI ogni secondo
-        
-        # Avvio del thread di lettura
-        self.scale_thread.start()
+        Registra le bilance nuove e chiede a ogni lettore una verifica
+        immediata: chi attende la riconnessione si risveglia subito, chi è
+        connesso controlla che il proprio dispositivo sia ancora presente.
+        """
+        self.scale_registry.scan()
+        for reader in [self.reader] + self.extra_readers:
+            if reader.running:
+                reader.submit(COMMAND_RESCAN)
+                
+    def configure_scale(self, scale):
+        """Applica alla bilancia tentativi e pausa di lettura delle impostazioni"""
+        sampling = self.settings_manager.get_sampling_settings()
+        scale.max_attempts = sampling["max_attempts"]
+        scale.retry_delay = sampling["retry_delay"]
         
-        # Avvio del timer di rilevamento automatico
-        self.auto_detect_timer.start(10000)  # Controlla ogni 10 secondi
-
-    def auto_detect_scale(self):
-        """Verifica periodicamente se la bilancia è connessa"""
-        if not self.scale.connected:
-            logger.debug("Verifica automatica presenza bilancia...")
-            if self.scale.find_usb_scale():
-                self.statusBar().showMessage("Bilancia rilevata automaticamente")
-                self.update_connection_status(True, "USB")
+    def create_reader(self, scale, **callbacks) -> ScaleReader:
+        """Lettore della bilancia adatto al backend configurato"""
+        sampling = self.settings_manager.get_sampling_settings()
+        options = dict(
+            callbacks,
+            min_publish_interval=sampling["min_publish_interval"],
+            read_timeout_ms=sampling["read_timeout_ms"],
+            adaptive=sampling["adaptive"],
+            idle_after=sampling["idle_after"],
+            idle_interval=sampling["idle_interval"]
+        )
+        if self.core is not None:
+            reader = AsyncScaleReader(scale, self.core, **options)
         else:
-            # Se siamo già connessi, verifichiamo che la connessione sia ancora valida
-            if not self.scale.is_device_connected():
-                logger.warning("Bilancia disconnessa rilevata dal controllo periodico")
-                self.scale.connected = False
-                self.scale.device = None
-                self.scale.endpoint = None
-                self.update_connection_status(False, "")
-        
-    def setup_ui(self):
-        """Configurazione dell'interfaccia utente"""
-        self.setWindowTitle("Scale Manager Lite")
-        self.setMinimumSize(450, 400)
-        
-        # Widget principale
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        
-        # Layout principale
-        main_layout = QVBoxLayout(central_widget)
-        main_layout.setSpacing(15)  # Aumenta lo spazio tra i widget
-        
-        # Sezione principale - Display peso
-        weight_group = QGroupBox("Peso Attuale")
-        weight_layout = QVBoxLayout(weight_group)
-        weight_layout.setSpacing(10)  # Aumenta lo spazio tra gli elementi
-        
-        # Display grande del peso
-        self.weight_label = QLabel("0")
-        self.weight_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.weight_label.setFont(QFont("Arial", 60, QFont.Weight.Bold))
-        self.weight_label.setStyleSheet("color: #4DC0FF;") # Colore azzurro per il peso
-        weight_layout.addWidget(self.weight_label)
-        
-        # Unità di misura
-        self.unit_label = QLabel("g")
-        self.unit_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.unit_label.setFont(QFont("Arial", 24))
-        self.unit_label.setStyleSheet("color: #CCCCCC;") # Colore grigio chiaro
-        weight_layout.addWidget(self.unit_label)
-        
-        # Stato connessione
-        self.connection_label = QLabel("Non connesso")
-        self.connection_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.connection_label.setStyleSheet("color: #FF6B6B;") # Colore rosso per disconnesso
-        weight_layout.addWidget(self.connection_label)
-        
-        # Pulsanti di azione rapida
-        actions_layout = QHBoxLayout()
-        
-        self.connect_button = QPushButton("Cerca Bilancia")
-        self.connect_button.clicked.connect(self.find_scale)
-        self.connect_button.setMinimumHeight(40) # Pulsante più grande
-        actions_layout.addWidget(self.connect_button)
-        
-        weight_layout.addLayout(actions_layout)
-        
-        main_layout.addWidget(weight_group)
-        
-        # Impostazioni API
-        api_group = QGroupBox("Impostazioni API")
-        api_layout = QGridLayout(api_group)
-        api_layout.setVerticalSpacing(10) # Spaziatura maggiore
-        
-        # Etichette con colore distintivo
-        host_label = QLabel("Host:")
-        host_label.setStyleSheet("color: #CCCCCC; font-weight: bold;")
-        api_layout.addWidget(host_label, 0, 0)
-        
-        api_settings = self.settings_manager.get_api_settings()
-        self.api_host_edit = QLineEdit(api_settings["host"])
-        self.api_host_edit.setStyleSheet("color: #FFFFFF; background-color: #3F3F46; padding: 5px; border-radius: 3px; border: 1px solid #555555;")
-        self.api_host_edit.setPlaceholderText("es. 0.0.0.0 o 192.168.1.100")
-        api_layout.addWidget(self.api_host_edit, 0, 1)
-        
-        port_label = QLabel("Porta:")
-        port_label.setStyleSheet("color: #CCCCCC; font-weight: bold;")
-        api_layout.addWidget(port_label, 1, 0)
-        
-        self.api_port_spin = QSpinBox()
-        self.api_port_spin.setRange(1024, 65535)
-        self.api_port_spin.setValue(api_settings["port"])
-        self.api_port_spin.setMinimumHeight(30) # Spinbox più grande
-        api_layout.addWidget(self.api_port_spin, 1, 1)
-        
-        self.api_autostart_check = QCheckBox("Avvia API automaticamente all'avvio")
-        self.api_autostart_check.setChecked(api_settings["autostart"])
-        api_layout.addWidget(self.api_autostart_check, 2, 0, 1, 2)
-        
-        api_status_layout = QHBoxLayout()
-        self.api_status_label = QLabel("API: Inattiva")
-        self.api_status_label.setStyleSheet("color: #FF9A3C;") # Colore arancione per inattivo
-        api_status_layout.addWidget(self.api_status_label)
-        
-        self.api_toggle_button = QPushButton("Avvia API")
-        self.api_toggle_button.clicked.connect(self.toggle_api)
-        api_status_layout.addWidget(self.api_toggle_button)
-        
-        api_layout.addLayout(api_status_layout, 3, 0, 1, 2)
-        
-        # Layout per i pulsanti di impostazioni API
-        api_buttons_layout = QHBoxLayout()
-        
-        self.api_save_button = QPushButton("Salva Impostazioni API")
-        self.api_save_button.clicked.connect(self.save_api_settings)
-        api_buttons_layout.addWidget(self.api_save_button)
-        
-        self.api_help_button = QPushButton("📖 Aiuto API")
-        self.api_help_button.clicked.connect(self.show_api_help)
-        self.api_help_button.setStyleSheet("background-color: #4CAF50;")  # Verde per il pulsante aiuto
-        api_buttons_layout.addWidget(self.api_help_button)
-        
-        self.setup_help_button = QPushButton("🔧 Setup Esterno")
-        self.setup_help_button.clicked.connect(self.show_setup_help)
-        self.setup_help_button.setStyleSheet("background-color: #FF9A3C;")  # Arancione per setup
-        api_buttons_layout.addWidget(self.setup_help_button)
-        
-        api_layout.addLayout(api_buttons_layout, 4, 0, 1, 2)
-        
-        main_layout.addWidget(api_group)
+            reader = ScaleReader(scale, **options)
+        # I client dell'API tengono il lettore a piena velocità (l'API viene
+        # creata dopo il lettore principale, quindi la si cerca al momento)
+        reader.add_demand_source(lambda: self.api.has_demand())
+        return reader
         
-        # Impostazioni applicazione
-        app_group = QGroupBox("Impostazioni Applicazione")
-        app_layout = QVBoxLayout(app_group)
-        app_layout.setSpacing(10) # Spaziatura maggiore
-        
-        app_settings = self.settings_manager.get_application_settings()
-        
-        self.start_minimized_check = QCheckBox("Avvia minimizzato")
-        self.start_minimized_check.setChecked(app_settings["start_minimized"])
-        app_layout.addWidget(self.start_minimized_check)
-        
-        self.autostart_windows_check = QCheckBox("Avvia automaticamente all'avvio di Windows")
-        self.autostart_windows_check.setChecked(app_settings["autostart_windows"])
-        app_layout.addWidget(self.autostart_windows_check)
-        
-        self.app_save_button = QPushButton("Salva Impostazioni Applicazione")
-        self.app_save_button.clicked.connect(self.save_app_settings)
-        app_layout.addWidget(self.app_save_button)
-        
-        main_layout.addWidget(app_group)
-        
-        # Barra di stato
-        self.statusBar().showMessage("Pronto")
-        
-        # Carica lo stile
-        self.set_style()
+    def wake_readers(self):
+        """Riporta a piena velocità i lettori in idle"""
+        for reader in [self.reader] + self.extra_readers:
+            reader.wake()
+            
+    def start_extra_reader(self, scale):
+        """Avvia un lettore per una bilancia aggiuntiva"""
+        if scale is self.scale:
+            return
+        self.configure_scale(scale)
+        reader = self.create_reader(
+            scale,
+            on_error=lambda message, scale_id=scale.device_id: logger.warning(f"[{scale_id}] {message}")
+        )
+        self.extra_readers.append(reader)
+        reader.start()
         
-    def set_style(self):
-        """Imposta lo stile dell'interfaccia utente con colori più contrastanti"""
-        style = """
-        QMainWindow {
-            background-color: #2d2d30;
-            color: #ffffff;
-        }
-        QWidget {
-            background-color: #2d2d30;
-            color: #ffffff;
-        }
-        QLabel {
-            color: #ffffff;
-            font-weight: normal;
-        }
-        QGroupBox {
-            border: 1px solid #3f3f46;
-            border-radius: 5px;
-            margin-top: 1.5ex;
-            padding-top: 10px;
-            font-weight: bold;
-            color: #4dc0ff;
-            background-color: #333337;
-        }
-        QGroupBox::title {
-            subcontrol-origin: margin;
-            subcontrol-position: top center;
-            padding: 0 8px;
-            color: #4dc0ff;
-            background-color: #333337;
-        }
-        QPushButton {
-            background-color: #0078d7;
-            color: white;
-            border: none;
-            border-radius: 3px;
-            padding: 8px 15px;
-            font-weight: bold;
-        }
-        QPushButton:hover {
-            background-color: #1c86d9;
-        }
-        QPushButton:pressed {
-            background-color: #0063b1;
-        }
-        QSpinBox {
-            background-color: #3f3f46;
-            color: white;
-            border: 1px solid #555555;
-            padding: 4px;
-            border-radius: 3px;
-        }
-        QLineEdit {
-            background-color: #3f3f46;
-            color: white;
-            border: 1px solid #555555;
-            padding: 4px;
-            border-radius: 3px;
-        }
-        QCheckBox {
-            color: #ffffff;
-        }
-        QCheckBox::indicator {
-            width: 18px;
-            height: 18px;
-        }
-        QCheckBox::indicator:unchecked {
-            border: 1px solid #5f5f5f;
-            background-color: #3f3f46;
-        }
-        QCheckBox::indicator:checked {
-            border: 1px solid #5f5f5f;
-            background-color: #0078d7;
-        }
-        QStatusBar {
-            background-color: #1e1e1e;
-            color: #999999;
-        }
+    def submit_command(self, command, scale_id=None) -> concurrent.futures.Future:
+        """Invia un comando al lettore della bilancia indicata (default: la principale)
+
+        Solo il lettore tocca il dispositivo USB: GUI e API passano sempre da qui.
         """
-        self.setStyleSheet(style)
-        
-    def update_ui(self):
-        """Aggiorna l'interfaccia utente"""
-        # Aggiorna lo stato dell'API
-        if self.api.running:
-            self.api_status_label.setText(f"API: Attiva su {self.api.host}:{self.api.port}")
-            self.api_status_label.setStyleSheet("color: #6BFF72;") # Verde per attivo
-            self.api_toggle_button.setText("Ferma API")
-        else:
-            self.api_status_label.setText("API: Inattiva")
-            self.api_status_label.setStyleSheet("color: #FF9A3C;") # Arancione per inattivo
-            self.api_toggle_button.setText("Avvia API")
-        
-    def update_weight_display(self, weight):
-        """Aggiorna il display del peso"""
-        self.weight_label.setText(str(weight))
-        
-    def update_connection_status(self, connected, conn_type):
-        """Aggiorna lo stato della connessione"""
-        if connected:
-            self.connection_label.setText(f"Connesso ({conn_type})")
-            self.connection_label.setStyleSheet("color: #6BFF72;") # Verde per connesso
-            self.statusBar().showMessage(f"Bilancia connessa via {conn_type}")
-        else:
-            self.connection_label.setText("Non connesso")
-            self.connection_label.setStyleSheet("color: #FF6B6B;") # Rosso per non connesso
-            self.statusBar().showMessage("Bilancia non connessa")
-        
-    def show_error(self, message):
-        """Mostra un messaggio di errore"""
-        self.statusBar().showMessage(f"Errore: {message}")
-        logger.error(message)
-        
-    def find_scale(self):
-        """Cerca la bilancia"""
-        self.statusBar().showMessage("Ricerca bilancia in corso...")
-        
-        if self.scale.find_usb_scale():
-            self.update_connection_status(True, "USB")
-            return True
+        reader = self.reader
+        if scale_id is not None and scale_id != self.scale.device_id:
+            reader = next((r for r in self.extra_readers if r.scale.device_id == scale_id), None)
+            if reader is None:
+                raise KeyError(scale_id)
+        return reader.submit(command)
         
-        self.update_connection_status(False, "")
-        QMessageBox.warning(self, "Errore", "Nessuna bilancia trovata.")
-        return False
+    def stop(self):
+        """Ferma lettori, API e registro pesate"""
+        self.hotplug.stop()
         
-    def toggle_api(self):
-        """Avvia o ferma l'API"""
-        if self.api.running:
-            self.api.stop()
-            self.statusBar().showMessage("API fermata")
-        else:
-            # Aggiorna le impostazioni dell'API
-            self.api.host = self.api_host_edit.text()
-            self.api.port = self.api_port_spin.value()
-            self.api.start()
-            self.statusBar().showMessage(f"API avviata su {self.api.host}:{self.api.port}")
-            
-    def save_api_settings(self):
-        """Salva le impostazioni dell'API"""
-        host = self.api_host_edit.text().strip()
-        port = self.api_port_spin.value()
-        autostart = self.api_autostart_check.isChecked()
-        
-        # Validazione dell'host
-        if not host:
-            QMessageBox.warning(self, "Errore", "Il campo host non può essere vuoto.")
-            return
+        # Ferma i lettori
+        self.reader.stop()
+        for reader in self.extra_readers:
+            reader.stop()
             
-        # Validazione IP (semplice)
-        if not self.validate_host(host):
-            QMessageBox.warning(self, "Errore", 
-                "Host non valido. Usa:\n"
-                "• 0.0.0.0 (tutte le interfacce)\n"
-                "• 127.0.0.1 (solo locale)\n" 
-                "• Un IP valido (es. 192.168.1.100)")
-            return
+        # Disconnette le bilance
+        self.scale.disconnect()
+        for _, scale in self.scale_registry.items():
+            if scale is not self.scale:
+                scale.disconnect()
+                
+        # Ferma l'API
+        self.api.stop()
         
-        if self.settings_manager.update_api_settings(host, port, autostart):
-            self.statusBar().showMessage("Impostazioni API salvate")
-            
-            # Se l'API è in esecuzione, riavviala con le nuove impostazioni
-            if self.api.running:
-                self.api.stop()
-                self.api.host = host
-                self.api.port = port
-                self.api.start()
-        else:
-            QMessageBox.warning(self, "Errore", "Impossibile salvare le impostazioni API")
-            
-    def save_app_settings(self):
-        """Salva le impostazioni dell'applicazione"""
-        start_minimized = self.start_minimized_check.isChecked()
-        autostart_windows = self.autostart_windows_check.isChecked()
+        # Salva gli ultimi valori dei profili di tara
+        self.profiles.close()
         
-        if self.settings_manager.update_application_settings(start_minimized, autostart_windows):
-            self.statusBar().showMessage("Impostazioni applicazione salvate")
+        # Scrive su disco le ultime pesate
+        if self.journal is not None:
+            self.journal.close()
             
-            # Gestisce l'avvio automatico di Windows
-            if autostart_windows:
-                self.autostart_manager.enable_autostart()
-            else:
-                self.autostart_manager.disable_autostart()
-        else:
-            QMessageBox.warning(self, "Errore", "Impossibile salvare le impostazioni dell'applicazione")
+        if self.core is not None:
+            self.core.stop()
+
+
+def run_headless(settings_file) -> int:
+    """Esegue lettore e API senza interfaccia grafica fino a SIGINT/SIGTERM"""
+    service = ScaleService(SettingsManager(settings_file))
+    stop_event = threading.Event()
     
-    def validate_host(self, host):
-        """Valida l'indirizzo host"""
-        import re
-        
-        # Pattern per IP valido
-        ip_pattern = r'^(\d{1,3}\.){3}\d{1,3}$'
-        
-        # Controlla se è un IP valido
-        if re.match(ip_pattern, host):
-            # Verifica che ogni ottetto sia tra 0-255
-            octets = host.split('.')
-            for octet in octets:
-                if not (0 <= int(octet) <= 255):
-                    return False
-            return True
+    def request_stop(signum, frame):
+        logger.info("Arresto richiesto")
+        stop_event.set()
         
-        # Accetta anche localhost
-        if host in ['localhost', '0.0.0.0', '127.0.0.1']:
-            return True
-            
-        return False
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, request_stop)
+        
+    # Senza interfaccia l'API è l'unico accesso ai dati: viene sempre avviata
+    if not service.start(start_api=True):
+        logger.error("Impossibile avviare l'API, arresto")
+        service.stop()
+        return 1
+    logger.info("Scale Manager Lite avviato in modalità headless")
     
-    def show_api_help(self):
-        """Mostra l'aiuto per l'API"""
-        api_settings = self.settings_manager.get_api_settings()
-        dialog = APIHelpDialog(api_settings, self)
-        dialog.exec()
+    # Attesa a intervalli per restare reattivi ai segnali anche su Windows
+    while not stop_event.wait(1.0):
+        pass
+    service.stop()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Scale Manager Lite - server per bilance Dymo")
+    parser.add_argument("--headless", action="store_true",
+                        help="avvia lettore e API senza interfaccia grafica (PyQt6 non richiesto)")
+    parser.add_argument("--settings", default="scale_manager_settings.json",
+                        help="file delle impostazioni (default: %(default)s)")
+    args = parser.parse_args(argv)
     
-    def show_setup_help(self):
-        """Mostra l'aiuto per il setup esterno dell'API"""
-        api_settings = self.settings_manager.get_api_settings()
-        dialog = SetupHelpDialog(api_settings, self)
-        dialog.exec()
-        
-    def closeEvent(self, event):
-        """Gestisce l'evento di chiusura dell'applicazione"""
-        # Ferma il thread di lettura
-        self.scale_worker.stop()
-        self.scale_thread.quit()
-        self.scale_thread.wait()
-        
-        # Disconnette la bilancia
-        self.scale.disconnect()
-        
-        # Ferma l'API
-        self.api.stop()
+    if args.headless:
+        return run_headless(args.settings)
         
-        # Accetta l'evento di chiusura
-        event.accept()
+    # L'interfaccia grafica viene importata solo quando serve
+    from scale_gui import run_gui
+    return run_gui(args.settings)
 
 
 # Punto di ingresso principale
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
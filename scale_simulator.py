@@ -0,0 +1,304 @@
+"""
+Scale Manager Lite - Bilancia Dymo simulata
+---------------------------------------------------
+Backend pyusb che simula una o più bilance Dymo M5/M10, da passare a
+ScaleDevice al posto del backend libusb:
+
+    backend = SimulatedDymoBackend([SimulatedDymo(error_rate=0.01)])
+    scale = ScaleDevice(backend=backend)
+
+La bilancia simulata invia report HID realistici (bilancia vuota, carico in
+salita, assestamento con rumore, peso stabile, scarico) e può generare
+errori USB (stallo, errori transitori) e scollegamenti periodici, così
+ricerca, lettura e riconnessione seguono lo stesso percorso del dispositivo
+reale senza una bilancia fisica.
+"""
+
+import errno
+import itertools
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import usb.backend
+import usb.core
+
+from scale_server import (
+    DYMO_PRODUCT_ID, DYMO_STATUS_IN_MOTION, DYMO_STATUS_OVERLOAD, DYMO_STATUS_STABLE,
+    DYMO_STATUS_STABLE_ZERO, DYMO_STATUS_UNDER_ZERO, DYMO_VENDOR_ID, UNIT_CODES,
+)
+
+# Codici di errore libusb corrispondenti agli errno usati da pyusb
+LIBUSB_ERROR_IO = -1
+LIBUSB_ERROR_NO_DEVICE = -4
+LIBUSB_ERROR_TIMEOUT = -7
+LIBUSB_ERROR_PIPE = -9
+
+# Endpoint interrupt IN della Dymo M5/M10
+SIMULATED_ENDPOINT = 0x82
+SIMULATED_PACKET_SIZE = 6
+# Portata della Dymo M10 in grammi
+SIMULATED_CAPACITY = 10000
+# Indirizzi USB assegnati alle bilance simulate, come farebbe l'host: unici
+# per ogni dispositivo (l'indirizzo 1 è dell'hub radice)
+_addresses = itertools.count(2)
+
+
+def usb_error(code, error_number, message):
+    """USBError come lo solleverebbe il backend libusb1"""
+    return usb.core.USBError(message, code, error_number)
+
+
+# Sequenza ciclica di pesate: per ogni peso la bilancia è vuota, il carico
+# sale, oscilla mentre si assesta, resta stabile e infine viene tolto
+class WeighingScenario:
+    def __init__(self, weights=(250, 1200, 480), empty_seconds=1.0, ramp_seconds=0.4,
+                 settle_seconds=0.3, hold_seconds=2.0, noise_grams=2.0, seed=None):
+        self.weights = tuple(weights)
+        self.empty_seconds = empty_seconds
+        self.ramp_seconds = ramp_seconds
+        self.settle_seconds = settle_seconds
+        self.hold_seconds = hold_seconds
+        self.noise_grams = noise_grams
+        self.random = random.Random(seed)
+        self.phase_seconds = (empty_seconds + 2 * ramp_seconds + settle_seconds + hold_seconds)
+
+    def weight_at(self, elapsed):
+        """Peso in grammi e stato della bilancia dopo `elapsed` secondi"""
+        cycle = int(elapsed // self.phase_seconds)
+        target = self.weights[cycle % len(self.weights)]
+        t = elapsed - cycle * self.phase_seconds
+
+        if t < self.empty_seconds:
+            return 0, DYMO_STATUS_STABLE_ZERO
+        t -= self.empty_seconds
+        if t < self.ramp_seconds:
+            grams = target * t / self.ramp_seconds + self.random.gauss(0, self.noise_grams)
+            return round(grams), DYMO_STATUS_IN_MOTION
+        t -= self.ramp_seconds
+        if t < self.settle_seconds:
+            # Oscillazione smorzata attorno al peso finale
+            damping = 1 - t / self.settle_seconds
+            grams = target + self.random.gauss(0, self.noise_grams * (1 + 4 * damping))
+            return round(grams), DYMO_STATUS_IN_MOTION
+        t -= self.settle_seconds
+        if t < self.hold_seconds:
+            return target, DYMO_STATUS_STABLE
+        t -= self.hold_seconds
+        grams = target * (1 - t / self.ramp_seconds) + self.random.gauss(0, self.noise_grams)
+        return round(grams), DYMO_STATUS_IN_MOTION
+
+    def report(self, elapsed):
+        """Report HID [report id, stato, unità, esponente, peso LSB, peso MSB]"""
+        grams, status = self.weight_at(elapsed)
+        if grams < 0:
+            status = DYMO_STATUS_UNDER_ZERO
+        elif grams > SIMULATED_CAPACITY:
+            status = DYMO_STATUS_OVERLOAD
+        raw = min(abs(grams), 0xFFFF)
+        return [3, status, UNIT_CODES["g"], 0, raw & 0xFF, raw >> 8]
+
+
+# Bilancia simulata collegata a una porta del bus
+class SimulatedDymo:
+    def __init__(self, scenario=None, report_interval=0.005, error_rate=0.0,
+                 stall_ratio=0.5, disconnect_every=None, disconnect_seconds=1.0,
+                 control_latency=0.002, bus=1, port_numbers=(1,), seed=None):
+        self.scenario = scenario or WeighingScenario(seed=seed)
+        self.report_interval = report_interval
+        # Durata di un SET_CONFIGURATION, che reinizializza il dispositivo
+        self.control_latency = control_latency
+        # Probabilità che una lettura fallisca, e quota di quei fallimenti in stallo
+        self.error_rate = error_rate
+        self.stall_ratio = stall_ratio
+        # Scollegamento periodico: ogni `disconnect_every` s per `disconnect_seconds` s
+        self.disconnect_every = disconnect_every
+        self.disconnect_seconds = disconnect_seconds
+        self.random = random.Random(seed)
+        self.descriptor = SimpleNamespace(
+            bLength=18, bDescriptorType=1, bcdUSB=0x0110, bDeviceClass=0,
+            bDeviceSubClass=0, bDeviceProtocol=0, bMaxPacketSize0=8,
+            idVendor=DYMO_VENDOR_ID, idProduct=DYMO_PRODUCT_ID, bcdDevice=0x0100,
+            iManufacturer=0, iProduct=0, iSerialNumber=0, bNumConfigurations=1,
+            address=next(_addresses), bus=bus, port_number=port_numbers[-1],
+            port_numbers=tuple(port_numbers), speed=1,
+        )
+        self.started = time.monotonic()
+        self.configuration = 0
+        self.halted = False
+        self._plugged = True
+        self._manual_unplug = False
+        # Cambia a ogni scollegamento: gli handle aperti prima diventano invalidi
+        self.generation = 0
+        self._next_report = 0.0
+        self._lock = threading.Lock()
+        # Contatori e istante dell'ultimo report consegnato (per i benchmark)
+        self.reports = 0
+        self.errors = 0
+        self.disconnects = 0
+        self.configurations = 0
+        self.opens = 0
+        self.last_report_at = 0.0
+
+    @property
+    def plugged(self) -> bool:
+        with self._lock:
+            return self._update_plugged()
+
+    def _update_plugged(self) -> bool:
+        plugged = not self._manual_unplug
+        if plugged and self.disconnect_every:
+            period = self.disconnect_every + self.disconnect_seconds
+            plugged = (time.monotonic() - self.started) % period < self.disconnect_every
+        if plugged != self._plugged:
+            self._plugged = plugged
+            if not plugged:
+                self.generation += 1
+                self.disconnects += 1
+                self.configuration = 0
+                self.halted = False
+        return plugged
+
+    def unplug(self):
+        with self._lock:
+            self._manual_unplug = True
+            self._update_plugged()
+
+    def plug(self):
+        with self._lock:
+            self._manual_unplug = False
+            self._update_plugged()
+
+    def check(self, handle):
+        """Solleva NO_DEVICE se la bilancia è stata scollegata dopo l'apertura"""
+        with self._lock:
+            if not self._update_plugged() or handle.generation != self.generation:
+                raise usb_error(LIBUSB_ERROR_NO_DEVICE, errno.ENODEV, "No such device (it may have been disconnected)")
+
+    def read_report(self, handle, buff, timeout):
+        """Attende il prossimo report come un trasferimento interrupt"""
+        self.check(handle)
+        if self.halted:
+            raise usb_error(LIBUSB_ERROR_PIPE, errno.EPIPE, "Pipe error")
+
+        now = time.monotonic()
+        wait = self._next_report - now
+        if timeout and wait > timeout / 1000:
+            time.sleep(timeout / 1000)
+            raise usb.core.USBTimeoutError("Operation timed out", LIBUSB_ERROR_TIMEOUT, errno.ETIMEDOUT)
+        if wait > 0:
+            time.sleep(wait)
+        # Niente raffiche se il lettore è rimasto indietro: il report successivo
+        # arriva comunque dopo un intervallo
+        self._next_report = max(self._next_report + self.report_interval, time.monotonic())
+        self.check(handle)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            if self.random.random() < self.stall_ratio:
+                self.halted = True
+                raise usb_error(LIBUSB_ERROR_PIPE, errno.EPIPE, "Pipe error")
+            raise usb_error(LIBUSB_ERROR_IO, errno.EIO, "Input/Output Error")
+
+        data = self.scenario.report(time.monotonic() - self.started)
+        length = min(len(data), len(buff))
+        buff[:length] = type(buff)(buff.typecode, data[:length])
+        self.reports += 1
+        self.last_report_at = time.perf_counter()
+        return length
+
+
+# Handle aperto su una bilancia simulata
+class SimulatedHandle:
+    def __init__(self, device):
+        self.device = device
+        self.generation = device.generation
+
+
+# Backend pyusb che espone le bilance simulate al posto del bus USB reale
+class SimulatedDymoBackend(usb.backend.IBackend):
+    def __init__(self, devices=None):
+        self.devices = list(devices) if devices is not None else [SimulatedDymo()]
+        self.enumerations = 0
+
+    def enumerate_devices(self):
+        self.enumerations += 1
+        return [device for device in self.devices if device.plugged]
+
+    def get_parent(self, dev):
+        return None
+
+    def get_device_descriptor(self, dev):
+        return dev.descriptor
+
+    def get_configuration_descriptor(self, dev, config):
+        return SimpleNamespace(
+            bLength=9, bDescriptorType=2, wTotalLength=34, bNumInterfaces=1,
+            bConfigurationValue=1, iConfiguration=0, bmAttributes=0x80,
+            bMaxPower=50, extra_descriptors=[],
+        )
+
+    def get_interface_descriptor(self, dev, intf, alt, config):
+        return SimpleNamespace(
+            bLength=9, bDescriptorType=4, bInterfaceNumber=0, bAlternateSetting=0,
+            bNumEndpoints=1, bInterfaceClass=3, bInterfaceSubClass=0,
+            bInterfaceProtocol=0, iInterface=0, extra_descriptors=[],
+        )
+
+    def get_endpoint_descriptor(self, dev, ep, intf, alt, config):
+        return SimpleNamespace(
+            bLength=7, bDescriptorType=5, bEndpointAddress=SIMULATED_ENDPOINT,
+            bmAttributes=0x03, wMaxPacketSize=SIMULATED_PACKET_SIZE, bInterval=10,
+            bRefresh=0, bSynchAddress=0, extra_descriptors=[],
+        )
+
+    def open_device(self, dev):
+        if not dev.plugged:
+            raise usb_error(LIBUSB_ERROR_NO_DEVICE, errno.ENODEV, "No such device (it may have been disconnected)")
+        dev.opens += 1
+        return SimulatedHandle(dev)
+
+    def close_device(self, dev_handle):
+        pass
+
+    def set_configuration(self, dev_handle, config_value):
+        device = dev_handle.device
+        device.check(dev_handle)
+        time.sleep(device.control_latency)
+        device.configuration = config_value
+        device.configurations += 1
+        device.halted = False
+
+    def get_configuration(self, dev_handle):
+        dev_handle.device.check(dev_handle)
+        return dev_handle.device.configuration
+
+    def set_interface_altsetting(self, dev_handle, intf, altsetting):
+        dev_handle.device.check(dev_handle)
+
+    def claim_interface(self, dev_handle, intf):
+        dev_handle.device.check(dev_handle)
+
+    def release_interface(self, dev_handle, intf):
+        dev_handle.device.check(dev_handle)
+
+    def intr_read(self, dev_handle, ep, intf, buff, timeout):
+        return dev_handle.device.read_report(dev_handle, buff, timeout)
+
+    def clear_halt(self, dev_handle, ep):
+        dev_handle.device.check(dev_handle)
+        dev_handle.device.halted = False
+
+    def reset_device(self, dev_handle):
+        dev_handle.device.check(dev_handle)
+        dev_handle.device.halted = False
+
+    def is_kernel_driver_active(self, dev_handle, intf):
+        return False
+
+    def detach_kernel_driver(self, dev_handle, intf):
+        pass
+
+    def attach_kernel_driver(self, dev_handle, intf):
+        pass
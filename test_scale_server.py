@@ -0,0 +1,974 @@
+"""
+Scale Manager Lite - Test del servizio con la bilancia simulata
+---------------------------------------------------
+Eseguibili con: python -m unittest test_scale_server
+"""
+
+import errno
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import usb.core
+
+from scale_server import (DYMO_STATUS_IN_MOTION, DYMO_STATUS_STABLE, READER_CONNECTED,
+                          READER_DISCONNECTED, READER_IDLE, READER_PROBING, READER_READING,
+                          RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY, UNIT_CODES, USB_ERROR_DISCONNECTED,
+                          USB_ERROR_STALL, USB_ERROR_TIMEOUT, USB_ERROR_TRANSIENT, HotplugMonitor,
+                          ScaleAPI, ScaleDevice, ScaleReader, ScaleRegistry, SettingsManager,
+                          StabilityDetector, TareProfiles, WeightHistory, WeightJournal, WeightSample,
+                          classify_usb_error, decode_report)
+from scale_simulator import SimulatedDymo, SimulatedDymoBackend, WeighingScenario
+
+
+def steady_scale(grams=500):
+    """Bilancia simulata con un peso costante, senza rumore"""
+    scenario = WeighingScenario(weights=(grams,), empty_seconds=0.0, ramp_seconds=0.001,
+                                settle_seconds=0.001, hold_seconds=3600, noise_grams=0)
+    device = SimulatedDymo(scenario=scenario, seed=1)
+    return device, ScaleDevice(backend=SimulatedDymoBackend([device]))
+
+
+def publish(scale, grams):
+    """Pubblica un campione stabile di `grams` grammi, come farebbe una lettura"""
+    sample = WeightSample(grams, "g", grams, 0, DYMO_STATUS_STABLE, True, False, False, time.monotonic())
+    scale._publish_state(sample=sample, connected=True)
+
+
+class DecodeReportTest(unittest.TestCase):
+    @staticmethod
+    def held_report(grams):
+        """Report della bilancia simulata mentre `grams` resta sul piatto"""
+        scenario = WeighingScenario(weights=(grams,), empty_seconds=0.0, ramp_seconds=0.001,
+                                    settle_seconds=0.001, hold_seconds=10, noise_grams=0)
+        return scenario.report(1.0)
+
+    def test_under_zero_weight_is_negative(self):
+        sample = decode_report(self.held_report(-20))
+        self.assertEqual((sample.value, sample.raw, sample.unit), (-20, -20, "g"))
+        self.assertTrue(sample.under_zero)
+        self.assertFalse(sample.stable)
+
+    def test_overload_is_flagged_and_not_stable(self):
+        sample = decode_report(self.held_report(12000))
+        self.assertEqual(sample.value, 12000)
+        self.assertTrue(sample.overload)
+        self.assertFalse(sample.stable)
+
+    def test_ounces_use_the_signed_exponent(self):
+        sample = decode_report([3, DYMO_STATUS_STABLE, UNIT_CODES["oz"], 0xFF, 125, 0])
+        self.assertEqual((sample.value, sample.unit, sample.exponent), (12.5, "oz", -1))
+        self.assertTrue(sample.stable)
+        self.assertEqual(sample.format_value(), "12.5")
+        self.assertAlmostEqual(sample.grams, 354.369, places=3)
+
+    def test_short_report_is_ignored(self):
+        self.assertIsNone(decode_report([3, DYMO_STATUS_STABLE, UNIT_CODES["g"]]))
+
+
+class ConditionalWeightTest(unittest.TestCase):
+    def setUp(self):
+        self.device, self.scale = steady_scale()
+        self.reader = ScaleReader(self.scale)
+        self.api = ScaleAPI(self.scale, reader=self.reader)
+        self.client = self.api.app.test_client()
+        self.reader.start()
+        time.sleep(0.2)
+
+    def tearDown(self):
+        self.reader.stop()
+
+    def test_identical_reports_return_304(self):
+        first = self.client.get("/api/weight")
+        self.assertEqual(first.status_code, 200)
+        reports = self.device.reports
+        time.sleep(0.2)
+        self.assertGreater(self.device.reports, reports)
+        second = self.client.get("/api/weight", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+
+    def test_long_poll_waits_for_a_change(self):
+        seq = self.client.get("/api/weight").get_json()["seq"]
+        started = time.monotonic()
+        payload = self.client.get(f"/api/weight?since={seq}&wait=300").get_json()
+        self.assertEqual(payload["seq"], seq)
+        self.assertGreaterEqual(time.monotonic() - started, 0.25)
+
+    def test_parked_long_poll_counts_as_demand(self):
+        seq = self.client.get("/api/weight").get_json()["seq"]
+        poll = threading.Thread(target=self.client.get, args=(f"/api/weight?since={seq}&wait=500",))
+        poll.start()
+        time.sleep(0.1)
+        self.api._last_weight_request = 0.0
+        self.assertTrue(self.api.has_demand())
+        poll.join()
+        self.assertFalse(self.api.has_demand())
+
+    def test_weight_body_is_not_reused_across_devices_with_the_same_id(self):
+        first = self.api._weight_body(self.scale.state, "1-1")
+        _, other = steady_scale(grams=200)
+        self.assertTrue(other.find_usb_scale())
+        other.read_weight()
+        state = other.state._replace(seq=self.scale.state.seq)
+        self.assertNotEqual(self.api._weight_body(state, "1-1"), first)
+
+
+class StabilityTest(unittest.TestCase):
+    @staticmethod
+    def feed(detector, series, start, stable=True):
+        """Campioni a 50 ms l'uno dall'altro a partire dall'istante `start`"""
+        status = DYMO_STATUS_STABLE if stable else DYMO_STATUS_IN_MOTION
+        for i, grams in enumerate(series):
+            detector.add_sample(WeightSample(grams, "g", grams, 0, status, stable, False, False,
+                                             start + i * 0.05))
+
+    def test_noisy_then_settled_series_settles_once(self):
+        detector = StabilityDetector()
+        settles = []
+        detector.add_settle_listener(lambda settle_id, sample: settles.append(settle_id))
+        start = time.monotonic() - 10
+        self.feed(detector, [485 if i % 2 else 515 for i in range(20)], start)
+        self.assertEqual(detector.settle_id, 0)
+        self.feed(detector, [510 + i % 2 for i in range(20)], start + 1)
+        self.assertEqual(settles, [1])
+        self.assertEqual(detector.settle_id, 1)
+
+    def test_stable_after_waits_for_the_next_settle(self):
+        _, scale = steady_scale()
+        self.assertTrue(scale.find_usb_scale())
+        api = ScaleAPI(scale)
+        client = api.app.test_client()
+        self.feed(api.stability, [500] * 20, time.monotonic() - 10)
+        settle_id, _ = api.stability.current()
+        responses = []
+        waiter = threading.Thread(target=lambda: responses.append(
+            client.get(f"/api/weight/stable?after={settle_id}&timeout=5").get_json()))
+        waiter.start()
+        time.sleep(0.3)
+        # Lo stesso peso ancora sul piatto non è una nuova pesata
+        self.assertTrue(waiter.is_alive())
+        start = time.monotonic() - 1.5
+        self.feed(api.stability, [100, 400, 800], start, stable=False)
+        self.feed(api.stability, [800] * 20, start + 0.15)
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+        self.assertTrue(responses[0]["stable"])
+        self.assertEqual(responses[0]["settle_id"], settle_id + 1)
+        self.assertEqual(responses[0]["weight"], 800)
+
+
+class WeightStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.device, self.scale = steady_scale()
+        self.reader = ScaleReader(self.scale)
+        self.api = ScaleAPI(self.scale, reader=self.reader)
+        self.client = self.api.app.test_client()
+        self.reader.start()
+        time.sleep(0.2)
+
+    def tearDown(self):
+        self.reader.stop()
+
+    @staticmethod
+    def frames(response):
+        for chunk in response.response:
+            for line in chunk.split(b"\n"):
+                if line.startswith(b"data: "):
+                    yield json.loads(line[len(b"data: "):])
+
+    def test_stream_sends_an_event_per_change(self):
+        response = self.client.get("/api/weight/stream", buffered=False)
+        try:
+            frames = self.frames(response)
+            first = next(frames)
+            self.assertEqual(first["weight"], 500)
+            self.scale.set_offsets(tare_grams=100)
+            second = next(frames)
+            self.assertEqual(second["weight"], 400)
+            self.assertGreater(second["seq"], first["seq"])
+        finally:
+            response.close()
+        self.assertEqual(self.api.broadcaster.subscriber_count, 0)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerShutdownTest(unittest.TestCase):
+    server = "waitress"
+
+    def setUp(self):
+        self.device, self.scale = steady_scale()
+        self.reader = ScaleReader(self.scale)
+        self.port = free_port()
+        self.api = ScaleAPI(self.scale, host="127.0.0.1", port=self.port, server=self.server,
+                            reader=self.reader)
+        self.reader.start()
+        self.assertIsNotNone(self.api.stability.wait_for_stable(2.0))
+        self.assertTrue(self.api.start())
+
+    def tearDown(self):
+        self.api.stop()
+        self.reader.stop()
+        if self.api.core is not None:
+            self.api.core.stop()
+
+    def park(self, path, responses):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        connection.request("GET", path)
+        response = connection.getresponse()
+        responses[path] = (response.status, response.read())
+        connection.close()
+
+    def test_stop_wakes_parked_requests(self):
+        seq = self.scale.state.seq
+        settle_id, _ = self.api.stability.current()
+        paths = [f"/api/weight?since={seq}&wait=60000", f"/api/weight/stable?timeout=60&after={settle_id}"]
+        responses = {}
+        clients = [threading.Thread(target=self.park, args=(path, responses)) for path in paths]
+        for client in clients:
+            client.start()
+        deadline = time.monotonic() + 5
+        while self.api._waiters < len(paths) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.api._waiters, len(paths))
+        started = time.monotonic()
+        self.api.stop()
+        self.assertLess(time.monotonic() - started, 2.0)
+        for client in clients:
+            client.join(5)
+        self.assertEqual(responses[paths[0]][0], 200)
+        self.assertEqual(json.loads(responses[paths[0]][1])["seq"], seq)
+        self.assertEqual(responses[paths[1]][0], 503)
+
+
+class AsyncioServerShutdownTest(ServerShutdownTest):
+    server = "asyncio"
+
+
+class AsyncioApiTest(unittest.TestCase):
+    def setUp(self):
+        self.scale = ScaleDevice()
+        publish(self.scale, 500)
+        self.port = free_port()
+        self.api = ScaleAPI(self.scale, host="127.0.0.1", port=self.port, server="asyncio")
+        self.assertTrue(self.api.start())
+
+    def tearDown(self):
+        self.api.stop()
+        if self.api.core is not None:
+            self.api.core.stop()
+
+    def connect(self, path):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        connection.request("GET", path)
+        return connection, connection.getresponse()
+
+    def get_json(self, path):
+        connection, response = self.connect(path)
+        payload = json.loads(response.read())
+        connection.close()
+        return payload
+
+    def test_long_poll_returns_the_next_state(self):
+        seq = self.get_json("/api/weight")["seq"]
+        threading.Timer(0.2, publish, args=(self.scale, 400)).start()
+        started = time.monotonic()
+        payload = self.get_json(f"/api/weight?since={seq}&wait=5000")
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertEqual(payload["weight"], 400)
+        self.assertGreater(payload["seq"], seq)
+
+    def test_stream_sends_the_latest_state(self):
+        connection, response = self.connect("/api/weight/stream")
+        try:
+            frames = (json.loads(line[len(b"data: "):]) for line in response if line.startswith(b"data: "))
+            self.assertEqual(next(frames)["weight"], 500)
+            publish(self.scale, 400)
+            self.assertEqual(next(frames)["weight"], 400)
+        finally:
+            connection.close()
+
+
+class MetricsTest(unittest.TestCase):
+    server = "waitress"
+
+    def setUp(self):
+        # Un report ogni 60 s: dopo i primi due, consegnati subito, la lettura scade
+        scenario = WeighingScenario(weights=(500,), empty_seconds=0.0, hold_seconds=3600, noise_grams=0)
+        # Porta dedicata: le metriche di questa bilancia non si mescolano a quelle degli altri test
+        self.device = SimulatedDymo(scenario=scenario, report_interval=60, seed=1, port_numbers=(9,))
+        self.scale = ScaleDevice(backend=SimulatedDymoBackend([self.device]))
+        self.assertTrue(self.scale.find_usb_scale())
+        self.assertIsNotNone(self.scale.read_weight())
+        self.port = free_port()
+        self.api = ScaleAPI(self.scale, host="127.0.0.1", port=self.port, server=self.server)
+        self.assertTrue(self.api.start())
+
+    def tearDown(self):
+        self.api.stop()
+        if self.api.core is not None:
+            self.api.core.stop()
+
+    def get(self, path):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        connection.request("GET", path)
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        return response.status, body
+
+    def scrape(self):
+        status, body = self.get("/metrics")
+        self.assertEqual(status, 200)
+        values = {}
+        for line in body.decode().splitlines():
+            if line and not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                values[name] = float(value)
+        return values
+
+    def test_counters_after_a_read_and_a_request(self):
+        scale = self.scale.device_id or "primary"
+        samples = f'scale_samples_total{{scale="{scale}"}}'
+        timeouts = f'scale_usb_timeouts_total{{scale="{scale}"}}'
+        requests = 'scale_http_requests_total{route="/api/batch/<int:session_id>",method="GET",status="404"}'
+        before = self.scrape()
+
+        self.assertIsNotNone(self.scale.read_weight())
+        self.assertIsNone(self.scale.read_weight(timeout=20))
+        self.assertEqual(self.get("/api/batch/999")[0], 404)
+
+        after = self.scrape()
+        self.assertEqual(after[samples] - before.get(samples, 0), 1)
+        self.assertEqual(after[timeouts] - before.get(timeouts, 0), 1)
+        self.assertEqual(after[requests] - before.get(requests, 0), 1)
+        # Un timeout non è un errore USB
+        errors = [name for name in after if name.startswith("scale_usb_errors_total") and f'scale="{scale}"' in name]
+        self.assertEqual(errors, [])
+
+
+class AsyncioMetricsTest(MetricsTest):
+    server = "asyncio"
+
+
+# Avvia il servizio headless con PyQt6 e winreg non importabili: ogni
+# tentativo di importarli solleverebbe ImportError
+HEADLESS_SCRIPT = """
+import sys
+sys.modules["PyQt6"] = None
+sys.modules["winreg"] = None
+import scale_server
+sys.exit(scale_server.main(["--headless", "--settings", sys.argv[1]]))
+"""
+
+
+class HeadlessTest(unittest.TestCase):
+    def test_headless_service_starts_and_stops_without_gui_modules(self):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as directory:
+            settings = os.path.join(directory, "settings.json")
+            with open(settings, "w") as f:
+                json.dump({"api": {"host": "127.0.0.1", "port": port, "server": "waitress"}}, f)
+            env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+            process = subprocess.Popen([sys.executable, "-c", HEADLESS_SCRIPT, settings], cwd=directory,
+                                       env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            try:
+                status = None
+                deadline = time.monotonic() + 15
+                while status is None and process.poll() is None and time.monotonic() < deadline:
+                    try:
+                        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+                        connection.request("GET", "/api/status")
+                        status = connection.getresponse().status
+                        connection.close()
+                    except OSError:
+                        time.sleep(0.1)
+                self.assertEqual(status, 200)
+                process.send_signal(signal.SIGINT)
+                _, errors = process.communicate(timeout=15)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.communicate()
+            self.assertEqual(process.returncode, 0, errors.decode(errors="replace"))
+
+
+class RegistryTest(unittest.TestCase):
+    def test_primary_connected_before_scan_is_not_registered_twice(self):
+        device = SimulatedDymo(seed=1)
+        device.unplug()
+        primary = ScaleDevice(backend=SimulatedDymoBackend([device]))
+        reader = ScaleReader(primary)
+        registry = ScaleRegistry(primary, binder=lambda scale, scale_id: reader.call(lambda: scale.bind(scale_id)))
+        self.assertEqual(registry.scan(), [])
+        reader.start()
+        try:
+            device.plug()
+            deadline = time.monotonic() + 5
+            while not primary.connected and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertTrue(primary.connected)
+            self.assertEqual(registry.scan(), [])
+            self.assertEqual(registry.items(), [(primary.device_id, primary)])
+            self.assertEqual(device.opens, 1)
+        finally:
+            reader.stop()
+
+    def test_other_scales_get_their_own_device(self):
+        devices = [SimulatedDymo(seed=1, port_numbers=(port,)) for port in (1, 2)]
+        primary = ScaleDevice(backend=SimulatedDymoBackend(devices))
+        registry = ScaleRegistry(primary)
+        added = registry.scan()
+        self.assertEqual([scale.device_id for scale in added], ["1-2"])
+        self.assertEqual(registry.items(), [("1-1", primary), ("1-2", added[0])])
+
+    def test_disconnected_primary_is_bound_through_the_binder(self):
+        primary = ScaleDevice(backend=SimulatedDymoBackend([SimulatedDymo(seed=1)]))
+        bound = []
+        registry = ScaleRegistry(primary, binder=lambda scale, scale_id: bound.append((scale, scale_id)))
+        self.assertEqual(registry.scan(), [])
+        # Il legame spetta al thread del lettore, tramite il binder
+        self.assertEqual(bound, [(primary, "1-1")])
+        self.assertIsNone(primary.device_id)
+        self.assertEqual(registry.items(), [("1-1", primary)])
+
+    def test_simulated_scales_have_distinct_addresses(self):
+        devices = [SimulatedDymo(seed=1, port_numbers=(port,)) for port in (1, 2, 3)]
+        addresses = {device.descriptor.address for device in devices}
+        self.assertEqual(len(addresses), len(devices))
+
+
+class RecordingReader(ScaleReader):
+    """Lettore che annota i cambi di stato e la profondità dello stack a ciascuno"""
+
+    def __init__(self, *args, **kwargs):
+        self.transitions = []
+        super().__init__(*args, **kwargs)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.transitions.append((self.state, state, len(traceback.extract_stack())))
+        super()._set_state(state)
+
+    def states(self):
+        return [state for _, state, _ in self.transitions]
+
+    def connects(self):
+        """Profondità dello stack a ogni connessione riuscita (probing -> connected)"""
+        return [depth for previous, state, depth in self.transitions
+                if previous == READER_PROBING and state == READER_CONNECTED]
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+def in_order(states, expected):
+    """True se `expected` compare in `states` nell'ordine dato (anche non contiguo)"""
+    remaining = iter(states)
+    return all(state in remaining for state in expected)
+
+
+class ScaleReaderTest(unittest.TestCase):
+    def test_states_from_missing_scale_to_idle(self):
+        device, scale = steady_scale()
+        device.unplug()
+        reader = RecordingReader(scale, idle_after=0.2, idle_interval=0.2)
+        reader.start()
+        try:
+            self.assertTrue(wait_until(lambda: READER_DISCONNECTED in reader.states()))
+            device.plug()
+            self.assertTrue(wait_until(lambda: reader.state == READER_IDLE))
+        finally:
+            reader.stop()
+        self.assertEqual(reader.states()[:2], [READER_PROBING, READER_DISCONNECTED])
+        self.assertTrue(in_order(reader.states(), [READER_DISCONNECTED, READER_PROBING, READER_CONNECTED,
+                                                   READER_READING, READER_IDLE]), reader.states())
+
+    def test_reconnects_after_errors_without_recursion(self):
+        device, scale = steady_scale()
+        reader = RecordingReader(scale, adaptive=False)
+        reader.start()
+        try:
+            for cycle in range(1, 4):
+                self.assertTrue(wait_until(lambda: len(reader.connects()) == cycle))
+                drops = reader.states().count(READER_DISCONNECTED)
+                device.unplug()
+                self.assertTrue(wait_until(lambda: reader.states().count(READER_DISCONNECTED) > drops))
+                device.plug()
+            self.assertTrue(wait_until(lambda: len(reader.connects()) == 4))
+        finally:
+            reader.stop()
+        connects = reader.connects()
+        self.assertEqual(len(connects), 4)
+        # Ogni riconnessione riparte dal ciclo principale, alla stessa profondità
+        self.assertEqual(len(set(connects)), 1, connects)
+        self.assertEqual(device.opens, 4)
+
+    def test_commands_queued_while_reading_run_once_in_order(self):
+        device, scale = steady_scale()
+        calls = []
+
+        def recording(name, command):
+            def run():
+                calls.append((name, threading.current_thread()))
+                return command()
+            return run
+
+        scale.set_tare = recording("tare", scale.set_tare)
+        scale.set_zero = recording("zero", scale.set_zero)
+        reader = ScaleReader(scale, adaptive=False)
+        reader.start()
+        thread = reader._thread
+        try:
+            self.assertTrue(wait_until(lambda: reader.state == READER_READING))
+            futures = [reader.submit("zero"), reader.submit("tare"), reader.call(recording("call", lambda: True)),
+                       reader.submit("zero"), reader.submit("tare")]
+            for future in futures:
+                self.assertIsNotNone(future.result(5))
+            time.sleep(0.2)
+        finally:
+            reader.stop()
+        self.assertEqual([name for name, _ in calls], ["zero", "tare", "call", "zero", "tare"])
+        self.assertEqual({caller for _, caller in calls}, {thread})
+
+    def test_reconnect_delay_doubles_and_resets_after_success(self):
+        device, scale = steady_scale()
+        device.unplug()
+        reader = ScaleReader(scale)
+        delays = []
+        reader._wait = delays.append
+        for _ in range(9):
+            reader._step_disconnected()
+            reader._step_probing()
+        expected = [min(RECONNECT_MIN_DELAY * 2 ** n, RECONNECT_MAX_DELAY) for n in range(9)]
+        self.assertEqual(delays, expected)
+        self.assertEqual(delays[-1], RECONNECT_MAX_DELAY)
+        device.plug()
+        reader._step_disconnected()
+        reader._step_probing()
+        self.assertEqual(reader.state, READER_CONNECTED)
+        # Dopo la connessione il ritardo riparte dal minimo
+        reader._set_state(READER_DISCONNECTED)
+        reader._step_disconnected()
+        self.assertEqual(delays[-1], RECONNECT_MIN_DELAY)
+
+
+class ScriptedStopEvent:
+    """Evento di arresto che annota le attese ed esegue un passo dello scenario a ciascuna"""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.intervals = []
+
+    def wait(self, timeout):
+        self.intervals.append(timeout)
+        if not self.steps:
+            return True
+        step = self.steps.pop(0)
+        if step is not None:
+            step()
+        return False
+
+
+class HotplugPollTest(unittest.TestCase):
+    def test_enumeration_changes_notify_and_reset_the_backoff(self):
+        device = SimulatedDymo(seed=1)
+        backend = SimulatedDymoBackend([device])
+        monitor = HotplugMonitor(backend=backend, poll_interval=1, max_poll_interval=4)
+        changes = []
+        monitor.add_listener(lambda: changes.append(device.plugged))
+        # Presente per quattro controlli, poi assente, poi di nuovo presente
+        monitor._stop_event = ScriptedStopEvent([None, None, None, device.unplug, device.plug])
+        # Senza sysfs si ricade sull'enumerazione di libusb, con backoff
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch("scale_server.SYSFS_USB_DEVICES", os.path.join(directory, "missing")):
+                monitor._run_poll()
+        self.assertEqual(changes, [False, True])
+        self.assertEqual(monitor._stop_event.intervals, [1, 2, 4, 4, 1, 1])
+        self.assertEqual(backend.enumerations, 6)
+
+
+class FailingDevice:
+    """Dispositivo pyusb finto la cui lettura solleva sempre `error`"""
+
+    def __init__(self, error, alive=True):
+        self.error = error
+        self.alive = alive
+        self.reads = 0
+
+    def read(self, endpoint, size, timeout):
+        self.reads += 1
+        raise self.error
+
+    def get_active_configuration(self):
+        if not self.alive:
+            raise usb.core.USBError("No such device", -4, errno.ENODEV)
+        return SimpleNamespace(bConfigurationValue=1)
+
+
+class UsbDeviceTest(unittest.TestCase):
+    def connected_scale(self, device):
+        scale = ScaleDevice(backend=SimulatedDymoBackend([]))
+        scale.device = device
+        scale.endpoint = SimpleNamespace(bEndpointAddress=0x82, wMaxPacketSize=6)
+        scale.retry_delay = 0
+        # Appena verificata: un timeout non richiede un nuovo controllo di salute
+        scale.check_health(force=True)
+        scale.connected = True
+        return scale
+
+    def test_errors_are_classified_by_errno(self):
+        cases = [
+            (usb.core.USBTimeoutError("Operation timed out", -7, errno.ETIMEDOUT), USB_ERROR_TIMEOUT),
+            (usb.core.USBError("Operation timed out", -7, errno.ETIMEDOUT), USB_ERROR_TIMEOUT),
+            (usb.core.USBError("No such device", -4, errno.ENODEV), USB_ERROR_DISCONNECTED),
+            (usb.core.USBError("Pipe error", -9, errno.EPIPE), USB_ERROR_STALL),
+            (usb.core.USBError("Input/Output Error", -1, errno.EIO), USB_ERROR_TRANSIENT),
+        ]
+        for error, kind in cases:
+            self.assertEqual(classify_usb_error(error), kind, error)
+
+    def test_timeout_keeps_the_scale_connected(self):
+        device = FailingDevice(usb.core.USBTimeoutError("Operation timed out", -7, errno.ETIMEDOUT))
+        scale = self.connected_scale(device)
+        self.assertIsNone(scale.read_weight())
+        self.assertTrue(scale.connected)
+        self.assertIs(scale.device, device)
+        self.assertEqual(device.reads, 1)
+
+    def test_disconnect_drops_the_device_at_once(self):
+        device = FailingDevice(usb.core.USBError("No such device", -4, errno.ENODEV))
+        scale = self.connected_scale(device)
+        self.assertIsNone(scale.read_weight())
+        self.assertFalse(scale.connected)
+        self.assertIsNone(scale.device)
+        self.assertEqual(device.reads, 1)
+
+    def test_io_error_on_a_vanished_device_disconnects(self):
+        device = FailingDevice(usb.core.USBError("Input/Output Error", -1, errno.EIO))
+        scale = self.connected_scale(device)
+        device.alive = False
+        self.assertIsNone(scale.read_weight())
+        self.assertFalse(scale.connected)
+        self.assertEqual(device.reads, 1)
+
+    def test_io_error_on_a_live_device_is_retried(self):
+        device = FailingDevice(usb.core.USBError("Input/Output Error", -1, errno.EIO))
+        scale = self.connected_scale(device)
+        self.assertIsNone(scale.read_weight())
+        self.assertTrue(scale.connected)
+        self.assertEqual(device.reads, scale.max_attempts)
+
+    def test_unplugged_simulated_scale_disconnects(self):
+        device, scale = steady_scale()
+        self.assertTrue(scale.find_usb_scale())
+        # Il carico si assesta in pochi millisecondi
+        time.sleep(0.01)
+        sample = scale.read_weight()
+        self.assertEqual((sample.value, sample.unit, sample.stable), (500, "g", True))
+        device.unplug()
+        self.assertIsNone(scale.read_weight())
+        self.assertFalse(scale.connected)
+        device.plug()
+        self.assertTrue(scale.find_usb_scale())
+
+    def test_known_device_is_reopened_without_reconfiguring(self):
+        device, scale = steady_scale()
+        reader = ScaleReader(scale, adaptive=False)
+        reader.start()
+        try:
+            self.assertTrue(wait_until(lambda: scale.connected))
+            known = scale.device
+            for _ in range(3):
+                self.assertTrue(reader.submit("reconnect").result(5))
+            self.assertIs(scale.device, known)
+            self.assertEqual(device.opens, 4)
+            self.assertEqual(device.configurations, 1)
+            # Scollegata e ricollegata, la bilancia torna non configurata
+            device.unplug()
+            self.assertTrue(wait_until(lambda: not scale.connected))
+            device.plug()
+            self.assertTrue(wait_until(lambda: scale.connected))
+        finally:
+            reader.stop()
+        self.assertIsNot(scale.device, known)
+        self.assertEqual(device.configurations, 2)
+
+
+class SamplingTest(unittest.TestCase):
+    def test_invalid_sampling_settings_fall_back_to_defaults(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "settings.json")
+            with open(path, "w") as f:
+                json.dump({"sampling": {"read_timeout_ms": 0, "max_attempts": "5", "retry_delay": -1,
+                                        "min_publish_interval": 0.2, "idle_after": float("nan"),
+                                        "idle_interval": 0.1}}, f)
+            sampling = SettingsManager(path).get_sampling_settings()
+            defaults = SettingsManager(os.path.join(directory, "missing.json")).get_sampling_settings()
+        for key in ("read_timeout_ms", "max_attempts", "retry_delay", "idle_after"):
+            self.assertEqual(sampling[key], defaults[key], key)
+        self.assertEqual(sampling["min_publish_interval"], 0.2)
+        self.assertEqual(sampling["idle_interval"], 0.2)
+
+    def test_new_demand_wakes_an_idle_reader(self):
+        device, scale = steady_scale()
+        reader = ScaleReader(scale, idle_after=0.1, idle_interval=5.0)
+        reader.start()
+        try:
+            deadline = time.monotonic() + 3
+            while reader.state != READER_IDLE and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(reader.state, READER_IDLE)
+            reports = device.reports
+            reader.add_demand_source(lambda: True)
+            time.sleep(0.3)
+            self.assertGreater(device.reports - reports, 5)
+        finally:
+            reader.stop()
+
+
+class TareProfilesTest(unittest.TestCase):
+    def test_tare_taken_before_a_profile_switch_is_discarded(self):
+        scale = ScaleDevice(backend=SimulatedDymoBackend([]))
+        profiles = TareProfiles(scale)
+        stale = scale.offsets_version
+        profiles.select("box", tare=100)
+        profiles.on_offsets_changed(480.0, 0.0, stale)
+        self.assertEqual(profiles.profiles["box"]["tare"], 100.0)
+        self.assertEqual(profiles.profiles["default"]["tare"], 0.0)
+        profiles.on_offsets_changed(480.0, 0.0, scale.offsets_version)
+        self.assertEqual(profiles.profiles["box"]["tare"], 480.0)
+
+    def test_malformed_profiles_are_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "settings.json")
+            with open(path, "w") as f:
+                json.dump({"profiles": {"bad": {"tare": "abc"}, "empty": {"tare": None},
+                                        "box": {"tare": 100}}, "current_profile": "bad"}, f)
+            profiles = TareProfiles(ScaleDevice(backend=SimulatedDymoBackend([])), SettingsManager(path))
+        self.assertEqual(sorted(profiles.profiles), ["box", "default"])
+        self.assertEqual(profiles.current, "default")
+
+    def test_reader_tare_is_saved_off_the_calling_thread(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "settings.json")
+            settings = SettingsManager(path)
+            writers = []
+            update_profiles = settings.update_profiles
+            settings.update_profiles = lambda *args: writers.append(threading.current_thread()) or update_profiles(*args)
+            scale = ScaleDevice(backend=SimulatedDymoBackend([]))
+            profiles = TareProfiles(scale, settings)
+            profiles.on_offsets_changed(480.0, 0.0, scale.offsets_version)
+            profiles.close()
+            self.assertTrue(writers)
+            self.assertNotIn(threading.current_thread(), writers)
+            self.assertEqual(SettingsManager(path).get_profiles()[0]["default"]["tare"], 480.0)
+
+
+class BatchSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.device, self.scale = steady_scale()
+        self.reader = ScaleReader(self.scale)
+        self.api = ScaleAPI(self.scale, reader=self.reader,
+                            command_handler=lambda command, scale_id: self.reader.submit(command))
+        self.client = self.api.app.test_client()
+        self.reader.start()
+        self.assertIsNotNone(self.api.stability.wait_for_stable(2.0))
+
+    def tearDown(self):
+        self.reader.stop()
+
+    def test_settled_weight_is_captured_once(self):
+        session = self.client.post("/api/batch", json={}).get_json()
+        self.assertEqual(session["statistics"]["count"], 1)
+        time.sleep(0.3)
+        payload = self.client.get(f"/api/batch/{session['id']}").get_json()
+        self.assertEqual(payload["statistics"]["count"], 1)
+        self.assertTrue(payload["waiting_removal"])
+
+    def test_tare_and_profile_switch_are_not_new_items(self):
+        session = self.client.post("/api/batch", json={}).get_json()
+        self.assertEqual(session["statistics"]["count"], 1)
+        settle_id, _ = self.api.stability.current()
+        self.assertEqual(self.client.post("/api/tare", json={}).status_code, 200)
+        time.sleep(0.3)
+        response = self.client.post("/api/profile?name=box&tare=0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["current"], "box")
+        self.assertEqual(self.api.profiles.current, "box")
+        time.sleep(0.3)
+        payload = self.client.get(f"/api/batch/{session['id']}").get_json()
+        self.assertEqual(payload["statistics"]["count"], 1)
+        self.assertTrue(payload["waiting_removal"])
+        self.assertEqual(self.api.stability.current()[0], settle_id)
+
+    def test_non_finite_min_weight_is_rejected(self):
+        for value in ("nan", "inf", "-1"):
+            response = self.client.post(f"/api/batch?min_weight={value}")
+            self.assertEqual(response.status_code, 400, value)
+        self.assertEqual(self.client.get("/api/batch").get_json()["count"], 0)
+
+    def test_open_sessions_are_capped(self):
+        self.api.batches.max_open_sessions = 2
+        first = self.client.post("/api/batch").get_json()
+        self.assertEqual(self.client.post("/api/batch").status_code, 201)
+        self.assertEqual(self.client.post("/api/batch").status_code, 429)
+        self.assertEqual(self.client.post(f"/api/batch/{first['id']}/close").status_code, 200)
+        self.assertEqual(self.client.post("/api/batch").status_code, 201)
+
+    def test_idle_sessions_expire(self):
+        self.api.batches.idle_timeout = 0.2
+        session = self.client.post("/api/batch").get_json()
+        self.assertTrue(self.api.batches.has_open())
+        time.sleep(0.3)
+        self.assertFalse(self.api.batches.has_open())
+        payload = self.client.get(f"/api/batch/{session['id']}").get_json()
+        self.assertFalse(payload["open"])
+        self.assertTrue(payload["expired"])
+
+
+class WeightHistoryTest(unittest.TestCase):
+    def setUp(self):
+        _, scale = steady_scale()
+        self.assertTrue(scale.find_usb_scale())
+        scale.read_weight()
+        # Dieci letture, una al secondo fino ad ora, in un buffer da quattro
+        now = time.monotonic()
+        self.history = WeightHistory(capacity=4)
+        for seq in range(1, 11):
+            self.history.append(scale.state._replace(seq=seq, captured_at=now - (10 - seq)))
+
+    def seqs(self, **query):
+        return [entry["seq"] for entry in self.history.query(**query)]
+
+    def test_wrapped_buffer_keeps_the_latest_readings(self):
+        self.assertEqual(len(self.history), 4)
+        self.assertEqual(self.seqs(), [7, 8, 9, 10])
+        self.assertEqual(self.seqs(limit=2), [9, 10])
+        entry = self.history.query(limit=1)[0]
+        self.assertEqual((entry["weight"], entry["unit"], entry["connected"]), (500, "g", True))
+
+    def test_since_returns_later_readings(self):
+        self.assertEqual(self.seqs(since=8), [9, 10])
+        self.assertEqual(self.seqs(since=10), [])
+        # Letture già sovrascritte: si riparte dalla più vecchia conservata
+        self.assertEqual(self.seqs(since=2, limit=2), [7, 8])
+
+    def test_seconds_returns_recent_readings(self):
+        self.assertEqual(self.seqs(max_age=2.5), [8, 9, 10])
+        self.assertEqual(self.seqs(max_age=60), [7, 8, 9, 10])
+
+
+class WeightJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = WeightJournal(self.directory.name)
+        self.journal.start()
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def test_records_keep_tare_and_gross_weight(self):
+        _, scale = steady_scale()
+        scale.set_offsets(tare_grams=100.0, zero_offset=20.0)
+        self.assertTrue(scale.find_usb_scale())
+        # Il carico si assesta in pochi millisecondi
+        time.sleep(0.01)
+        sample = scale.read_weight()
+        self.journal.record_settled(1, sample, *scale.applied_offsets)
+        self.journal.close()
+        record, = self.journal.query()
+        self.assertEqual((record["weight"], record["gross_weight"]), (380, 500))
+        self.assertEqual((record["tare"], record["zero_offset"]), (100.0, 20.0))
+
+    def test_version_1_files_are_still_read(self):
+        self.journal.close()
+        layout = WeightJournal.RECORDS[1]
+        with open(os.path.join(self.directory.name, "weights-20250101-000000-000000.bin"), "wb") as f:
+            f.write(WeightJournal.HEADER.pack(WeightJournal.MAGIC, 1, layout.size))
+            f.write(layout.pack(time.time(), 7, 500, 0, 2, 2, 0))
+        record, = self.journal.query()
+        self.assertEqual((record["settle_id"], record["weight"], record["tare"]), (7, 500, None))
+
+    def test_record_formats(self):
+        self.assertEqual((WeightJournal.HEADER.size, WeightJournal.RECORDS[1].size, WeightJournal.RECORD.size),
+                         (16, 24, 40))
+        self.journal.record_settled(1, self.sample())
+        self.journal.close()
+        name, = self.files()
+        with open(os.path.join(self.directory.name, name), "rb") as f:
+            data = f.read()
+        self.assertEqual(WeightJournal.HEADER.unpack_from(data, 0), (WeightJournal.MAGIC, 2, 40))
+        self.assertEqual(len(data), WeightJournal.HEADER.size + WeightJournal.RECORD.size)
+
+    def test_files_rotate_by_size(self):
+        self.journal.close()
+        self.journal.max_bytes = WeightJournal.HEADER.size + 2 * WeightJournal.RECORD.size
+        self.journal.start()
+        sample = self.sample()
+        for settle_id in range(1, 6):
+            self.journal.record_settled(settle_id, sample)
+        self.journal.close()
+        self.assertEqual(len(self.files()), 3)
+        self.assertEqual([record["settle_id"] for record in self.journal.query()], [1, 2, 3, 4, 5])
+
+    def test_files_rotate_by_age(self):
+        self.journal.close()
+        self.journal.rotate_seconds = 0
+        self.journal.start()
+        sample = self.sample()
+        for settle_id in range(1, 4):
+            self.journal.record_settled(settle_id, sample)
+        self.journal.close()
+        self.assertEqual(len(self.files()), 3)
+
+    def test_range_query_spans_files(self):
+        self.journal.close()
+        for name, timestamps in (("20250101-000000-000000", (100, 101, 102)), ("20250101-000001-000000", (103, 104))):
+            with open(os.path.join(self.directory.name, f"weights-{name}.bin"), "wb") as f:
+                f.write(WeightJournal.HEADER.pack(WeightJournal.MAGIC, 2, WeightJournal.RECORD.size))
+                for timestamp in timestamps:
+                    f.write(WeightJournal.RECORD.pack(timestamp, timestamp, 500, 0, 2, 4, 0, 0.0, 0.0))
+                # Record incompleto in coda, come durante una scrittura
+                f.write(b"\0" * 7)
+
+        def settle_ids(**query):
+            return [record["settle_id"] for record in self.journal.query(**query)]
+
+        self.assertEqual(settle_ids(), [100, 101, 102, 103, 104])
+        self.assertEqual(settle_ids(start=101.5, end=103), [102, 103])
+        self.assertEqual(settle_ids(start=101, limit=2), [101, 102])
+        self.assertEqual(settle_ids(start=105), [])
+
+    def sample(self):
+        _, scale = steady_scale()
+        self.assertTrue(scale.find_usb_scale())
+        return scale.read_weight()
+
+    def files(self):
+        return sorted(name for name in os.listdir(self.directory.name) if name.endswith(".bin"))
+
+
+if __name__ == "__main__":
+    unittest.main()